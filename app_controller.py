@@ -1,17 +1,41 @@
 #Class chính điều khiển ứng dụng
 
+import time
 import tkinter as tk
 from tkinter import messagebox
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Callable
 
 # Import các modules
 from core_logic.transactions import TransactionManager, Transaction
 from core_logic.budget import BudgetManager
+from core_logic.budget_alerts import BudgetAlertEngine
 from core_logic.reports import ReportGenerator
+from core_logic.snapshot import DatasetSnapshot
+from core_logic.transaction_cache import get_cache_manager
+from storage.warm_cache import WarmCache
 from gui.main_window import MainWindow
+from gui.idle_scheduler import IdleScheduler
 from config import WINDOW_CONFIG, DEFAULT_CATEGORIES
 
+# Khoảng thời gian gom các yêu cầu làm mới giao diện thành một lần vẽ (ms, ~1 khung hình)
+REFRESH_INTERVAL_MS = 16
+
+# Chu kỳ kiểm tra các dòng do tiến trình khác ghi thêm vào file giao dịch (ms)
+RELOAD_INTERVAL_MS = 2000
+
+# Tham số mặc định của từng loại báo cáo, được điền vào trước khi tạo khóa cache
+# để lời gọi bỏ trống tham số và lời gọi truyền giá trị mặc định dùng chung kết quả
+REPORT_DEFAULTS = {
+    "category": {"transaction_type": "Chi tiêu"},
+    "trend": {"months": 12},
+    "comprehensive": {"format_type": "text"}
+}
+
+# Các báo cáo tính theo ngày hiện tại (tháng hiện tại, 12 tháng gần nhất...),
+# được cache kèm tháng hiện tại để không dùng lại kết quả của tháng trước
+CURRENT_MONTH_REPORTS = ("trend", "health", "comprehensive")
+
 class AppController:
     """Class chính điều khiển ứng dụng"""
     
@@ -20,16 +44,34 @@ class AppController:
         self.root = tk.Tk()
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        # Khởi tạo các thành phần
-        self.transaction_manager = TransactionManager()
+        # Khởi tạo các thành phần (dùng lại trạng thái đã lưu nếu dữ liệu chưa đổi)
+        self.warm_cache = WarmCache()
+        self.transaction_manager = TransactionManager(warm_cache=self.warm_cache)
         self.budget_manager = BudgetManager()
-        self._transaction_cache = {}
-        self._budget_cache = {}
+        self.cache = get_cache_manager()
+        self.restore_warm_cache()
+        
+        # Bộ đếm chi tiêu theo (tháng, danh mục) cho cảnh báo ngân sách
+        self.budget_alerts = BudgetAlertEngine(self.budget_manager.warning_threshold)
+        self.budget_alerts.rebuild(self.transaction_manager.aggregates)
+        self._report_generator = None
+        # Các view đăng ký làm mới: tên -> (hàm vẽ, loại dữ liệu phụ thuộc), theo thứ tự vẽ
+        self._views: Dict[str, Tuple[Callable[[], None], Tuple[str, ...]]] = {}
+        self._dirty_views = set()
+        self._refresh_job = None
+        self.transaction_manager.subscribe(self.on_transaction_event)
         
         # Tạo giao diện
         self.main_window = MainWindow(self.root, self)
         self.center_window()
         
+        # Tính trước báo cáo/ngân sách hay dùng khi người dùng rảnh
+        self.precompute_scheduler = IdleScheduler(self.root)
+        self.schedule_precompute()
+        
+        # Theo dõi file giao dịch, chỉ đọc phần được ghi thêm
+        self._reload_job = self.root.after(RELOAD_INTERVAL_MS, self.reload_transactions)
+        
         # Cấu hình window
         self.root.title(WINDOW_CONFIG["title"])
         self.root.geometry(WINDOW_CONFIG["geometry"])
@@ -62,26 +104,181 @@ class AppController:
         """Xử lý khi đóng ứng dụng"""
         try:
             if messagebox.askokcancel("Thoát", "Bạn có chắc chắn muốn thoát?"):
+                self.precompute_scheduler.shutdown()
+                if self._reload_job is not None:
+                    self.root.after_cancel(self._reload_job)
+                    self._reload_job = None
+                self.save_warm_cache()
                 self.root.destroy()
         except Exception as e:
             print(f"Lỗi khi đóng ứng dụng: {e}")
             self.root.destroy()
     
+    def _warm_sources(self) -> List[Any]:
+        """Các file nguồn của cache trạng thái ngân sách"""
+        return [self.transaction_manager.file_handler.transactions_file,
+                self.budget_manager.file_handler.budget_file]
+    
+    def save_warm_cache(self) -> None:
+        """Lưu kho tổng hợp, chỉ mục và trạng thái ngân sách đã tính để lần sau khởi động nhanh"""
+        try:
+            self.transaction_manager.save_warm_state()
+            
+            # Chỉ giữ các entry của phiên bản dữ liệu hiện tại, bỏ phần phiên bản khỏi khóa
+            current = self._budget_cache_key(None, None)[:2]
+            entries = [(key[2:], value) for key, value in self.cache.items("budget_status")
+                       if key[:2] == current]
+            self.warm_cache.save("budget_status", self._warm_sources(), entries)
+        except Exception as e:
+            print(f"Lỗi khi lưu cache khởi động: {e}")
+    
+    def restore_warm_cache(self) -> None:
+        """Nạp lại trạng thái ngân sách đã lưu nếu file giao dịch và ngân sách chưa đổi"""
+        try:
+            entries = self.warm_cache.load("budget_status", self._warm_sources()) or []
+            for (category, month_year), value in entries:
+                self.cache.put("budget_status", self._budget_cache_key(category, month_year), value)
+        except Exception as e:
+            print(f"Lỗi khi nạp cache khởi động: {e}")
+    
     def get_transactions(self, **filters) -> List[Transaction]:
         """Lấy danh sách giao dịch với bộ lọc (có cache)"""
-        cache_key = str(filters)
+        try:
+            cache_key = (self.transaction_manager.data_version, tuple(sorted(filters.items())))
+            hash(cache_key)
+        except TypeError:
+            return self.transaction_manager.get_transactions(**filters)
+        
+        return self.cache.get_or_compute(
+            "filtered_transactions", cache_key,
+            lambda: self.transaction_manager.get_transactions(**filters)
+        )
+    
+    def _clear_data_caches(self, kinds: Tuple[str, ...] = ("transactions", "budget")) -> None:
+        """Bỏ các kết quả đã cache theo loại dữ liệu thay đổi"""
+        if "transactions" in kinds:
+            self.cache.clear("filtered_transactions")
+        self.cache.clear("budget_status")
+    
+    def invalidate_caches(self, *kinds: str) -> None:
+        """
+        Xóa cache khi có thay đổi dữ liệu và lên lịch vẽ lại các view phụ thuộc
+        
+        Args:
+            *kinds: Loại dữ liệu đã thay đổi ("transactions", "budget"), mặc định tất cả
+        """
+        kinds = kinds or ("transactions", "budget")
+        self._clear_data_caches(kinds)
+        self.schedule_precompute()
+        self.invalidate_views(*kinds)
+    
+    def register_view(self, name: str, render: Callable[[], None],
+                      depends_on: Tuple[str, ...] = ("transactions",)) -> None:
+        """
+        Đăng ký một view với pipeline làm mới
+        
+        Args:
+            name: Tên view
+            render: Hàm vẽ lại view (chạy trên luồng Tk)
+            depends_on: Các loại dữ liệu mà view hiển thị
+        """
+        self._views[name] = (render, tuple(depends_on))
+    
+    def unregister_view(self, name: str) -> None:
+        """Hủy đăng ký view (ví dụ khi cửa sổ đóng)"""
+        self._views.pop(name, None)
+        self._dirty_views.discard(name)
+    
+    def invalidate_views(self, *kinds: str) -> None:
+        """Đánh dấu cần vẽ lại mọi view phụ thuộc vào các loại dữ liệu đã thay đổi"""
+        self.mark_dirty(*[name for name, (_render, depends_on) in self._views.items()
+                          if any(kind in depends_on for kind in kinds)])
+    
+    def mark_dirty(self, *views: str) -> None:
+        """
+        Đánh dấu view cần vẽ lại; nhiều lần đánh dấu trong cùng một khung
+        hình được gom thành một lần vẽ qua after()
         
-        if cache_key not in self._transaction_cache:
-            self._transaction_cache[cache_key] = self.transaction_manager.get_transactions(**filters)
+        Args:
+            *views: Tên các view
+        """
+        self._dirty_views.update(name for name in views if name in self._views)
+        if self._dirty_views and self._refresh_job is None:
+            self._refresh_job = self.root.after(REFRESH_INTERVAL_MS, self.flush_refresh)
+    
+    def flush_refresh(self) -> None:
+        """Vẽ lại ngay các view đã đánh dấu, mỗi view một lần, theo thứ tự đăng ký"""
+        if self._refresh_job is not None:
+            try:
+                self.root.after_cancel(self._refresh_job)
+            except Exception:
+                pass
+            self._refresh_job = None
+        
+        dirty, self._dirty_views = self._dirty_views, set()
+        for name, (render, _depends_on) in list(self._views.items()):
+            if name in dirty:
+                try:
+                    render()
+                except Exception as e:
+                    print(f"Lỗi khi vẽ lại '{name}': {e}")
+    
+    def on_transaction_event(self, event: str, transaction: Transaction) -> None:
+        """
+        Cập nhật tăng dần khi TransactionManager thêm/xóa giao dịch
+        
+        Args:
+            event: "added" hoặc "removed"
+            transaction: Giao dịch thay đổi
+        """
+        self._clear_data_caches()
+        self.schedule_precompute()
+        
+        # Cập nhật bộ đếm cảnh báo ngân sách - O(1), chỉ cảnh báo khi vừa vượt ngưỡng
+        try:
+            if event == "added":
+                self._sync_budget_alerts()
+                alert = self.budget_alerts.add(transaction)
+                if alert:
+                    self.check_budget_warning(alert)
+            elif event == "removed":
+                self.budget_alerts.remove(transaction)
+        except Exception as e:
+            print(f"Lỗi khi kiểm tra cảnh báo ngân sách: {e}")
         
-        return self._transaction_cache[cache_key]
+        try:
+            # Cập nhật model ngay, phần vẽ được gom lại theo khung hình
+            self.main_window.apply_transaction_event(event, transaction)
+        except Exception as e:
+            print(f"Lỗi khi cập nhật giao diện: {e}")
+        self.invalidate_views("transactions")
     
-    def invalidate_caches(self) -> None:
-        """Xóa cache khi có thay đổi dữ liệu"""
-        self._transaction_cache.clear()
-        self._budget_cache.clear()
-        # Refresh display để cập nhật giao diện
-        self.refresh_display()
+    def reload_transactions(self) -> None:
+        """
+        Nạp các giao dịch do tiến trình khác ghi thêm vào file (chạy định kỳ)
+        
+        Chỉ phần đuôi mới của file được phân tích và cộng dồn; nếu file đã
+        bị ghi đè thì TransactionManager tải lại toàn bộ, khi đó bộ đếm cảnh
+        báo ngân sách được dựng lại từ kho tổng hợp và danh sách được nạp lại.
+        """
+        self._reload_job = None
+        try:
+            added = self.transaction_manager.reload_transactions()
+            if added is None:
+                self.budget_alerts.rebuild(self.transaction_manager.aggregates)
+                self.mark_dirty("transaction_list")
+                self.invalidate_caches("transactions")
+            elif added:
+                # Dòng từ nơi khác chỉ cập nhật bộ đếm, không hiện hộp thoại cảnh báo
+                self._sync_budget_alerts()
+                for transaction in added:
+                    self.budget_alerts.add(transaction)
+                    self.main_window.apply_transaction_event("added", transaction)
+                self.invalidate_caches("transactions")
+        except Exception as e:
+            print(f"Lỗi khi nạp lại giao dịch: {e}")
+        finally:
+            self._reload_job = self.root.after(RELOAD_INTERVAL_MS, self.reload_transactions)
     
     def add_transaction(self, transaction_data: Dict[str, Any]) -> Tuple[bool, str]:
         """
@@ -109,13 +306,7 @@ class AppController:
             )
             
             if success:
-                # Xóa cache khi có thay đổi
-                self.invalidate_caches()
-                
-                # Kiểm tra cảnh báo ngân sách
-                if transaction_data["type"] == "Chi tiêu":
-                    self.check_budget_warning(transaction_data)
-                
+                # Cảnh báo ngân sách (nếu có) đã được hiển thị qua on_transaction_event
                 messagebox.showinfo("Thành công", message)
             else:
                 messagebox.showerror("Lỗi", message)
@@ -186,8 +377,8 @@ class AppController:
                 success, message = self.transaction_manager.delete_transaction(transaction_data)
                 
                 if success:
+                    # Cache và giao diện đã được cập nhật qua sự kiện "removed"
                     messagebox.showinfo("Thành công", message)
-                    self.invalidate_caches()
                     return True
                 else:
                     messagebox.showerror("Lỗi", message)
@@ -220,7 +411,7 @@ class AppController:
             
             if success:
                 messagebox.showinfo("Thành công", message)
-                self.invalidate_caches()
+                self.invalidate_caches("budget")
                 return True
             else:
                 messagebox.showerror("Lỗi", message)
@@ -230,54 +421,136 @@ class AppController:
             messagebox.showerror("Lỗi", f"Không thể đặt ngân sách: {e}")
             return False
     
+    def get_data_snapshot(self) -> DatasetSnapshot:
+        """Ảnh chụp dạng cột của dữ liệu hiện tại, dùng chung cho báo cáo và ngân sách"""
+        return self.transaction_manager.snapshot()
+    
+    def get_snapshot_source(self) -> Any:
+        """Nguồn ảnh chụp lấy nhanh trên luồng Tk, dựng thành ảnh chụp bằng build_snapshot() ở luồng nền"""
+        return self.transaction_manager.snapshot_source()
+    
+    def build_snapshot(self, source: Any) -> DatasetSnapshot:
+        """Dựng ảnh chụp từ nguồn đã lấy trên luồng Tk (chạy được ở luồng nền)"""
+        return self.transaction_manager.build_snapshot(source)
+    
     def get_budget_status(self, category: str, month_year: str = None) -> Dict[str, Any]:
-        """Lấy trạng thái ngân sách"""
-        transactions = self.get_all_transactions()
-        return self.budget_manager.get_budget_status(transactions, category, month_year)
-    
-    def get_all_budget_status(self, month_year: str = None) -> List[Dict[str, Any]]:
-        """Lấy trạng thái tất cả ngân sách"""
-        transactions = self.get_all_transactions()
-        return self.budget_manager.get_all_budget_status(transactions, month_year)
-    
-    def check_budget_warning(self, transaction_data: Dict[str, Any]):
-        """Kiểm tra và hiển thị cảnh báo ngân sách"""
-        if transaction_data["type"] == "Chi tiêu":
-            current_month = datetime.now().strftime("%m/%Y")
-            status = self.get_budget_status(transaction_data["category"], current_month)
+        """Lấy trạng thái ngân sách (có cache theo phiên bản giao dịch và ngân sách)"""
+        month_year = month_year or datetime.now().strftime("%m/%Y")
+        return self.cache.get_or_compute(
+            "budget_status", self._budget_cache_key(category, month_year),
+            lambda: self.budget_manager.get_budget_status(self.get_data_snapshot(), category, month_year)
+        )
+    
+    def get_all_budget_status(self, month_year: str = None,
+                              snapshot: DatasetSnapshot = None) -> List[Dict[str, Any]]:
+        """
+        Lấy trạng thái tất cả ngân sách (có cache theo phiên bản giao dịch và ngân sách)
+        
+        Args:
+            month_year: Tháng/năm (MM/YYYY), mặc định là tháng hiện tại
+            snapshot: Ảnh chụp dữ liệu (chụp trên luồng Tk khi chạy ở luồng nền)
+        """
+        month_year = month_year or datetime.now().strftime("%m/%Y")
+        if snapshot is None:
+            snapshot = self.get_data_snapshot()
+        return self.cache.get_or_compute(
+            "budget_status", self._budget_cache_key(None, month_year, snapshot.version),
+            lambda: self.budget_manager.get_all_budget_status(snapshot, month_year)
+        )
+    
+    def _budget_cache_key(self, category: str, month_year: str, data_version: Any = None) -> Tuple[Any, ...]:
+        """Khóa cache trạng thái ngân sách (tháng bỏ trống được thay bằng tháng hiện tại)"""
+        if data_version is None:
+            data_version = self.transaction_manager.data_version
+        month_year = month_year or datetime.now().strftime("%m/%Y")
+        return (data_version, self.budget_manager.data_version, category, month_year)
+    
+    def _sync_budget_alerts(self) -> None:
+        """Nạp lại ngưỡng ngân sách cho bộ cảnh báo khi file ngân sách đã đổi (chỉ stat file)"""
+        version = self.budget_manager.data_version
+        if self.budget_alerts.budget_version != version:
+            self.budget_alerts.set_budgets(self.budget_manager.file_handler.load_budgets(), version)
+    
+    def check_budget_warning(self, alert: Dict[str, Any]) -> None:
+        """
+        Hiển thị cảnh báo khi chi tiêu vừa vượt ngưỡng ngân sách
+        
+        Args:
+            alert: Trạng thái ngân sách do BudgetAlertEngine phát ra
+        """
+        if alert["status"] == "Vượt quá":
+            messagebox.showwarning(
+                "Cảnh báo ngân sách!",
+                f"Bạn đã vượt ngân sách danh mục '{alert['category']}' tháng {alert['month_year']}!\n"
+                f"Ngân sách: {alert['budget']:,.0f} VNĐ\n"
+                f"Đã chi: {alert['spent']:,.0f} VNĐ\n"
+                f"Vượt quá: {alert['spent'] - alert['budget']:,.0f} VNĐ"
+            )
+        elif alert["status"] == "Cảnh báo":
+            messagebox.showwarning(
+                "Cảnh báo ngân sách!",
+                f"Chi tiêu danh mục '{alert['category']}' tháng {alert['month_year']} đang gần đạt ngân sách!\n"
+                f"Ngân sách: {alert['budget']:,.0f} VNĐ\n"
+                f"Đã chi: {alert['spent']:,.0f} VNĐ ({alert['percentage']:.1f}%)\n"
+                f"Còn lại: {alert['remaining']:,.0f} VNĐ"
+            )
+    
+    def get_report_generator(self, snapshot: DatasetSnapshot = None) -> ReportGenerator:
+        """
+        ReportGenerator dùng chung cho một phiên bản dữ liệu
+        
+        Args:
+            snapshot: Ảnh chụp dữ liệu (mặc định là ảnh chụp hiện tại)
             
-            if status["status"] == "Vượt quá":
-                messagebox.showwarning(
-                    "Cảnh báo ngân sách!",
-                    f"Bạn đã vượt ngân sách danh mục '{transaction_data['category']}'!\n"
-                    f"Ngân sách: {status['budget']:,.0f} VNĐ\n"
-                    f"Đã chi: {status['spent']:,.0f} VNĐ\n"
-                    f"Vượt quá: {status['spent'] - status['budget']:,.0f} VNĐ"
-                )
-            elif status["status"] == "Cảnh báo":
-                messagebox.showwarning(
-                    "Cảnh báo ngân sách!",
-                    f"Chi tiêu danh mục '{transaction_data['category']}' đang gần đạt ngân sách!\n"
-                    f"Ngân sách: {status['budget']:,.0f} VNĐ\n"
-                    f"Đã chi: {status['spent']:,.0f} VNĐ ({status['percentage']:.1f}%)\n"
-                    f"Còn lại: {status['remaining']:,.0f} VNĐ"
-                )
+        Returns:
+            ReportGenerator: Được tạo lại chỉ khi phiên bản dữ liệu thay đổi
+        """
+        if snapshot is None:
+            snapshot = self.get_data_snapshot()
+        generator = self._report_generator
+        if generator is None or generator.snapshot is not snapshot:
+            generator = ReportGenerator(snapshot=snapshot)
+            self._report_generator = generator
+        return generator
     
     # Báo cáo ngân sách
-    def generate_report(self, report_type: str, **kwargs) -> Dict[str, Any]:
+    def generate_report(self, report_type: str, snapshot: DatasetSnapshot = None,
+                        **kwargs) -> Dict[str, Any]:
         """
         Tạo báo cáo
         
         Args:
             report_type: Loại báo cáo
+            snapshot: Ảnh chụp dữ liệu (chụp trên luồng Tk khi chạy ở luồng nền)
             **kwargs: Các tham số khác
             
         Returns:
             Dict: Dữ liệu báo cáo
         """
+        if snapshot is None:
+            snapshot = self.get_data_snapshot()
+        kwargs = {**REPORT_DEFAULTS.get(report_type, {}), **kwargs}
+        now = datetime.now()
+        current_month = now.strftime("%m/%Y")
+        # Kỳ bỏ trống được thay bằng kỳ hiện tại trước khi tạo khóa cache
+        if report_type == "monthly" and kwargs.get("month_year") is None:
+            kwargs["month_year"] = current_month
+        elif report_type == "yearly" and kwargs.get("year") is None:
+            kwargs["year"] = str(now.year)
+        period = current_month if report_type in CURRENT_MONTH_REPORTS else None
+        cache_key = (snapshot.version, report_type, period, tuple(sorted(kwargs.items())))
+        report = self.cache.get("reports", cache_key)
+        if report is None:
+            started = time.perf_counter()
+            report = self._build_report(report_type, snapshot, **kwargs)
+            if "error" not in report:
+                self.cache.put("reports", cache_key, report, cost=time.perf_counter() - started)
+        return report
+    
+    def _build_report(self, report_type: str, snapshot: DatasetSnapshot, **kwargs) -> Dict[str, Any]:
+        """Tạo báo cáo từ ảnh chụp dữ liệu (không qua cache)"""
         try:
-            transactions = self.get_all_transactions()
-            report_generator = ReportGenerator(transactions)
+            report_generator = self.get_report_generator(snapshot)
             
             if report_type == "monthly":
                 return report_generator.get_monthly_report(kwargs.get("month_year"))
@@ -297,33 +570,62 @@ class AppController:
         except Exception as e:
             return {"error": f"Lỗi khi tạo báo cáo: {e}"}
     
+    def schedule_precompute(self) -> None:
+        """
+        Lên lịch tính trước các kết quả hay được mở tiếp theo
+        
+        Gồm báo cáo tháng hiện tại, báo cáo tổng hợp (mở mặc định trong
+        cửa sổ báo cáo), ma trận ngân sách của tháng hiện tại và hai tháng
+        liền kề, và xu hướng 12 tháng. Kết quả được lưu vào cache manager
+        theo phiên bản ảnh chụp nên lần mở sau chỉ còn là một lần tra cache.
+        """
+        scheduler = getattr(self, "precompute_scheduler", None)
+        if scheduler is None:
+            return
+        scheduler.cancel()
+        
+        # Trên luồng Tk chỉ lấy nguồn ảnh chụp (sao chép nông) lúc tác vụ bắt đầu chạy;
+        # ảnh chụp được dựng ở luồng nền và dùng chung cho các tác vụ cùng phiên bản
+        prepare = self.get_snapshot_source
+        build = self.build_snapshot
+        now = datetime.now()
+        current_month = now.strftime("%m/%Y")
+        
+        scheduler.schedule("report:monthly", lambda source: self.generate_report(
+            "monthly", snapshot=build(source), month_year=current_month), priority=0, prepare=prepare)
+        scheduler.schedule("budget:current", lambda source: self.get_all_budget_status(
+            current_month, snapshot=build(source)), priority=1, prepare=prepare)
+        scheduler.schedule("report:comprehensive", lambda source: self.generate_report(
+            "comprehensive", snapshot=build(source)), priority=2, prepare=prepare)
+        for offset in (-1, 1):
+            year, month = divmod(now.year * 12 + now.month - 1 + offset, 12)
+            month_year = f"{month + 1:02d}/{year}"
+            scheduler.schedule(f"budget:{offset:+d}", lambda source, m=month_year: self.get_all_budget_status(
+                m, snapshot=build(source)), priority=3, prepare=prepare)
+        scheduler.schedule("report:trend", lambda source: self.generate_report(
+            "trend", snapshot=build(source), months=12), priority=4, prepare=prepare)
+    
     # Quản lý dữ liệu
     def get_summary_data(self) -> Dict[str, Any]:
-        """Lấy dữ liệu tóm tắt"""
+        """Lấy dữ liệu tóm tắt từ kho tổng hợp của TransactionManager"""
         try:
-            transactions = self.get_all_transactions()
-            
-            # Tổng quan tất cả
-            total_income = sum(t.amount for t in transactions if t.type in ['Thu nhập', 'income'])
-            total_expense = sum(t.amount for t in transactions if t.type in ['Chi tiêu', 'expense'])
-            total_balance = total_income - total_expense
-            
-            # Tháng hiện tại
             current_month = datetime.now().strftime("%m/%Y")
-            monthly_transactions = [t for t in transactions if t.get_month_year() == current_month]
-            monthly_income = sum(t.amount for t in monthly_transactions if t.type in ['Thu nhập', 'income'])
-            monthly_expense = sum(t.amount for t in monthly_transactions if t.type in ['Chi tiêu', 'expense'])
-            monthly_balance = monthly_income - monthly_expense
+            aggregates = self.transaction_manager.aggregates
+            totals = aggregates.totals()
+            monthly = aggregates.month_totals(current_month)
+            expense_stats = self.transaction_manager.statistics.summary(kind="expense")
             
             return {
-                'total_income': total_income,
-                'total_expense': total_expense,
-                'total_balance': total_balance,
+                'total_income': totals["income"],
+                'total_expense': totals["expense"],
+                'total_balance': totals["income"] - totals["expense"],
                 'current_month': current_month,
-                'monthly_income': monthly_income,
-                'monthly_expense': monthly_expense,
-                'monthly_balance': monthly_balance,
-                'transaction_count': len(transactions)
+                'monthly_income': monthly["income"],
+                'monthly_expense': monthly["expense"],
+                'monthly_balance': monthly["income"] - monthly["expense"],
+                'transaction_count': totals["transaction_count"],
+                'average_expense': expense_stats["mean"],
+                'median_expense': expense_stats["median"]
             }
             
         except Exception as e:
@@ -331,14 +633,8 @@ class AppController:
             return {}
     
     def refresh_display(self):
-        """Cập nhật lại giao diện"""
-        try:
-            # Cập nhật danh sách giao dịch
-            self.main_window.update_transaction_list()
-            # Cập nhật tóm tắt
-            self.main_window.update_summary()
-        except Exception as e:
-            print(f"Lỗi khi refresh giao diện: {e}")
+        """Lên lịch cập nhật lại toàn bộ giao diện (gom vào lần vẽ kế tiếp)"""
+        self.mark_dirty(*self._views)
     
     def get_file_info(self) -> Dict[str, Any]:
         """Lấy thông tin file dữ liệu"""
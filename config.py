@@ -15,6 +15,9 @@ DATA_DIR.mkdir(exist_ok=True)
 TRANSACTIONS_FILE = DATA_DIR / "transactions.csv"
 BUDGET_FILE = DATA_DIR / "budget.csv"
 
+# Thư mục cache kết quả phân tích (tạo khi cần)
+CACHE_DIR = DATA_DIR / "cache"
+
 # Cấu hình giao diện
 WINDOW_CONFIG = {
     "title": "Quản Lý Chi Tiêu Cá Nhân",
@@ -71,12 +74,37 @@ REPORT_CONFIG = {
     "budget_warning_threshold": 0.8  # Cảnh báo khi chi tiêu >= 80% ngân sách
 }
 
+# Cấu hình thống kê trực tuyến
+STATS_CONFIG = {
+    "quantile_relative_accuracy": 0.01,  # Sai số tương đối của phân vị
+    "ema_span": 30                       # Số giao dịch của trung bình trượt mũ
+}
+
+# Cấu hình cache trong bộ nhớ (dùng chung cho mọi namespace)
+CACHE_CONFIG = {
+    "max_bytes": 64 * 1024 * 1024,  # Tổng ngân sách bộ nhớ ước lượng (64 MB)
+    "default_capacity": 128,        # Số entry tối đa của namespace không được cấu hình
+    "eviction_sample": 8,           # Số entry cũ nhất được xét khi loại theo chi phí
+    "namespaces": {                 # Số entry tối đa theo namespace
+        "filtered_transactions": 32,
+        "budget_status": 24,
+        "reports": 32,
+        "bst_range": 128
+    }
+}
+
 # Cấu hình CSV
 CSV_CONFIG = {
     "encoding": "utf-8",
     "delimiter": ",",
     "date_format": "%d/%m/%Y %H:%M:%S",  # Format cũ (để tương thích)
-    "timestamp_format": "%H:%M:%S"      # Format mới cho timestamp
+    "legacy_timestamp_format": "%H:%M:%S",  # Timestamp cũ chỉ có giờ (được nâng cấp khi đọc)
+    "timestamp_format": "%Y-%m-%dT%H:%M:%S.%f"  # ISO-8601 đến micro giây
+}
+
+# Cấu hình tiền tệ
+MONEY_CONFIG = {
+    "decimals": 2  # Số chữ số thập phân lưu trữ, đơn vị nhỏ nhất = 0.01
 }
 
 # Cấu hình validation
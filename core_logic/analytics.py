@@ -1,29 +1,155 @@
-from typing import List, Dict, Any
-from datetime import datetime
+from typing import List, Dict, Any, Tuple, Optional
+from datetime import date
+from functools import wraps
+import hashlib
 import numpy as np
-from core_logic.transactions import Transaction
+from core_logic.transactions import Transaction, TransactionManager
+from storage.result_cache import ResultCache
+from core_logic.online_stats import OnlineStatistics
+from core_logic.snapshot import DatasetSnapshot, EPOCH_ORDINAL, sum_by_group
+from utils.money import MINOR_PER_UNIT
 from .transaction_cache import cached_method
 
+# Phương pháp chấm điểm bất thường được hỗ trợ
+ANOMALY_METHODS = ("zscore", "mad")
+
+# Độ dài chu kỳ mùa vụ theo tần suất dự đoán: chu kỳ tháng (ngày) và chu kỳ năm (tháng)
+FORECAST_PERIODS = {"day": 365.2425 / 12, "month": 12}
+
+
+def persisted_result(func):
+    """
+    Decorator lưu kết quả phân tích vào ResultCache của instance (nếu có)
+    
+    Khóa gồm tên phương thức và tham số; dấu vân tay nội dung dữ liệu được
+    lưu làm phiên bản của kết quả. Kết quả vẫn dùng được sau khi khởi động
+    lại nếu dữ liệu không đổi, và mỗi bộ tham số chỉ chiếm một file.
+    """
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if self.result_cache is None:
+            return func(self, *args, **kwargs)
+        
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        fingerprint = self.data_fingerprint()
+        result = self.result_cache.get(key, fingerprint)
+        if result is None:
+            result = func(self, *args, **kwargs)
+            self.result_cache.set(key, result, fingerprint)
+        return result
+    return wrapper
+
+
 class TransactionAnalytics:
     """Class phân tích dữ liệu nâng cao"""
     
-    def __init__(self, transactions: List[Transaction]):
-        self.transactions = transactions
-        self._transaction_cache = {}
+    def __init__(self, transactions: List[Transaction] = None,
+                 manager: TransactionManager = None, result_cache: ResultCache = None):
+        """
+        Args:
+            transactions: Danh sách giao dịch (khi không gắn với TransactionManager)
+            manager: TransactionManager cung cấp giao dịch và phiên bản dữ liệu
+            result_cache: Cache kết quả trên đĩa (tùy chọn)
+        """
+        self.manager = manager
+        self._transactions = transactions if transactions is not None else []
+        self._local_version = 0
+        self._fingerprint: Tuple[Any, str] = (None, "")
+        self.result_cache = result_cache
+    
+    @property
+    def transactions(self) -> List[Transaction]:
+        """Giao dịch đang phân tích"""
+        if self.manager is not None:
+            return self.manager.transactions
+        return self._transactions
+    
+    @transactions.setter
+    def transactions(self, transactions: List[Transaction]) -> None:
+        self._transactions = transactions
+        self.invalidate()
+    
+    @property
+    def data_version(self) -> Tuple[int, int]:
+        """
+        Token phiên bản dữ liệu dùng làm khóa cache
         
-    @cached_method(ttl_seconds=300)
+        Kết quả cache có hiệu lực vô thời hạn cho tới khi phiên bản của
+        TransactionManager hoặc phiên bản cục bộ (invalidate) thay đổi.
+        """
+        manager_version = self.manager.data_version if self.manager is not None else 0
+        return manager_version, self._local_version
+    
+    def invalidate(self) -> None:
+        """Đánh dấu dữ liệu đã thay đổi để các kết quả cache cũ không còn được dùng"""
+        self._local_version += 1
+    
+    def data_fingerprint(self) -> str:
+        """
+        Băm các cột số của ảnh chụp, tính lại một lần cho mỗi phiên bản dữ liệu
+        
+        Gồm ngày, số tiền, mã loại/danh mục (kèm tên) theo thứ tự dòng - đúng
+        những gì các phân tích được lưu trên đĩa sử dụng; băm bằng tobytes()
+        thay vì duyệt từng giao dịch.
+        """
+        version = self.data_version
+        if self._fingerprint[0] != version:
+            snapshot = self.snapshot()
+            digest = hashlib.sha1(repr((snapshot.types, snapshot.categories)).encode("utf-8"))
+            for column in (snapshot.ordinal, snapshot.amount_minor, snapshot.type_code, snapshot.category_code):
+                digest.update(column.tobytes())
+            self._fingerprint = (version, digest.hexdigest())
+        return self._fingerprint[1]
+        
+    def live_statistics(self, category: str = None, kind: str = None) -> Dict[str, Any]:
+        """
+        Thống kê trực tuyến (Welford, phân vị sketch, EMA) không cần tính lại toàn bộ
+        
+        Khi gắn với TransactionManager, thống kê được duy trì O(1) theo từng
+        thay đổi; nếu không, được dựng một lần cho mỗi phiên bản dữ liệu.
+        
+        Args:
+            category: Tên danh mục
+            kind: "income" hoặc "expense"
+        """
+        if self.manager is not None:
+            return self.manager.statistics.summary(category=category, kind=kind)
+        return self._statistics().summary(category=category, kind=kind)
+    
+    def snapshot(self) -> DatasetSnapshot:
+        """
+        Ảnh chụp dạng cột của dữ liệu, dùng chung cho mọi phân tích
+        
+        Khi gắn với TransactionManager, dùng ảnh chụp chung của manager (cũng
+        được báo cáo và ngân sách sử dụng); nếu không, dựng một lần cho mỗi
+        phiên bản dữ liệu.
+        """
+        if self.manager is not None and self._local_version == 0:
+            return self.manager.snapshot()
+        return self._own_snapshot()
+    
+    @cached_method(ttl_seconds=None, maxsize=1)
+    def _own_snapshot(self) -> DatasetSnapshot:
+        """Ảnh chụp dựng từ danh sách giao dịch của instance"""
+        return DatasetSnapshot(self.transactions, version=self.data_version)
+    
+    @cached_method(ttl_seconds=None, maxsize=1)
+    def _statistics(self) -> OnlineStatistics:
+        """Thống kê trực tuyến dựng từ danh sách giao dịch"""
+        return OnlineStatistics(self.transactions)
+    
+    @cached_method(ttl_seconds=None)
+    @persisted_result
     def analyze_spending_patterns(self) -> Dict[str, Any]:
         """Phân tích mẫu chi tiêu với numpy để tối ưu hiệu suất"""
         if not self.transactions:
             return {}
             
-        # Chuyển đổi dữ liệu sang numpy array để tính toán nhanh hơn
-        amounts = np.array([t.amount for t in self.transactions])
-        dates = np.array([datetime.strptime(t.date, "%d/%m/%Y").timestamp() for t in self.transactions])
-        categories = np.array([t.category for t in self.transactions])
+        snapshot = self.snapshot()
+        amounts = snapshot.amount
         
-        # Tính toán thống kê cơ bản
-        total = np.sum(amounts)
+        # Tính toán thống kê cơ bản (tổng cộng chính xác theo đơn vị nhỏ nhất)
+        total = snapshot.sum_minor() / MINOR_PER_UNIT
         mean = np.mean(amounts)
         median = np.median(amounts)
         std_dev = np.std(amounts)
@@ -36,7 +162,7 @@ class TransactionAnalytics:
         outliers = amounts[(amounts < lower_bound) | (amounts > upper_bound)]
         
         # Phân tích xu hướng theo thời gian
-        sorted_indices = np.argsort(dates)
+        sorted_indices = np.argsort(snapshot.ordinal, kind="stable")
         sorted_amounts = amounts[sorted_indices]
         
         # Tính moving average để làm mịn dữ liệu
@@ -44,8 +170,9 @@ class TransactionAnalytics:
         moving_avg = np.convolve(sorted_amounts, np.ones(window_size)/window_size, mode='valid')
         
         # Phân tích theo danh mục
-        unique_categories, category_counts = np.unique(categories, return_counts=True)
-        category_totals = {cat: np.sum(amounts[categories == cat]) for cat in unique_categories}
+        totals_by_code = sum_by_group(snapshot.category_code, snapshot.amount_minor,
+                                      len(snapshot.categories)) / MINOR_PER_UNIT
+        category_totals = dict(zip(snapshot.categories, totals_by_code.tolist()))
         
         # Tính tỷ lệ tăng trưởng
         if len(sorted_amounts) >= 2:
@@ -64,133 +191,309 @@ class TransactionAnalytics:
             'growth_rate': float(growth_rate)
         }
         
-    @cached_method(ttl_seconds=300)
-    def predict_future_spending(self, days_ahead: int = 30) -> Dict[str, Any]:
-        """Dự đoán chi tiêu tương lai sử dụng linear regression"""
+    @cached_method(ttl_seconds=None)
+    @persisted_result
+    def predict_future_spending(self, days_ahead: int = 30, freq: str = "day",
+                                seasonality: bool = True) -> Dict[str, Any]:
+        """
+        Dự đoán chi tiêu tương lai bằng hồi quy tuyến tính trên chuỗi thời gian
+        
+        Chi tiêu được cộng thành chuỗi liên tục theo ngày hoặc tháng (kỳ trống
+        bằng 0), rồi khớp xu hướng tuyến tính cùng thành phần mùa vụ bằng
+        lstsq. Tổng chi tiêu và từng danh mục được giải chung trong một lần.
+        
+        Args:
+            days_ahead: Số kỳ cần dự đoán (ngày hoặc tháng theo freq)
+            freq: "day" hoặc "month"
+            seasonality: Thêm chu kỳ tháng (freq="day") hoặc chu kỳ năm (freq="month")
+        """
         if not self.transactions or days_ahead <= 0:
             return {}
-            
-        # Chuẩn bị dữ liệu
-        dates = np.array([datetime.strptime(t.date, "%d/%m/%Y").timestamp() for t in self.transactions])
-        amounts = np.array([t.amount for t in self.transactions])
+        if freq not in FORECAST_PERIODS:
+            raise ValueError(f"Tần suất không hợp lệ: {freq}")
         
-        # Chuẩn hóa dữ liệu thời gian
-        min_date = dates.min()
-        dates = (dates - min_date) / (24 * 3600)  # Chuyển đổi sang số ngày
+        snapshot = self.snapshot()
+        mask = snapshot.is_expense & (snapshot.ordinal >= 0)
+        if not mask.any():
+            return {}
         
-        # Thêm bias term
-        X = np.column_stack([np.ones_like(dates), dates])
+        # Cộng chi tiêu thành chuỗi liên tục: cột 0 là tổng, các cột sau theo danh mục
+        periods = self._period_keys(snapshot.ordinal[mask], freq)
+        first = int(periods.min())
+        index = periods - first
+        n = int(index.max()) + 1
+        codes = snapshot.category_code[mask]
+        used = np.unique(codes)
+        n_categories = len(snapshot.categories)
+        by_category = sum_by_group(index * n_categories + codes, snapshot.amount_minor[mask],
+                                   n * n_categories).reshape(n, n_categories)[:, used] / MINOR_PER_UNIT
+        series = np.column_stack([by_category.sum(axis=1), by_category])
         
-        # Linear regression với numpy
-        try:
-            # Giải hệ phương trình tuyến tính
-            coefficients = np.linalg.solve(X.T @ X, X.T @ amounts)
-            
-            # Dự đoán cho ngày tiếp theo
-            future_days = np.arange(len(dates), len(dates) + days_ahead)
-            future_X = np.column_stack([np.ones_like(future_days), future_days])
-            predictions = future_X @ coefficients
-            
-            # Tính độ tin cậy
-            y_pred = X @ coefficients
-            mse = np.mean((amounts - y_pred) ** 2)
-            rmse = np.sqrt(mse)
-            confidence = 1 / (1 + rmse / np.mean(amounts))
-            
+        # Ma trận thiết kế: hệ số chặn, xu hướng và (tùy chọn) cặp sin/cos theo chu kỳ
+        cycle = FORECAST_PERIODS[freq]
+        use_seasonality = seasonality and n >= 2 * cycle
+        
+        def design(steps: np.ndarray) -> np.ndarray:
+            parts = [np.ones(len(steps)), steps.astype(np.float64)]
+            if use_seasonality:
+                angle = 2 * np.pi * (steps + first) / cycle
+                parts += [np.sin(angle), np.cos(angle)]
+            return np.column_stack(parts)
+        
+        history = np.arange(n)
+        future = np.arange(n, n + days_ahead)
+        coefficients = np.linalg.lstsq(design(history), series, rcond=None)[0]
+        fitted = design(history) @ coefficients
+        forecast = design(future) @ coefficients
+        
+        mse = np.mean((series - fitted) ** 2, axis=0)
+        mean = series.mean(axis=0)
+        confidence = np.divide(1, 1 + np.sqrt(mse) / mean, out=np.zeros_like(mean), where=mean > 0)
+        
+        if freq == "day":
+            labels = [date.fromordinal(first + int(step)).strftime("%d/%m/%Y") for step in future]
+        else:
+            labels = [f"{(first + int(step)) % 12 + 1:02d}/{(first + int(step)) // 12 + 1970}" for step in future]
+        
+        def result(column: int) -> Dict[str, Any]:
             return {
-                'predictions': predictions.tolist(),
-                'confidence': float(confidence),
-                'mse': float(mse),
-                'trend': float(coefficients[1])  # Hệ số góc cho biết xu hướng
+                'predictions': forecast[:, column].tolist(),
+                'confidence': float(confidence[column]),
+                'mse': float(mse[column]),
+                'trend': float(coefficients[1, column])  # Hệ số góc cho biết xu hướng mỗi kỳ
             }
-            
-        except np.linalg.LinAlgError:
-            # Fallback khi không thể thực hiện linear regression
-            return {
-                'predictions': [float(np.mean(amounts))] * days_ahead,
-                'confidence': 0.5,
-                'mse': float(np.var(amounts)),
-                'trend': 0.0
+        
+        prediction = result(0)
+        prediction.update({
+            'periods': labels,
+            'frequency': freq,
+            'seasonality': use_seasonality,
+            'categories': {
+                snapshot.categories[code]: result(position + 1)
+                for position, code in enumerate(used.tolist())
             }
+        })
+        return prediction
+        
+    @cached_method(ttl_seconds=None)
+    def detect_anomalies(self, method: str = "zscore", threshold: float = 2.0,
+                         window: int = None) -> List[Dict[str, Any]]:
+        """
+        Phát hiện giao dịch bất thường theo từng danh mục
         
-    @cached_method(ttl_seconds=300)
-    def detect_anomalies(self) -> List[Dict[str, Any]]:
-        """Phát hiện giao dịch bất thường sử dụng Z-score và phân tích theo danh mục"""
+        Giao dịch được sắp xếp theo mã danh mục một lần; tâm và độ phân tán
+        của từng nhóm tính bằng reduceat, mọi dòng được chấm điểm trong một
+        lượt vector và chỉ các dòng bị đánh dấu mới được chuyển thành dict.
+        
+        Args:
+            method: "zscore" (trung bình/độ lệch chuẩn) hoặc "mad" (trung vị/MAD)
+            threshold: Ngưỡng |điểm| để coi là bất thường (2 ~ 95% confidence)
+            window: Nếu có, so mỗi giao dịch với `window` giao dịch trước đó
+                    cùng danh mục theo thời gian (tâm/độ phân tán theo method)
+        """
         if not self.transactions:
             return []
-            
-        # Chuyển đổi dữ liệu sang numpy array
-        amounts = np.array([t.amount for t in self.transactions])
-        categories = np.array([t.category for t in self.transactions])
+        if method not in ANOMALY_METHODS:
+            raise ValueError(f"Phương pháp không hợp lệ: {method}")
         
-        # Tính Z-score cho mỗi giao dịch
-        mean = np.mean(amounts)
-        std = np.std(amounts)
-        z_scores = (amounts - mean) / std if std > 0 else np.zeros_like(amounts)
-        
-        # Phân tích theo danh mục
+        snapshot = self.snapshot()
         anomalies = []
-        for category in np.unique(categories):
-            cat_mask = categories == category
-            cat_amounts = amounts[cat_mask]
-            
-            if len(cat_amounts) >= 2:
-                cat_mean = np.mean(cat_amounts)
-                cat_std = np.std(cat_amounts)
-                cat_z_scores = (cat_amounts - cat_mean) / cat_std if cat_std > 0 else np.zeros_like(cat_amounts)
-                
-                # Phát hiện anomaly dựa trên Z-score
-                for i, (t, z) in enumerate(zip(np.array(self.transactions)[cat_mask], cat_z_scores)):
-                    if abs(z) > 2:  # Ngưỡng Z-score = 2 (95% confidence)
-                        anomalies.append({
-                            'transaction': t.to_dict(),
-                            'z_score': float(z),
-                            'category_mean': float(cat_mean),
-                            'category_std': float(cat_std),
-                            'deviation_percent': float((t.amount - cat_mean) / cat_mean * 100)
-                        })
-        
-        return sorted(anomalies, key=lambda x: abs(x['z_score']), reverse=True)
-        
-    @cached_method(ttl_seconds=300)
-    def analyze_category_correlations(self) -> Dict[str, Any]:
-        """Phân tích mối tương quan giữa các danh mục chi tiêu"""
+        for row, score, mean, spread in self._score_anomalies(method=method, threshold=threshold, window=window):
+            t = snapshot.transactions[row]
+            anomalies.append({
+                'transaction': t.to_dict(),
+                'z_score': score,
+                'category_mean': mean,
+                'category_std': spread,
+                'deviation_percent': float((t.amount - mean) / mean * 100) if mean else 0.0
+            })
+        return anomalies
+    
+    @persisted_result
+    def _score_anomalies(self, method: str, threshold: float,
+                         window: Optional[int]) -> List[Tuple[int, float, float, float]]:
+        """
+        Chấm điểm và chọn các dòng bất thường, theo |điểm| giảm dần
+        
+        Chỉ dùng các cột số của ảnh chụp nên kết quả được lưu trên đĩa theo
+        data_fingerprint(); mô tả và thời điểm tạo được lấy lại từ ảnh chụp.
+        
+        Returns:
+            List[Tuple]: (vị trí dòng trong ảnh chụp, điểm, tâm, độ phân tán)
+        """
+        snapshot = self.snapshot()
+        if window:
+            order, center, scale = self._rolling_scores(snapshot, window, method)
+        else:
+            order, center, scale = self._grouped_scores(snapshot, method)
+        
+        amounts = snapshot.amount[order]
+        scores = np.divide(amounts - center, scale, out=np.zeros_like(amounts), where=scale > 0)
+        flagged = np.flatnonzero(np.abs(scores) > threshold)
+        flagged = flagged[np.argsort(-np.abs(scores[flagged]), kind="stable")]
+        return [(int(order[position]), float(scores[position]), float(center[position]), float(scale[position]))
+                for position in flagged.tolist()]
+    
+    @staticmethod
+    def _grouped_scores(snapshot: DatasetSnapshot, method: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Tâm và độ phân tán của danh mục cho từng dòng (đã sắp xếp theo danh mục)
+        
+        Returns:
+            Tuple: (thứ tự dòng gốc, tâm, độ phân tán); nhóm dưới 2 giao dịch có độ phân tán 0
+        """
+        codes = snapshot.category_code
+        amounts = snapshot.amount
+        if method == "mad":
+            order = np.lexsort((amounts, codes))
+        else:
+            order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        sorted_amounts = amounts[order]
+        
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        counts = np.diff(np.r_[starts, len(sorted_codes)])
+        
+        if method == "mad":
+            # Trung vị trong nhóm đã sắp xếp theo số tiền, MAD chuẩn hóa về độ lệch chuẩn
+            middle = (sorted_amounts[starts + (counts - 1) // 2] + sorted_amounts[starts + counts // 2]) / 2
+            center = np.repeat(middle, counts)
+            deviations = np.abs(sorted_amounts - center)
+            deviation_order = np.lexsort((deviations, sorted_codes))
+            sorted_deviations = deviations[deviation_order]
+            mad = (sorted_deviations[starts + (counts - 1) // 2] + sorted_deviations[starts + counts // 2]) / 2
+            spread = 1.4826 * mad
+        else:
+            center = np.repeat(np.add.reduceat(sorted_amounts, starts) / counts, counts)
+            spread = np.sqrt(np.add.reduceat((sorted_amounts - center) ** 2, starts) / counts)
+        
+        spread[counts < 2] = 0
+        return order, center, np.repeat(spread, counts)
+    
+    @staticmethod
+    def _rolling_scores(snapshot: DatasetSnapshot, window: int,
+                        method: str = "zscore") -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Tâm và độ phân tán của `window` giao dịch trước đó cùng danh mục
+        
+        Cả hai phương pháp dùng ma trận (n, window) các giá trị trước đó:
+        "zscore" lấy trung bình/độ lệch chuẩn (nanmean/nanstd tính độ lệch
+        so với trung bình của chính cửa sổ nên không mất độ chính xác),
+        "mad" lấy trung vị/MAD.
+        
+        Returns:
+            Tuple: (thứ tự dòng gốc, tâm, độ phân tán); dòng có ít hơn 2 giao dịch trước đó có độ phân tán 0
+        """
+        codes = snapshot.category_code
+        order = np.lexsort((snapshot.ordinal, codes))
+        sorted_codes = codes[order]
+        sorted_amounts = snapshot.amount[order]
+        n = len(order)
+        
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        counts = np.diff(np.r_[starts, n])
+        group_start = np.repeat(starts, counts)
+        
+        positions = np.arange(n)
+        low = np.maximum(group_start, positions - window)
+        size = positions - low
+        
+        # Hàng i chứa `window` giá trị ngay trước i, NaN ở các ô ngoài nhóm
+        lags = positions[:, None] - np.arange(window, 0, -1)[None, :]
+        previous = np.where(lags >= low[:, None], sorted_amounts[np.maximum(lags, 0)], np.nan)
+        previous[size == 0] = 0  # Tránh cảnh báo thống kê của hàng toàn NaN
+        
+        if method == "mad":
+            center = np.nanmedian(previous, axis=1)
+            spread = 1.4826 * np.nanmedian(np.abs(previous - center[:, None]), axis=1)
+        else:
+            center = np.nanmean(previous, axis=1)
+            spread = np.nanstd(previous, axis=1)
+        spread[size < 2] = 0
+        return order, center, spread
+    
+    @staticmethod
+    def _period_keys(ordinals: np.ndarray, freq: str) -> np.ndarray:
+        """
+        Khóa kỳ theo thời gian cho mảng ordinal
+        
+        Args:
+            ordinals: Mảng ordinal ngày
+            freq: "day", "week" (ordinal thứ Hai đầu tuần) hoặc "month" (năm*12 + tháng)
+        """
+        if freq == "day":
+            return ordinals
+        if freq == "week":
+            return ordinals - (ordinals - 1) % 7
+        if freq == "month":
+            return (ordinals - EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        raise ValueError(f"Tần suất không hợp lệ: {freq}")
+    
+    @staticmethod
+    def _correlation_matrix(matrix: np.ndarray) -> np.ndarray:
+        """
+        Ma trận tương quan Pearson giữa các cột, không sinh NaN
+        
+        Cột có phương sai bằng 0 có tương quan 0 với các cột khác và 1 với chính nó.
+        """
+        centered = matrix - matrix.mean(axis=0)
+        covariance = centered.T @ centered
+        std = np.sqrt(np.diag(covariance))
+        scale = np.outer(std, std)
+        correlation = np.divide(covariance, scale, out=np.zeros_like(covariance), where=scale > 0)
+        np.fill_diagonal(correlation, 1.0)
+        return np.clip(correlation, -1.0, 1.0)
+    
+    @cached_method(ttl_seconds=None)
+    @persisted_result
+    def analyze_category_correlations(self, freq: str = "day") -> Dict[str, Any]:
+        """
+        Phân tích mối tương quan giữa các danh mục chi tiêu
+        
+        Ma trận kỳ × danh mục được dựng bằng mã hóa vector (np.unique +
+        np.add.at) trên các kỳ có giao dịch, theo thứ tự thời gian.
+        
+        Args:
+            freq: Kỳ tổng hợp "day", "week" hoặc "month"
+        """
         if not self.transactions:
             return {}
-            
-        # Tạo ma trận tương quan giữa các danh mục
-        categories = list(set(t.category for t in self.transactions))
-        n_categories = len(categories)
-        cat_to_idx = {cat: i for i, cat in enumerate(categories)}
         
-        # Tạo ma trận số tiền theo danh mục và thời gian
-        dates = sorted(set(t.date for t in self.transactions))
-        amount_matrix = np.zeros((len(dates), n_categories))
+        snapshot = self.snapshot()
+        valid = snapshot.ordinal >= 0
+        categories = list(snapshot.categories)
+        n_categories = len(categories)
         
-        for t in self.transactions:
-            date_idx = dates.index(t.date)
-            cat_idx = cat_to_idx[t.category]
-            amount_matrix[date_idx, cat_idx] += t.amount
+        # Mã hóa kỳ: np.unique sắp xếp khóa số nên hàng theo thứ tự thời gian
+        periods, period_codes = np.unique(
+            self._period_keys(snapshot.ordinal[valid], freq), return_inverse=True
+        )
+        amount_matrix = sum_by_group(
+            period_codes * n_categories + snapshot.category_code[valid], snapshot.amount_minor[valid],
+            len(periods) * n_categories
+        ).reshape(len(periods), n_categories) / MINOR_PER_UNIT
         
         # Tính ma trận tương quan
-        correlation_matrix = np.corrcoef(amount_matrix.T)
+        correlation_matrix = self._correlation_matrix(amount_matrix)
         
         # Tìm các cặp danh mục có tương quan mạnh
-        strong_correlations = []
-        for i in range(n_categories):
-            for j in range(i + 1, n_categories):
-                corr = correlation_matrix[i, j]
-                if abs(corr) > 0.5:  # Ngưỡng tương quan 0.5
-                    strong_correlations.append({
-                        'category1': categories[i],
-                        'category2': categories[j],
-                        'correlation': float(corr)
-                    })
+        upper_i, upper_j = np.triu_indices(n_categories, k=1)
+        strong = np.abs(correlation_matrix[upper_i, upper_j]) > 0.5  # Ngưỡng tương quan 0.5
+        strong_correlations = [
+            {
+                'category1': categories[i],
+                'category2': categories[j],
+                'correlation': float(correlation_matrix[i, j])
+            }
+            for i, j in zip(upper_i[strong].tolist(), upper_j[strong].tolist())
+        ]
         
         return {
             'correlation_matrix': correlation_matrix.tolist(),
             'categories': categories,
-            'strong_correlations': strong_correlations
+            'strong_correlations': strong_correlations,
+            'frequency': freq,
+            'period_count': int(len(periods))
         }
         
     def get_insights(self) -> List[Dict[str, Any]]:
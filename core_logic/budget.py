@@ -4,7 +4,11 @@ from datetime import datetime
 from typing import List, Dict, Any, Tuple
 from storage.file_handler import FileHandler
 from utils.validators import validate_budget_amount, validate_month_year, validate_category
+from utils.money import from_minor, to_minor
 from config import DEFAULT_CATEGORIES, REPORT_CONFIG
+from core_logic.report_engine import EXPENSE_TYPES
+from core_logic.snapshot import DatasetSnapshot
+from core_logic.budget_alerts import STATUS_LABELS, UNSET, SAFE, WARNING, EXCEEDED, budget_level
 
 
 class BudgetManager:
@@ -14,6 +18,25 @@ class BudgetManager:
         self.file_handler = FileHandler()
         self.warning_threshold = REPORT_CONFIG["budget_warning_threshold"]
     
+    @property
+    def data_version(self) -> Tuple[int, int, int, int]:
+        """
+        Phiên bản dữ liệu ngân sách: số lần ghi trong tiến trình, inode,
+        thời điểm sửa và kích thước file
+        
+        Mọi thay đổi (kể cả từ BudgetDialog gọi trực tiếp) đều ghi file
+        nên token này đổi theo, dùng làm khóa cache an toàn. Bộ đếm ghi bắt
+        được cả lần sửa cùng kích thước trong cùng độ phân giải mtime (inode
+        có thể được dùng lại sau os.replace nên không đủ một mình); inode và
+        mtime bắt thay đổi từ tiến trình khác.
+        """
+        writes = self.file_handler.budget_writes
+        try:
+            stat = self.file_handler.budget_file.stat()
+            return writes, stat.st_ino, stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return writes, 0, 0, 0
+    
     def set_budget(self, category: str, amount: float, month_year: str = None) -> Tuple[bool, str]:
         """
         Đặt ngân sách cho một danh mục
@@ -112,55 +135,128 @@ class BudgetManager:
             month_year = datetime.now().strftime("%m/%Y")
         
         try:
-            budgets = self.file_handler.load_budgets()
+            result = self.file_handler.update_budgets(deletes=[(category, month_year)])
             
-            # Tìm và xóa budget
-            updated_budgets = []
-            found = False
-            for budget in budgets:
-                if budget["category"] == category and budget["month_year"] == month_year:
-                    found = True
-                    continue  # Bỏ qua budget này (xóa nó)
-                updated_budgets.append(budget)
-            
-            if found:
-                success = self.file_handler._save_all_budgets(updated_budgets)
-                if success:
-                    return True, f"Đã xóa ngân sách cho '{category}' tháng {month_year}"
-                else:
-                    return False, "Không thể lưu thay đổi!"
-            else:
-                return False, f"Không tìm thấy ngân sách cho '{category}' tháng {month_year}"
+            if result is None:
+                return False, "Không thể lưu thay đổi!"
+            if result["deleted"]:
+                return True, f"Đã xóa ngân sách cho '{category}' tháng {month_year}"
+            return False, f"Không tìm thấy ngân sách cho '{category}' tháng {month_year}"
                 
         except Exception as e:
             return False, f"Lỗi khi xóa ngân sách: {e}"
     
+    def apply_budget_changes(self, upserts: List[Tuple[str, float, str]] = None,
+                             deletes: List[Tuple[str, str]] = None) -> Tuple[bool, str]:
+        """
+        Thêm/cập nhật và xóa nhiều ngân sách trong một lần ghi file
+        
+        Toàn bộ lô được kiểm tra trước; chỉ cần một mục không hợp lệ thì
+        không có thay đổi nào được ghi.
+        
+        Args:
+            upserts: Các bộ (danh mục, số tiền, tháng/năm) cần đặt
+            deletes: Các bộ (danh mục, tháng/năm) cần xóa
+            
+        Returns:
+            Tuple[bool, str]: (success, message)
+        """
+        upserts = upserts or []
+        deletes = deletes or []
+        
+        for category, amount, month_year in upserts:
+            for is_valid, error_msg in (validate_category(category, "Chi tiêu"),
+                                        validate_budget_amount(amount),
+                                        validate_month_year(month_year)):
+                if not is_valid:
+                    return False, f"{category} ({month_year}): {error_msg}"
+        
+        result = self.file_handler.update_budgets(
+            upserts=[(category, float(amount), month_year) for category, amount, month_year in upserts],
+            deletes=deletes
+        )
+        if result is None:
+            return False, "Không thể lưu thay đổi ngân sách!"
+        return True, f"Đã cập nhật {result['upserted']} và xóa {result['deleted']} ngân sách"
+    
+    def delete_budgets(self, categories: List[str], month_year: str = None) -> Tuple[bool, str]:
+        """
+        Xóa ngân sách của nhiều danh mục trong một tháng bằng một lần ghi file
+        
+        Args:
+            categories: Các danh mục cần xóa
+            month_year: Tháng/năm (MM/YYYY)
+            
+        Returns:
+            Tuple[bool, str]: (success, message), success là False nếu không có gì để xóa
+        """
+        if month_year is None:
+            month_year = datetime.now().strftime("%m/%Y")
+        
+        result = self.file_handler.update_budgets(deletes=[(category, month_year) for category in categories])
+        if result is None:
+            return False, "Không thể lưu thay đổi!"
+        if not result["deleted"]:
+            return False, "Không có ngân sách nào để xóa!"
+        return True, f"Đã xóa {result['deleted']} ngân sách!"
+    
     def calculate_spent_amount(self, transactions: List[Any], category: str, month_year: str) -> float:
         """
         Tính tổng chi tiêu của một danh mục trong tháng
         
         Args:
-            transactions: Danh sách giao dịch
+            transactions: Danh sách giao dịch hoặc DatasetSnapshot
             category: Danh mục
             month_year: Tháng/năm (MM/YYYY)
             
         Returns:
             float: Tổng chi tiêu
         """
-        total = 0.0
+        return self.spent_by_category(transactions, month_year).get(category, 0.0)
+    
+    @staticmethod
+    def spent_by_category(transactions: List[Any], month_year: str) -> Dict[str, float]:
+        """
+        Tính tổng chi tiêu của mọi danh mục trong tháng trong một lần duyệt
+        
+        Args:
+            transactions: Danh sách giao dịch hoặc DatasetSnapshot (tính bằng mảng NumPy)
+            month_year: Tháng/năm (MM/YYYY)
+            
+        Returns:
+            Dict[str, float]: {danh mục: tổng chi tiêu}
+        """
+        if isinstance(transactions, DatasetSnapshot):
+            return transactions.spent_by_category(month_year)
+        
+        # Cộng theo đơn vị nhỏ nhất rồi mới đổi sang đồng
+        totals: Dict[str, int] = {}
         for transaction in transactions:
-            if (hasattr(transaction, 'type') and transaction.type == "Chi tiêu" and
-                hasattr(transaction, 'category') and transaction.category == category and
+            if (hasattr(transaction, 'type') and transaction.type in EXPENSE_TYPES and
+                hasattr(transaction, 'category') and
                 hasattr(transaction, 'get_month_year') and transaction.get_month_year() == month_year):
-                total += transaction.amount
-        return total
+                totals[transaction.category] = totals.get(transaction.category, 0) + transaction.amount_minor
+        return {category: from_minor(total) for category, total in totals.items()}
+    
+    def status_label(self, spent_amount: float, budget_amount: float) -> str:
+        """
+        Nhãn trạng thái ngân sách, tính theo đơn vị nhỏ nhất như BudgetAlertEngine
+        
+        Args:
+            spent_amount: Số đã chi (đồng)
+            budget_amount: Ngân sách (đồng), 0 nếu chưa đặt
+            
+        Returns:
+            str: Một trong STATUS_LABELS
+        """
+        return STATUS_LABELS[budget_level(to_minor(spent_amount), to_minor(budget_amount), self.warning_threshold)]
     
     def get_budget_status(self, transactions: List[Any], category: str, month_year: str = None) -> Dict[str, Any]:
         """
         Lấy trạng thái ngân sách của một danh mục
         
         Args:
-            transactions: Danh sách giao dịch
+            transactions: Danh sách giao dịch hoặc DatasetSnapshot
             category: Danh mục  
             month_year: Tháng/năm (MM/YYYY)
             
@@ -175,17 +271,8 @@ class BudgetManager:
         remaining = budget_amount - spent_amount
         
         # Xác định trạng thái
-        if budget_amount == 0:
-            status = "Chưa đặt"
-            percentage = 0
-        else:
-            percentage = (spent_amount / budget_amount) * 100
-            if spent_amount > budget_amount:
-                status = "Vượt quá"
-            elif spent_amount > budget_amount * self.warning_threshold:
-                status = "Cảnh báo"
-            else:
-                status = "An toàn"
+        status = self.status_label(spent_amount, budget_amount)
+        percentage = (spent_amount / budget_amount) * 100 if budget_amount > 0 else 0
         
         return {
             "category": category,
@@ -202,7 +289,7 @@ class BudgetManager:
         Lấy trạng thái ngân sách của tất cả danh mục
         
         Args:
-            transactions: Danh sách giao dịch
+            transactions: Danh sách giao dịch hoặc DatasetSnapshot
             month_year: Tháng/năm (MM/YYYY)
             
         Returns:
@@ -218,27 +305,21 @@ class BudgetManager:
         # Lấy tất cả ngân sách đã đặt cho tháng này
         current_budgets = self.get_all_budgets(month_year)
         
+        # Chi tiêu của mọi danh mục trong tháng, tính một lần
+        spent_by_category = self.spent_by_category(transactions, month_year)
+        
         # Lấy chi tiêu cho từng danh mục
         for category in all_expense_categories:
             # Lấy ngân sách nếu có
             budget_amount = current_budgets.get(category, 0.0)
             
             # Tính toán chi tiêu
-            spent_amount = self.calculate_spent_amount(transactions, category, month_year)
+            spent_amount = spent_by_category.get(category, 0.0)
             remaining = budget_amount - spent_amount
             
             # Xác định trạng thái
-            if budget_amount == 0:
-                status = "Chưa đặt"
-                percentage = 0
-            else:
-                percentage = (spent_amount / budget_amount) * 100
-                if spent_amount > budget_amount:
-                    status = "Vượt quá"
-                elif spent_amount > budget_amount * self.warning_threshold:
-                    status = "Cảnh báo"
-                else:
-                    status = "An toàn"
+            status = self.status_label(spent_amount, budget_amount)
+            percentage = (spent_amount / budget_amount) * 100 if budget_amount > 0 else 0
             
             # Thêm vào danh sách trạng thái
             statuses.append({
@@ -258,7 +339,7 @@ class BudgetManager:
         Kiểm tra các cảnh báo ngân sách
         
         Args:
-            transactions: Danh sách giao dịch
+            transactions: Danh sách giao dịch hoặc DatasetSnapshot
             month_year: Tháng/năm (MM/YYYY)
             
         Returns:
@@ -268,7 +349,7 @@ class BudgetManager:
         statuses = self.get_all_budget_status(transactions, month_year)
         
         for status in statuses:
-            if status["status"] in ["Cảnh báo", "Vượt quá"] and status["budget"] > 0:
+            if status["status"] in (STATUS_LABELS[WARNING], STATUS_LABELS[EXCEEDED]) and status["budget"] > 0:
                 warnings.append(status)
         
         return warnings
@@ -278,7 +359,7 @@ class BudgetManager:
         Lấy tóm tắt ngân sách tổng thể
         
         Args:
-            transactions: Danh sách giao dịch
+            transactions: Danh sách giao dịch hoặc DatasetSnapshot
             month_year: Tháng/năm (MM/YYYY)
             
         Returns:
@@ -294,7 +375,7 @@ class BudgetManager:
         total_remaining = total_budget - total_spent
         
         # Đếm số danh mục theo trạng thái
-        status_counts = {"An toàn": 0, "Cảnh báo": 0, "Vượt quá": 0, "Chưa đặt": 0}
+        status_counts = {STATUS_LABELS[level]: 0 for level in (SAFE, WARNING, EXCEEDED, UNSET)}
         for status in statuses:
             status_counts[status["status"]] += 1
         
@@ -313,7 +394,7 @@ class BudgetManager:
         Đề xuất điều chỉnh ngân sách
         
         Args:
-            transactions: Danh sách giao dịch
+            transactions: Danh sách giao dịch hoặc DatasetSnapshot
             month_year: Tháng/năm (MM/YYYY)
             
         Returns:
@@ -339,7 +420,7 @@ class BudgetManager:
                     "suggested_amount": suggested_budget,
                     "reason": f"Đề xuất đặt ngân sách vì đã chi tiêu {spent:,.0f} VNĐ"
                 })
-            elif status["status"] == "Vượt quá":
+            elif status["status"] == STATUS_LABELS[EXCEEDED]:
                 # Đề xuất tăng ngân sách cho danh mục vượt quá
                 suggested_budget = spent * 1.1  # 110% chi tiêu hiện tại
                 suggestions.append({
@@ -380,25 +461,18 @@ class BudgetManager:
             
             prev_month_year = f"{prev_month:02d}/{prev_year}"
             
-            # Lấy ngân sách tháng trước
-            prev_budgets = self.get_all_budgets(prev_month_year)
-            
-            if not prev_budgets:
-                return False, f"Không có ngân sách nào trong tháng {prev_month_year}"
+            # Đọc ngân sách tháng trước và ghi sang tháng hiện tại trong một lần đọc-ghi
+            def copy_previous(budgets: List[Dict[str, Any]]) -> List[Tuple[str, float, str]]:
+                return [(budget["category"], budget["amount"], current_month_year)
+                        for budget in budgets if budget["month_year"] == prev_month_year]
             
-            # Copy sang tháng hiện tại
-            success_count = 0
-            for category, amount in prev_budgets.items():
-                success, _ = self.set_budget(category, amount, current_month_year)
-                if success:
-                    success_count += 1
+            result = self.file_handler.update_budgets(derive_upserts=copy_previous)
             
-            if success_count == len(prev_budgets):
-                return True, f"Đã copy {success_count} ngân sách từ tháng {prev_month_year} sang tháng {current_month_year}"
-            elif success_count > 0:
-                return True, f"Đã copy {success_count}/{len(prev_budgets)} ngân sách từ tháng {prev_month_year} sang tháng {current_month_year}"
-            else:
+            if result is None:
                 return False, "Không thể copy ngân sách nào"
+            if not result["upserted"]:
+                return False, f"Không có ngân sách nào trong tháng {prev_month_year}"
+            return True, f"Đã copy {result['upserted']} ngân sách từ tháng {prev_month_year} sang tháng {current_month_year}"
                 
         except Exception as e:
             return False, f"Lỗi khi copy ngân sách: {e}"
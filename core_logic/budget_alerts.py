@@ -0,0 +1,146 @@
+#Cảnh báo ngân sách tăng dần khi thêm giao dịch
+
+from typing import Dict, Any, Tuple, Optional, Iterable
+from config import REPORT_CONFIG
+from core_logic.report_engine import ReportCube, EXPENSE_TYPES
+from utils.money import to_minor, from_minor
+
+# Các mức trạng thái theo thứ tự tăng dần, dùng chung nhãn với BudgetManager
+UNSET, SAFE, WARNING, EXCEEDED = range(4)
+STATUS_LABELS = {UNSET: "Chưa đặt", SAFE: "An toàn", WARNING: "Cảnh báo", EXCEEDED: "Vượt quá"}
+
+
+def budget_level(spent: int, budget: int, warning_threshold: float) -> int:
+    """
+    Mức trạng thái của số đã chi so với ngân sách, dùng chung với BudgetManager
+
+    Args:
+        spent: Số đã chi (đơn vị nhỏ nhất)
+        budget: Ngân sách (đơn vị nhỏ nhất), <= 0 nếu chưa đặt
+        warning_threshold: Tỷ lệ chi tiêu/ngân sách bắt đầu cảnh báo
+
+    Returns:
+        int: UNSET, SAFE, WARNING hoặc EXCEEDED
+    """
+    if budget <= 0:
+        return UNSET
+    if spent > budget:
+        return EXCEEDED
+    if spent > budget * warning_threshold:
+        return WARNING
+    return SAFE
+
+
+class BudgetAlertEngine:
+    """
+    Theo dõi chi tiêu theo (tháng, danh mục) để phát cảnh báo ngân sách
+
+    Giữ bộ đếm chi tiêu và hai điểm ngưỡng (cảnh báo, vượt quá) cho mỗi
+    ngân sách, nên mỗi lần thêm giao dịch chỉ tốn O(1) và chỉ phát sự
+    kiện khi trạng thái vượt lên mức cao hơn (An toàn -> Cảnh báo ->
+    Vượt quá), thay vì đọc lại file ngân sách và quét lại giao dịch.
+    Bộ đếm và ngân sách được giữ theo đơn vị nhỏ nhất để thêm/xóa nhiều
+    lần không làm lệch tổng.
+    """
+
+    def __init__(self, warning_threshold: float = REPORT_CONFIG["budget_warning_threshold"]):
+        """
+        Args:
+            warning_threshold: Tỷ lệ chi tiêu/ngân sách bắt đầu cảnh báo
+        """
+        self.warning_threshold = warning_threshold
+        # (month_year, danh mục) -> tổng chi (đơn vị nhỏ nhất)
+        self._spent: Dict[Tuple[str, str], int] = {}
+        # (month_year, danh mục) -> ngân sách theo đơn vị nhỏ nhất
+        self._limits: Dict[Tuple[str, str], int] = {}
+        # Phiên bản dữ liệu ngân sách đã nạp (xem BudgetManager.data_version)
+        self.budget_version: Any = None
+
+    def rebuild(self, cube: ReportCube) -> None:
+        """
+        Tính lại bộ đếm chi tiêu từ khối tổng hợp (không quét giao dịch)
+
+        Args:
+            cube: Khối tổng hợp của toàn bộ giao dịch
+        """
+        self._spent = cube.expense_by_month_category()
+
+    def set_budgets(self, budgets: Iterable[Dict[str, Any]], version: Any = None) -> None:
+        """
+        Nạp lại các điểm ngưỡng từ danh sách ngân sách
+
+        Args:
+            budgets: Các dict có category, amount, month_year
+            version: Phiên bản dữ liệu ngân sách tương ứng
+        """
+        self._limits = {}
+        for budget in budgets:
+            amount = to_minor(budget["amount"])
+            if amount > 0:
+                self._limits[(budget["month_year"], budget["category"])] = amount
+        self.budget_version = version
+
+    def _level(self, key: Tuple[str, str], spent: int) -> int:
+        """Mức trạng thái của một (tháng, danh mục) với số đã chi"""
+        return budget_level(spent, self._limits.get(key, 0), self.warning_threshold)
+
+    def add(self, transaction: Any) -> Optional[Dict[str, Any]]:
+        """
+        Cộng một giao dịch và kiểm tra vượt ngưỡng - O(1)
+
+        Args:
+            transaction: Giao dịch vừa thêm
+
+        Returns:
+            Optional[Dict]: Trạng thái ngân sách (như BudgetManager.get_budget_status,
+            thêm previous_status) nếu vừa vượt lên mức cao hơn, ngược lại None
+        """
+        if transaction.type not in EXPENSE_TYPES:
+            return None
+        key = (transaction.get_month_year(), transaction.category)
+        previous = self._spent.get(key, 0)
+        spent = previous + transaction.amount_minor
+        self._spent[key] = spent
+
+        before = self._level(key, previous)
+        after = self._level(key, spent)
+        if after <= before or after < WARNING:
+            return None
+        status = self.status(*key)
+        status["previous_status"] = STATUS_LABELS[before]
+        return status
+
+    def remove(self, transaction: Any) -> None:
+        """Trừ một giao dịch đã xóa khỏi bộ đếm - O(1), không phát sự kiện"""
+        if transaction.type not in EXPENSE_TYPES:
+            return
+        key = (transaction.get_month_year(), transaction.category)
+        remaining = self._spent.get(key, 0) - transaction.amount_minor
+        if remaining > 0:
+            self._spent[key] = remaining
+        else:
+            self._spent.pop(key, None)
+
+    def status(self, month_year: str, category: str) -> Dict[str, Any]:
+        """
+        Trạng thái ngân sách hiện tại từ bộ đếm - O(1)
+
+        Args:
+            month_year: Tháng/năm (MM/YYYY)
+            category: Danh mục
+
+        Returns:
+            Dict: category, budget, spent, remaining, percentage, status, month_year
+        """
+        key = (month_year, category)
+        spent = self._spent.get(key, 0)
+        budget = self._limits.get(key, 0)
+        return {
+            "category": category,
+            "budget": from_minor(budget),
+            "spent": from_minor(spent),
+            "remaining": from_minor(budget - spent),
+            "percentage": spent / budget * 100 if budget else 0,
+            "status": STATUS_LABELS[self._level(key, spent)],
+            "month_year": month_year
+        }
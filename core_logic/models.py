@@ -1,18 +1,41 @@
-from datetime import datetime
-from typing import Dict, Any
-from config import CSV_CONFIG
+from datetime import datetime, date
+from typing import Dict, Any, Optional, Tuple
+from utils.money import to_minor, from_minor
+from utils.date_utils import new_timestamp, normalize_timestamp
 
 class Transaction:
-    """Class đại diện cho một giao dịch"""
+    """
+    Class đại diện cho một giao dịch
+    
+    Số tiền được lưu bằng số nguyên đơn vị nhỏ nhất (amount_minor) để
+    cộng dồn và so sánh chính xác; amount chỉ là giá trị float suy ra để
+    hiển thị và cho các phép tính thống kê. Timestamp là chuỗi ISO-8601
+    đến micro giây, dùng để phân biệt và sắp thứ tự các giao dịch cùng ngày.
+    """
     
     def __init__(self, date: str, transaction_type: str, category: str, 
-                 amount: float, description: str = "", timestamp: str = None):
+                 amount: float = 0.0, description: str = "", timestamp: str = None,
+                 amount_minor: int = None):
         self.date = date
         self.type = transaction_type
         self.category = category
-        self.amount = amount
+        self.amount_minor = int(amount_minor) if amount_minor is not None else to_minor(amount)
         self.description = description
-        self.timestamp = timestamp or datetime.now().strftime(CSV_CONFIG["timestamp_format"])
+        self.timestamp = normalize_timestamp(timestamp, date) if timestamp else new_timestamp()
+        
+        # Phân tích ngày một lần khi nạp giao dịch
+        self._date_source = None
+        self._date_parts = None
+        self.get_date_parts()
+    
+    @property
+    def amount(self) -> float:
+        """Số tiền theo đơn vị đồng (suy ra từ amount_minor)"""
+        return from_minor(self.amount_minor)
+    
+    @amount.setter
+    def amount(self, value: float) -> None:
+        self.amount_minor = to_minor(value)
     
     def to_dict(self) -> Dict[str, Any]:
         """Chuyển đổi transaction thành dictionary"""
@@ -22,6 +45,7 @@ class Transaction:
             "type": self.type,
             "category": self.category,
             "amount": self.amount,
+            "amount_minor": self.amount_minor,
             "description": self.description
         }
     
@@ -34,9 +58,19 @@ class Transaction:
             category=data.get("category", ""),
             amount=data.get("amount", 0.0),
             description=data.get("description", ""),
-            timestamp=data.get("timestamp")
+            timestamp=data.get("timestamp"),
+            amount_minor=data.get("amount_minor")
         )
     
+    def sort_key(self) -> Tuple[int, str]:
+        """
+        Khóa sắp xếp theo thời gian: (ordinal của ngày, timestamp)
+        
+        Ngày không hợp lệ có ordinal -1 nên đứng trước mọi ngày hợp lệ;
+        timestamp phân biệt thứ tự các giao dịch cùng ngày.
+        """
+        return (self.get_date_parts() or (-1,))[0], self.timestamp or ""
+    
     def get_month_year(self) -> str:
         """Lấy tháng/năm từ ngày giao dịch (MM/YYYY)"""
         try:
@@ -50,4 +84,24 @@ class Transaction:
         try:
             return self.date.split('/')[2]
         except (ValueError, IndexError):
-            return str(datetime.now().year) 
\ No newline at end of file
+            return str(datetime.now().year)
+    
+    def get_date_parts(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Lấy (ordinal, năm ISO, tuần ISO) của ngày giao dịch
+        
+        Kết quả được tính một lần và chỉ tính lại khi chuỗi ngày thay đổi.
+        
+        Returns:
+            Optional[Tuple[int, int, int]]: None nếu ngày không hợp lệ
+        """
+        if self._date_source != self.date:
+            self._date_source = self.date
+            try:
+                day, month, year = self.date.split('/')
+                date_obj = date(int(year), int(month), int(day))
+                iso_year, iso_week = date_obj.isocalendar()[:2]
+                self._date_parts = (date_obj.toordinal(), iso_year, iso_week)
+            except (ValueError, AttributeError):
+                self._date_parts = None
+        return self._date_parts
@@ -0,0 +1,258 @@
+#Thống kê trực tuyến cập nhật theo từng giao dịch
+
+import math
+from typing import Dict, Any, Optional, List
+from config import STATS_CONFIG
+from core_logic.report_engine import INCOME_TYPES, EXPENSE_TYPES
+
+
+class RunningMoments:
+    """
+    Trung bình và phương sai theo thuật toán Welford
+
+    Hỗ trợ cả thêm và bớt một giá trị trong O(1) mà không lưu dữ liệu gốc.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, value: float) -> None:
+        """Thêm một giá trị"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    def remove(self, value: float) -> None:
+        """Bớt một giá trị đã thêm trước đó (Welford ngược)"""
+        if self.count <= 1:
+            self.count = 0
+            self.mean = 0.0
+            self._m2 = 0.0
+            return
+        previous_mean = self.mean
+        self.count -= 1
+        self.mean = (previous_mean * (self.count + 1) - value) / self.count
+        self._m2 = max(0.0, self._m2 - (value - self.mean) * (value - previous_mean))
+
+    @property
+    def variance(self) -> float:
+        """Phương sai tổng thể (như np.var)"""
+        return self._m2 / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        """Độ lệch chuẩn tổng thể (như np.std)"""
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """
+    Sketch phân vị với sai số tương đối cố định (kiểu DDSketch)
+
+    Giá trị dương được xếp vào các bucket logarit cơ số gamma; phân vị trả
+    về có sai số tương đối không quá relative_accuracy. Khác t-digest/KLL,
+    bucket chỉ là bộ đếm nên bớt một giá trị cũng chính xác trong O(1).
+    """
+
+    def __init__(self, relative_accuracy: float = STATS_CONFIG["quantile_relative_accuracy"]):
+        """
+        Args:
+            relative_accuracy: Sai số tương đối tối đa của phân vị
+        """
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._buckets: Dict[int, int] = {}
+        self._zero_count = 0
+        self._sorted_keys: Optional[List[int]] = None
+        self.count = 0
+
+    def key(self, value: float) -> Optional[int]:
+        """Chỉ số bucket chứa giá trị, None với bucket 0"""
+        if value <= 0:
+            return None
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def add(self, value: float, key: Optional[int] = None) -> None:
+        """
+        Thêm một giá trị
+
+        Args:
+            value: Giá trị
+            key: Chỉ số bucket đã tính sẵn (các sketch cùng độ chính xác dùng chung)
+        """
+        self.count += 1
+        if value <= 0:
+            self._zero_count += 1
+            return
+        if key is None:
+            key = self.key(value)
+        if key not in self._buckets:
+            self._buckets[key] = 0
+            self._sorted_keys = None
+        self._buckets[key] += 1
+
+    def remove(self, value: float, key: Optional[int] = None) -> None:
+        """Bớt một giá trị đã thêm trước đó"""
+        if value <= 0:
+            if self._zero_count:
+                self._zero_count -= 1
+                self.count -= 1
+            return
+        if key is None:
+            key = self.key(value)
+        remaining = self._buckets.get(key, 0)
+        if not remaining:
+            return
+        self.count -= 1
+        if remaining == 1:
+            del self._buckets[key]
+            self._sorted_keys = None
+        else:
+            self._buckets[key] = remaining - 1
+
+    def quantile(self, q: float) -> float:
+        """
+        Phân vị gần đúng
+
+        Args:
+            q: Mức phân vị trong [0, 1]
+
+        Returns:
+            float: Giá trị phân vị, 0 nếu sketch rỗng
+        """
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self._zero_count
+        if rank < seen:
+            return 0.0
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self._buckets)
+        for key in self._sorted_keys:
+            seen += self._buckets[key]
+            if rank < seen:
+                return 2 * self._gamma ** key / (self._gamma + 1)
+        return 2 * self._gamma ** self._sorted_keys[-1] / (self._gamma + 1)
+
+
+class StreamStatistics:
+    """Thống kê của một luồng giá trị: moments, phân vị và trung bình trượt mũ"""
+
+    def __init__(self, ema_span: int = STATS_CONFIG["ema_span"]):
+        """
+        Args:
+            ema_span: Số giao dịch tương đương của trung bình trượt mũ
+        """
+        self.moments = RunningMoments()
+        self.sketch = QuantileSketch()
+        self._alpha = 2 / (ema_span + 1)
+        self.ema: Optional[float] = None
+
+    def add(self, value: float, key: Optional[int] = None) -> None:
+        """Thêm một giá trị (key: chỉ số bucket sketch đã tính sẵn)"""
+        self.moments.add(value)
+        self.sketch.add(value, key)
+        self.ema = value if self.ema is None else self.ema + self._alpha * (value - self.ema)
+
+    def remove(self, value: float, key: Optional[int] = None) -> None:
+        """
+        Bớt một giá trị (key: chỉ số bucket sketch đã tính sẵn)
+
+        Moments và phân vị được cập nhật chính xác; EMA làm mịn theo thứ tự
+        thêm vào nên không hoàn tác, chỉ được đặt lại khi luồng rỗng.
+        """
+        self.moments.remove(value)
+        self.sketch.remove(value, key)
+        if not self.moments.count:
+            self.ema = None
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Ảnh chụp thống kê hiện tại
+
+        Returns:
+            Dict: count, mean, std, median, q1, q3, ema
+        """
+        return {
+            "count": self.moments.count,
+            "mean": self.moments.mean,
+            "std": self.moments.std,
+            "median": self.sketch.quantile(0.5),
+            "q1": self.sketch.quantile(0.25),
+            "q3": self.sketch.quantile(0.75),
+            "ema": self.ema if self.ema is not None else 0.0
+        }
+
+
+class OnlineStatistics:
+    """
+    Thống kê trực tuyến toàn bộ, theo loại (thu/chi) và theo danh mục
+
+    Mỗi lần thêm/xóa giao dịch chỉ tốn O(1) nên giao diện có thể hiển thị
+    số liệu luôn cập nhật; phân tích đầy đủ chỉ chạy khi được yêu cầu.
+    """
+
+    def __init__(self, transactions: List[Any] = None):
+        self.overall = StreamStatistics()
+        self.by_kind: Dict[str, StreamStatistics] = {}
+        self.by_category: Dict[str, StreamStatistics] = {}
+        if transactions:
+            for transaction in transactions:
+                self.add(transaction)
+
+    def _streams(self, transaction: Any, create: bool) -> List[StreamStatistics]:
+        """Các luồng thống kê mà giao dịch thuộc về"""
+        if transaction.type in INCOME_TYPES:
+            kind = "income"
+        elif transaction.type in EXPENSE_TYPES:
+            kind = "expense"
+        else:
+            kind = None
+
+        streams = [self.overall]
+        for groups, key in ((self.by_kind, kind), (self.by_category, transaction.category)):
+            if key is None:
+                continue
+            stream = groups.get(key)
+            if stream is None and create:
+                stream = groups[key] = StreamStatistics()
+            if stream is not None:
+                streams.append(stream)
+        return streams
+
+    def add(self, transaction: Any) -> None:
+        """Cập nhật thống kê khi thêm giao dịch - O(1)"""
+        amount = transaction.amount
+        key = self.overall.sketch.key(amount)
+        for stream in self._streams(transaction, create=True):
+            stream.add(amount, key)
+
+    def remove(self, transaction: Any) -> None:
+        """Cập nhật thống kê khi xóa giao dịch - O(1)"""
+        amount = transaction.amount
+        key = self.overall.sketch.key(amount)
+        for stream in self._streams(transaction, create=False):
+            stream.remove(amount, key)
+
+    def summary(self, category: str = None, kind: str = None) -> Dict[str, Any]:
+        """
+        Thống kê của toàn bộ, một loại hoặc một danh mục
+
+        Args:
+            category: Tên danh mục
+            kind: "income" hoặc "expense"
+
+        Returns:
+            Dict: count, mean, std, median, q1, q3, ema (rỗng nếu chưa có dữ liệu)
+        """
+        if category is not None:
+            stream = self.by_category.get(category)
+        elif kind is not None:
+            stream = self.by_kind.get(kind)
+        else:
+            stream = self.overall
+        return (stream or StreamStatistics()).summary()
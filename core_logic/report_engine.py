@@ -0,0 +1,289 @@
+#Bộ tổng hợp dữ liệu dùng chung cho các báo cáo
+
+from datetime import date, timedelta
+from typing import List, Dict, Any, Tuple, Optional, Iterable
+from utils.money import from_minor
+
+# Các giá trị loại giao dịch được coi là thu nhập / chi tiêu
+INCOME_TYPES = ("Thu nhập", "income")
+EXPENSE_TYPES = ("Chi tiêu", "expense")
+
+# Vị trí các chỉ số trong một ô tổng hợp
+TOTAL, COUNT, MIN, MAX, MAX_TRANSACTION = range(5)
+
+# Tần suất hỗ trợ cho chuỗi thời gian
+SERIES_FREQUENCIES = ("day", "week", "month")
+
+
+def month_sort_key(month_year: str) -> Tuple[int, int]:
+    """Khóa sắp xếp theo thời gian cho chuỗi MM/YYYY"""
+    try:
+        month, year = month_year.split('/')
+        return int(year), int(month)
+    except (ValueError, AttributeError):
+        return 0, 0
+
+
+def _empty_totals() -> Dict[str, Any]:
+    """Bộ tổng thu/chi rỗng cho một kỳ"""
+    return {"income": 0, "expense": 0, "transaction_count": 0}
+
+
+def _major_totals(totals: Dict[str, Any]) -> Dict[str, Any]:
+    """Bản sao bộ tổng thu/chi với số tiền đổi từ đơn vị nhỏ nhất sang đồng"""
+    return {
+        "income": from_minor(totals["income"]),
+        "expense": from_minor(totals["expense"]),
+        "transaction_count": totals["transaction_count"]
+    }
+
+
+class ReportCube:
+    """
+    Khối tổng hợp (năm, tháng, tuần, loại, danh mục) -> tổng/số lượng/min/max
+
+    Được xây dựng trong một lần duyệt giao dịch và cộng dồn khi có giao
+    dịch mới; mọi phần của báo cáo tháng, năm, sức khỏe tài chính và xu
+    hướng đều được suy ra từ khối này. Tuần ISO lấy từ phần ngày đã phân
+    tích sẵn của giao dịch nên không phải parse lại ngày.
+
+    Mọi tổng được cộng bằng số nguyên đơn vị nhỏ nhất (amount_minor) nên
+    không tích lũy sai số làm tròn; số tiền chỉ được đổi sang đồng khi
+    trả ra ngoài.
+    """
+
+    def __init__(self, transactions: Iterable[Any] = None):
+        # month_year -> {(tuần, loại, danh mục): [tổng, số lượng, min, max, giao dịch lớn nhất]}
+        self._months: Dict[str, Dict[Tuple[Optional[int], str, str], list]] = {}
+        # year -> tập các month_year thuộc năm đó
+        self._years: Dict[str, set] = {}
+        # Tổng thu/chi theo kỳ cho chuỗi thời gian: tháng, (năm ISO, tuần ISO), ngày (ordinal)
+        self._month_totals: Dict[str, Dict[str, Any]] = {}
+        self._week_totals: Dict[Tuple[int, int], Dict[str, Any]] = {}
+        self._day_totals: Dict[int, Dict[str, Any]] = {}
+        self._overall = _empty_totals()
+        if transactions:
+            for transaction in transactions:
+                self.add(transaction)
+
+    def add(self, transaction: Any) -> None:
+        """
+        Cộng một giao dịch vào khối tổng hợp
+
+        Args:
+            transaction: Giao dịch cần cộng
+        """
+        month_year = transaction.get_month_year()
+        year = transaction.get_year()
+        amount = transaction.amount_minor
+        date_parts = transaction.get_date_parts()
+        ordinal, iso_year, iso_week = date_parts if date_parts else (None, None, None)
+        key = (iso_week, transaction.type, transaction.category)
+        
+        # Cộng vào các chuỗi tổng theo kỳ
+        if transaction.type in INCOME_TYPES:
+            kind = "income"
+        elif transaction.type in EXPENSE_TYPES:
+            kind = "expense"
+        else:
+            kind = None
+        buckets = [self._overall, self._month_totals.setdefault(month_year, _empty_totals())]
+        if date_parts is not None:
+            buckets.append(self._week_totals.setdefault((iso_year, iso_week), _empty_totals()))
+            buckets.append(self._day_totals.setdefault(ordinal, _empty_totals()))
+        for totals in buckets:
+            totals["transaction_count"] += 1
+            if kind:
+                totals[kind] += amount
+
+        cells = self._months.get(month_year)
+        if cells is None:
+            cells = self._months[month_year] = {}
+            self._years.setdefault(year, set()).add(month_year)
+
+        cell = cells.get(key)
+        if cell is None:
+            cells[key] = [amount, 1, amount, amount, transaction]
+            return
+
+        cell[TOTAL] += amount
+        cell[COUNT] += 1
+        if amount < cell[MIN]:
+            cell[MIN] = amount
+        if amount > cell[MAX]:
+            cell[MAX] = amount
+            cell[MAX_TRANSACTION] = transaction
+
+    def copy(self) -> 'ReportCube':
+        """Bản sao độc lập để đọc ở luồng khác trong khi bản gốc tiếp tục cập nhật"""
+        clone = ReportCube()
+        clone._months = {
+            month_year: {key: list(cell) for key, cell in cells.items()}
+            for month_year, cells in self._months.items()
+        }
+        clone._years = {year: set(months) for year, months in self._years.items()}
+        clone._month_totals = {key: dict(totals) for key, totals in self._month_totals.items()}
+        clone._week_totals = {key: dict(totals) for key, totals in self._week_totals.items()}
+        clone._day_totals = {key: dict(totals) for key, totals in self._day_totals.items()}
+        clone._overall = dict(self._overall)
+        return clone
+
+    def totals(self) -> Dict[str, Any]:
+        """Tổng thu/chi và số giao dịch của toàn bộ dữ liệu"""
+        return _major_totals(self._overall)
+
+    def month_totals(self, month_year: str) -> Dict[str, Any]:
+        """Tổng thu/chi và số giao dịch của một tháng - O(1)"""
+        return _major_totals(self._month_totals.get(month_year) or _empty_totals())
+
+    def week_totals(self, iso_year: int, iso_week: int) -> Dict[str, Any]:
+        """Tổng thu/chi và số giao dịch của một tuần ISO - O(1)"""
+        return _major_totals(self._week_totals.get((iso_year, iso_week)) or _empty_totals())
+
+    def expense_by_month_category(self) -> Dict[Tuple[str, str], int]:
+        """
+        Tổng chi theo (tháng, danh mục), suy ra từ các ô của khối
+        
+        Returns:
+            Dict: {(month_year, danh mục): tổng chi theo đơn vị nhỏ nhất}
+        """
+        totals: Dict[Tuple[str, str], int] = {}
+        for month_year, cells in self._months.items():
+            for (_week, transaction_type, category), cell in cells.items():
+                if transaction_type in EXPENSE_TYPES:
+                    key = (month_year, category)
+                    totals[key] = totals.get(key, 0) + cell[TOTAL]
+        return totals
+    
+    def series(self, freq: str, start: date, end: date) -> List[Dict[str, Any]]:
+        """
+        Chuỗi thời gian đầy đủ (không bỏ kỳ trống) theo lịch thực tế
+
+        Args:
+            freq: "day", "week" hoặc "month"
+            start: Ngày bắt đầu (kỳ chứa ngày này là kỳ đầu tiên)
+            end: Ngày kết thúc (kỳ chứa ngày này là kỳ cuối cùng)
+
+        Returns:
+            List[Dict]: Mỗi kỳ gồm period, start, income, expense, balance, transaction_count
+        """
+        if freq not in SERIES_FREQUENCIES:
+            raise ValueError(f"Tần suất không hợp lệ: {freq}")
+
+        result = []
+        if freq == "month":
+            first = start.year * 12 + start.month - 1
+            last = end.year * 12 + end.month - 1
+            for index in range(first, last + 1):
+                year, month = divmod(index, 12)
+                label = f"{month + 1:02d}/{year}"
+                result.append(self._series_point(label, date(year, month + 1, 1), self._month_totals.get(label)))
+        elif freq == "week":
+            current = start - timedelta(days=start.weekday())
+            while current <= end:
+                iso_year, iso_week = current.isocalendar()[:2]
+                label = f"{iso_year}-W{iso_week:02d}"
+                result.append(self._series_point(label, current, self._week_totals.get((iso_year, iso_week))))
+                current += timedelta(days=7)
+        else:
+            for ordinal in range(start.toordinal(), end.toordinal() + 1):
+                current = date.fromordinal(ordinal)
+                label = current.strftime("%d/%m/%Y")
+                result.append(self._series_point(label, current, self._day_totals.get(ordinal)))
+        return result
+
+    def last_months(self, months: int, end: date) -> List[Dict[str, Any]]:
+        """
+        Chuỗi theo tháng cho `months` tháng lịch gần nhất, kết thúc ở tháng chứa end
+
+        Args:
+            months: Số tháng
+            end: Ngày thuộc tháng cuối cùng
+
+        Returns:
+            List[Dict]: Chuỗi theo tháng từ cũ đến mới
+        """
+        if months <= 0:
+            return []
+        year, month = divmod(end.year * 12 + end.month - 1 - (months - 1), 12)
+        return self.series("month", date(year, month + 1, 1), end)
+
+    @staticmethod
+    def _series_point(label: str, start: date, totals: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Tạo một điểm của chuỗi thời gian từ bộ tổng (có thể rỗng)"""
+        totals = totals or _empty_totals()
+        return {
+            "period": label,
+            "start": start,
+            "income": from_minor(totals["income"]),
+            "expense": from_minor(totals["expense"]),
+            "balance": from_minor(totals["income"] - totals["expense"]),
+            "transaction_count": totals["transaction_count"]
+        }
+
+    def months(self) -> List[str]:
+        """Danh sách các tháng có dữ liệu, theo thứ tự thời gian"""
+        return sorted(self._months, key=month_sort_key)
+
+    def months_in_year(self, year: str) -> List[str]:
+        """Danh sách các tháng có dữ liệu trong năm, theo thứ tự thời gian"""
+        return sorted(self._years.get(year, ()), key=month_sort_key)
+
+    def month_summary(self, month_year: str) -> Dict[str, Any]:
+        """
+        Tổng hợp một tháng từ các ô của khối
+
+        Args:
+            month_year: Tháng/năm (MM/YYYY)
+
+        Returns:
+            Dict: Tổng thu/chi, số lượng, giá trị lớn nhất, theo danh mục và theo tuần
+        """
+        summary = {
+            "income": 0,
+            "expense": 0,
+            "transaction_count": 0,
+            "total_amount": 0,
+            "max_single_income": 0,
+            "max_single_expense": 0,
+            "largest_income": None,
+            "largest_expense": None,
+            "income_by_category": {},
+            "expense_by_category": {},
+            "weekly_data": {}
+        }
+
+        for (week, transaction_type, category), cell in self._months.get(month_year, {}).items():
+            summary["transaction_count"] += cell[COUNT]
+            summary["total_amount"] += cell[TOTAL]
+
+            if transaction_type in INCOME_TYPES:
+                kind = "income"
+            elif transaction_type in EXPENSE_TYPES:
+                kind = "expense"
+            else:
+                continue
+
+            summary[kind] += cell[TOTAL]
+            by_category = summary[f"{kind}_by_category"]
+            by_category[category] = by_category.get(category, 0) + cell[TOTAL]
+            if cell[MAX] > summary[f"max_single_{kind}"]:
+                summary[f"max_single_{kind}"] = cell[MAX]
+                summary[f"largest_{kind}"] = cell[MAX_TRANSACTION]
+
+            if week is not None:
+                weekly = summary["weekly_data"].setdefault(week, {"income": 0, "expense": 0})
+                weekly[kind] += cell[TOTAL]
+
+        # Đổi các tổng (đang là đơn vị nhỏ nhất) sang đồng
+        for field in ("income", "expense", "total_amount", "max_single_income", "max_single_expense"):
+            summary[field] = from_minor(summary[field])
+        for kind in ("income", "expense"):
+            by_category = summary[f"{kind}_by_category"]
+            for category in by_category:
+                by_category[category] = from_minor(by_category[category])
+        for weekly in summary["weekly_data"].values():
+            weekly["income"] = from_minor(weekly["income"])
+            weekly["expense"] = from_minor(weekly["expense"])
+
+        return summary
@@ -1,18 +1,48 @@
 #Tạo báo cáo và phân tích dữ liệu
 
-from datetime import datetime, timedelta
-from collections import defaultdict
+from datetime import datetime
 from typing import List, Dict, Any
+import numpy as np
 from config import REPORT_CONFIG
+from core_logic.report_engine import ReportCube
+from core_logic.snapshot import DatasetSnapshot, sum_by_group
+from utils.money import MINOR_PER_UNIT
 
 
 class ReportGenerator:
     """Class tạo các báo cáo tài chính"""
     
-    def __init__(self, transactions: List[Any]):
-        self.transactions = transactions
+    def __init__(self, transactions: List[Any] = None, cube: ReportCube = None,
+                 snapshot: DatasetSnapshot = None):
+        """
+        Args:
+            transactions: Danh sách giao dịch
+            cube: Khối tổng hợp có sẵn ứng với transactions
+            snapshot: Ảnh chụp dữ liệu dùng chung (thay cho transactions và cube)
+        """
+        if snapshot is not None:
+            transactions = snapshot.transactions
+            if cube is None:
+                cube = snapshot.cube
+        self.transactions = transactions if transactions is not None else []
         self.currency = REPORT_CONFIG["currency"]
         self.date_format = REPORT_CONFIG["date_format"]
+        self._cube = cube
+        self._snapshot = snapshot
+    
+    @property
+    def cube(self) -> ReportCube:
+        """Khối tổng hợp dùng chung, xây dựng một lần khi cần"""
+        if self._cube is None:
+            self._cube = ReportCube(self.transactions)
+        return self._cube
+    
+    @property
+    def snapshot(self) -> DatasetSnapshot:
+        """Ảnh chụp dạng cột của giao dịch, xây dựng một lần khi cần"""
+        if self._snapshot is None:
+            self._snapshot = DatasetSnapshot(self.transactions, cube=self._cube)
+        return self._snapshot
     
     def get_monthly_report(self, month_year: str = None) -> Dict[str, Any]:
         """
@@ -27,44 +57,14 @@ class ReportGenerator:
         if month_year is None:
             month_year = datetime.now().strftime("%m/%Y")
         
-        monthly_transactions = [
-            t for t in self.transactions 
-            if hasattr(t, 'get_month_year') and t.get_month_year() == month_year
-        ]
-        
-        income = sum(t.amount for t in monthly_transactions if t.type in ["Thu nhập", "income"])
-        expense = sum(t.amount for t in monthly_transactions if t.type in ["Chi tiêu", "expense"])
+        month = self.cube.month_summary(month_year)
+        income = month["income"]
+        expense = month["expense"]
         balance = income - expense
-        
-        # Phân tích theo danh mục
-        income_by_category = defaultdict(float)
-        expense_by_category = defaultdict(float)
-        
-        # Thêm phân tích theo tuần
-        weekly_data = defaultdict(lambda: {"income": 0, "expense": 0})
-        
-        for transaction in monthly_transactions:
-            # Phân loại theo danh mục
-            if transaction.type in ["Thu nhập", "income"]:
-                income_by_category[transaction.category] += transaction.amount
-            elif transaction.type in ["Chi tiêu", "expense"]:
-                expense_by_category[transaction.category] += transaction.amount
-            
-            # Phân loại theo tuần
-            try:
-                date_obj = datetime.strptime(transaction.date, "%d/%m/%Y")
-                week_num = date_obj.isocalendar()[1]
-                if transaction.type in ["Thu nhập", "income"]:
-                    weekly_data[week_num]["income"] += transaction.amount
-                elif transaction.type in ["Chi tiêu", "expense"]:
-                    weekly_data[week_num]["expense"] += transaction.amount
-            except ValueError:
-                continue
+        transaction_count = month["transaction_count"]
         
         # Tính toán các chỉ số bổ sung
-        avg_transaction = sum(t.amount for t in monthly_transactions) / len(monthly_transactions) if monthly_transactions else 0
-        max_single_expense = max((t.amount for t in monthly_transactions if t.type in ["Chi tiêu", "expense"]), default=0)
-        max_single_income = max((t.amount for t in monthly_transactions if t.type in ["Thu nhập", "income"]), default=0)
+        avg_transaction = month["total_amount"] / transaction_count if transaction_count else 0
         
         return {
             "month_year": month_year,
@@ -72,17 +72,17 @@ class ReportGenerator:
                 "income": income,
                 "expense": expense,
                 "balance": balance,
-                "transaction_count": len(monthly_transactions),
+                "transaction_count": transaction_count,
                 "avg_transaction": avg_transaction,
-                "max_single_expense": max_single_expense,
-                "max_single_income": max_single_income,
+                "max_single_expense": month["max_single_expense"],
+                "max_single_income": month["max_single_income"],
                 "savings_rate": (income - expense) / income * 100 if income > 0 else 0
             },
-            "income_by_category": dict(income_by_category),
-            "expense_by_category": dict(expense_by_category),
-            "weekly_data": dict(weekly_data),
-            "largest_income": max(monthly_transactions, key=lambda x: x.amount if x.type == "Thu nhập" else 0, default=None),
-            "largest_expense": max(monthly_transactions, key=lambda x: x.amount if x.type == "Chi tiêu" else 0, default=None)
+            "income_by_category": month["income_by_category"],
+            "expense_by_category": month["expense_by_category"],
+            "weekly_data": month["weekly_data"],
+            "largest_income": month["largest_income"],
+            "largest_expense": month["largest_expense"]
         }
     
     def get_yearly_report(self, year: str = None) -> Dict[str, Any]:
@@ -98,26 +98,21 @@ class ReportGenerator:
         if year is None:
             year = str(datetime.now().year)
         
-        yearly_transactions = [
-            t for t in self.transactions 
-            if hasattr(t, 'get_year') and t.get_year() == year
-        ]
-        
-        income = sum(t.amount for t in yearly_transactions if t.type in ["Thu nhập", "income"])
-        expense = sum(t.amount for t in yearly_transactions if t.type in ["Chi tiêu", "expense"])
-        balance = income - expense
-        
         # Phân tích theo tháng
-        monthly_data = defaultdict(lambda: {'income': 0, 'expense': 0, 'balance': 0, 'transaction_count': 0})
+        monthly_data = {}
+        for month in self.cube.months_in_year(year):
+            summary = self.cube.month_summary(month)
+            monthly_data[month] = {
+                'income': summary['income'],
+                'expense': summary['expense'],
+                'balance': summary['income'] - summary['expense'],
+                'transaction_count': summary['transaction_count']
+            }
         
-        for transaction in yearly_transactions:
-            month = transaction.get_month_year()
-            monthly_data[month]['transaction_count'] += 1
-            if transaction.type in ["Thu nhập", "income"]:
-                monthly_data[month]['income'] += transaction.amount
-            elif transaction.type in ["Chi tiêu", "expense"]:
-                monthly_data[month]['expense'] += transaction.amount
-            monthly_data[month]['balance'] = monthly_data[month]['income'] - monthly_data[month]['expense']
+        income = sum(data['income'] for data in monthly_data.values())
+        expense = sum(data['expense'] for data in monthly_data.values())
+        balance = income - expense
+        transaction_count = sum(data['transaction_count'] for data in monthly_data.values())
         
         # Tính toán xu hướng
         trend_analysis = {
@@ -126,7 +121,7 @@ class ReportGenerator:
             "balance_trend": []
         }
         
-        sorted_months = sorted(monthly_data.keys())
+        sorted_months = list(monthly_data.keys())
         for i in range(1, len(sorted_months)):
             prev_month = sorted_months[i-1]
             curr_month = sorted_months[i]
@@ -159,13 +154,13 @@ class ReportGenerator:
                 "total_income": income,
                 "total_expense": expense,
                 "total_balance": balance,
-                "transaction_count": len(yearly_transactions),
+                "transaction_count": transaction_count,
                 "avg_monthly_income": income / 12 if income > 0 else 0,
                 "avg_monthly_expense": expense / 12 if expense > 0 else 0,
                 "avg_monthly_balance": balance / 12,
                 "savings_rate": (income - expense) / income * 100 if income > 0 else 0
             },
-            "monthly_breakdown": dict(monthly_data),
+            "monthly_breakdown": monthly_data,
             "trend_analysis": trend_analysis
         }
     
@@ -179,64 +174,69 @@ class ReportGenerator:
         Returns:
             List[Dict]: Phân tích danh mục
         """
-        filtered_transactions = [
-            t for t in self.transactions if t.type == transaction_type
-        ]
-        
-        category_data = defaultdict(lambda: {
-            'total': 0, 
-            'count': 0, 
-            'transactions': [],
-            'avg_amount': 0,
-            'min_amount': float('inf'),
-            'max_amount': 0,
-            'monthly_totals': defaultdict(float)
-        })
-        
-        for transaction in filtered_transactions:
-            category = transaction.category
-            amount = transaction.amount
-            month_year = transaction.get_month_year()
-            
-            # Cập nhật thống kê
-            category_data[category]['total'] += amount
-            category_data[category]['count'] += 1
-            category_data[category]['transactions'].append(transaction)
-            category_data[category]['min_amount'] = min(category_data[category]['min_amount'], amount)
-            category_data[category]['max_amount'] = max(category_data[category]['max_amount'], amount)
-            category_data[category]['monthly_totals'][month_year] += amount
-        
-        total_amount = sum(data['total'] for data in category_data.values())
+        snapshot = self.snapshot
+        selected = snapshot.type_mask(transaction_type)
+        if not selected.any():
+            return []
+        
+        # Mã danh mục theo tên và khóa tháng số nên np.unique cho thứ tự tên / thời gian
+        used, category_codes = np.unique(snapshot.category_code[selected], return_inverse=True)
+        categories = [snapshot.categories[code] for code in used.tolist()]
+        amounts = snapshot.amount_minor[selected]
+        month_keys = snapshot.month_key[selected]
+        n_categories = len(categories)
+        
+        # Giao dịch có ngày không hợp lệ không thuộc tháng nào trong xu hướng
+        dated = month_keys >= 0
+        month_values, month_codes = np.unique(month_keys[dated], return_inverse=True)
+        month_labels = [DatasetSnapshot.month_label(key) for key in month_values.tolist()]
+        n_months = len(month_labels)
+        
+        # Tổng (cộng int64 theo đơn vị nhỏ nhất), số lượng theo danh mục
+        totals = sum_by_group(category_codes, amounts, n_categories) / MINOR_PER_UNIT
+        counts = np.bincount(category_codes, minlength=n_categories)
+        
+        # Min/max theo nhóm trên mảng đã sắp xếp theo danh mục
+        order = np.argsort(category_codes, kind='stable')
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        min_amounts = np.minimum.reduceat(amounts[order], starts) / MINOR_PER_UNIT
+        max_amounts = np.maximum.reduceat(amounts[order], starts) / MINOR_PER_UNIT
+        
+        # Bảng pivot tháng x danh mục cho xu hướng theo tháng
+        cell_index = month_codes * n_categories + category_codes[dated]
+        pivot = sum_by_group(cell_index, amounts[dated], n_months * n_categories) / MINOR_PER_UNIT
+        pivot = pivot.reshape(n_months, n_categories)
+        present = np.bincount(cell_index, minlength=n_months * n_categories).reshape(n_months, n_categories) > 0
+        
+        total_amount = snapshot.sum_minor(selected) / MINOR_PER_UNIT
         
         result = []
-        for category, data in category_data.items():
-            if data['count'] > 0:
-                data['avg_amount'] = data['total'] / data['count']
-                if data['min_amount'] == float('inf'):
-                    data['min_amount'] = 0
-                
-                monthly_trend = []
-                sorted_months = sorted(data['monthly_totals'].keys())
-                for i in range(1, len(sorted_months)):
-                    prev_month = sorted_months[i-1]
-                    curr_month = sorted_months[i]
-                    change = data['monthly_totals'][curr_month] - data['monthly_totals'][prev_month]
-                    monthly_trend.append({
-                        'month': curr_month,
-                        'change': change,
-                        'percentage': (change / data['monthly_totals'][prev_month] * 100) 
-                        if data['monthly_totals'][prev_month] > 0 else 0
-                    })
+        for k in range(n_categories):
+            months = np.flatnonzero(present[:, k])
+            monthly_values = pivot[months, k]
+            monthly_totals = {month_labels[m]: float(v) for m, v in zip(months, monthly_values)}
+            
+            changes = np.diff(monthly_values)
+            previous = monthly_values[:-1]
+            percentages = np.divide(changes * 100, previous, out=np.zeros_like(changes), where=previous > 0)
+            monthly_trend = [
+                {
+                    'month': month_labels[m],
+                    'change': float(change),
+                    'percentage': float(percentage)
+                }
+                for m, change, percentage in zip(months[1:], changes, percentages)
+            ]
             
             result.append({
-                'category': category,
-                'total_amount': data['total'],
-                'transaction_count': data['count'],
-                'percentage': (data['total'] / total_amount * 100) if total_amount > 0 else 0,
-                'avg_amount': data['avg_amount'],
-                'min_amount': data['min_amount'],
-                'max_amount': data['max_amount'],
-                'monthly_totals': dict(data['monthly_totals']),
+                'category': categories[k],
+                'total_amount': float(totals[k]),
+                'transaction_count': int(counts[k]),
+                'percentage': float(totals[k] / total_amount * 100) if total_amount > 0 else 0,
+                'avg_amount': float(totals[k] / counts[k]),
+                'min_amount': float(min_amounts[k]),
+                'max_amount': float(max_amounts[k]),
+                'monthly_totals': monthly_totals,
                 'monthly_trend': monthly_trend
             })
         
@@ -254,40 +254,34 @@ class ReportGenerator:
         Returns:
             Dict: Phân tích xu hướng
         """
-        current_date = datetime.now()
-        months_to_analyze = []
-        
-        for i in range(months):
-            date = current_date - timedelta(days=30 * i)
-            months_to_analyze.append(date.strftime("%m/%Y"))
-        
-        months_to_analyze.reverse()
+        # Chuỗi tháng liên tục theo lịch, lấy từ khối tổng hợp trong một lần
+        series = self.cube.last_months(months, datetime.now().date())
         
         trend_data = []
-        for month_year in months_to_analyze:
-            monthly_report = self.get_monthly_report(month_year)["summary"]
+        for point in series:
+            income = point['income']
             trend_data.append({
-                "month": month_year,
-                "income": monthly_report['income'],
-                "expense": monthly_report['expense'],
-                "balance": monthly_report['balance'],
-                "transaction_count": monthly_report['transaction_count'],
-                "savings_rate": monthly_report.get('savings_rate', 0)
+                "month": point['period'],
+                "income": income,
+                "expense": point['expense'],
+                "balance": point['balance'],
+                "transaction_count": point['transaction_count'],
+                "savings_rate": (income - point['expense']) / income * 100 if income > 0 else 0
             })
         
         # Tính xu hướng
         trends = {
-            "income": self._calculate_trend([d['income'] for d in trend_data]),
-            "expense": self._calculate_trend([d['expense'] for d in trend_data]),
-            "balance": self._calculate_trend([d['balance'] for d in trend_data]),
-            "savings_rate": self._calculate_trend([d['savings_rate'] for d in trend_data])
+            "income": self._calculate_trend(trend_data, 'income'),
+            "expense": self._calculate_trend(trend_data, 'expense'),
+            "balance": self._calculate_trend(trend_data, 'balance'),
+            "savings_rate": self._calculate_trend(trend_data, 'savings_rate')
         }
         
         # Tính tốc độ tăng trưởng
         growth_rates = {
-            "income": self._calculate_growth_rate([d['income'] for d in trend_data]),
-            "expense": self._calculate_growth_rate([d['expense'] for d in trend_data]),
-            "balance": self._calculate_growth_rate([d['balance'] for d in trend_data])
+            "income": self._calculate_growth_rate(trend_data, 'income'),
+            "expense": self._calculate_growth_rate(trend_data, 'expense'),
+            "balance": self._calculate_growth_rate(trend_data, 'balance')
         }
         
         return {
@@ -297,8 +291,28 @@ class ReportGenerator:
             "periods_analyzed": months
         }
     
-    def _calculate_trend(self, values: List[float]) -> str:
-        """Tính xu hướng dựa trên dữ liệu"""
+    def get_time_series(self, freq: str = "month", start: str = None, end: str = None) -> List[Dict[str, Any]]:
+        """
+        Chuỗi thu chi theo ngày/tuần/tháng, đầy đủ các kỳ trong khoảng
+        
+        Args:
+            freq: "day", "week" hoặc "month"
+            start: Ngày bắt đầu (DD/MM/YYYY), mặc định 12 tháng trước
+            end: Ngày kết thúc (DD/MM/YYYY), mặc định hôm nay
+            
+        Returns:
+            List[Dict]: Chuỗi thời gian từ cũ đến mới
+        """
+        end_date = datetime.strptime(end, self.date_format).date() if end else datetime.now().date()
+        if start:
+            start_date = datetime.strptime(start, self.date_format).date()
+        else:
+            start_date = end_date.replace(day=1, year=end_date.year - 1)
+        return self.cube.series(freq, start_date, end_date)
+    
+    def _calculate_trend(self, series: List[Dict[str, Any]], field: str) -> str:
+        """Tính xu hướng dựa trên một trường của chuỗi thời gian"""
+        values = [point[field] for point in series]
         if len(values) < 2:
             return "không đủ dữ liệu"
         
@@ -311,11 +325,11 @@ class ReportGenerator:
             return "giảm"
         return "ổn định"
     
-    def _calculate_growth_rate(self, values: List[float]) -> float:
-        """Tính tốc độ tăng trưởng"""
-        if len(values) < 2 or values[0] == 0:
+    def _calculate_growth_rate(self, series: List[Dict[str, Any]], field: str) -> float:
+        """Tính tốc độ tăng trưởng giữa kỳ đầu và kỳ cuối của chuỗi thời gian"""
+        if len(series) < 2 or series[0][field] == 0:
             return 0
-        return ((values[-1] - values[0]) / abs(values[0])) * 100
+        return ((series[-1][field] - series[0][field]) / abs(series[0][field])) * 100
     
     def get_financial_health_score(self) -> Dict[str, Any]:
         """
@@ -0,0 +1,150 @@
+#Ảnh chụp dữ liệu dạng cột dùng chung cho phân tích, báo cáo và ngân sách
+
+from collections import namedtuple
+from datetime import date
+from typing import Dict, Any, Tuple, Sequence
+import numpy as np
+from core_logic.report_engine import ReportCube, INCOME_TYPES, EXPENSE_TYPES
+from utils.money import MINOR_PER_UNIT
+
+# Ordinal của 01/01/1970, gốc của datetime64
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# Phần lấy trên luồng Tk để dựng ảnh chụp ở luồng nền: phiên bản và bản sao nông danh sách giao dịch
+SnapshotSource = namedtuple("SnapshotSource", ["version", "transactions"])
+
+
+def _factorize(values: Sequence[str]) -> Tuple[np.ndarray, Tuple[str, ...]]:
+    """
+    Mã hóa chuỗi thành số nguyên, mã theo thứ tự tên đã sắp xếp
+
+    Returns:
+        Tuple: (mảng mã, các tên theo mã)
+    """
+    codes_by_name: Dict[str, int] = {}
+    raw_codes = np.fromiter(
+        (codes_by_name.setdefault(value, len(codes_by_name)) for value in values),
+        dtype=np.int64, count=len(values)
+    )
+    names = sorted(codes_by_name)
+    rank = np.empty(len(names), dtype=np.int64)
+    for position, name in enumerate(names):
+        rank[codes_by_name[name]] = position
+    return (rank[raw_codes] if len(values) else raw_codes), tuple(names)
+
+
+def _readonly(array: np.ndarray) -> np.ndarray:
+    """Khóa ghi mảng để ảnh chụp có thể chia sẻ an toàn giữa các luồng"""
+    array.flags.writeable = False
+    return array
+
+
+def sum_by_group(index: np.ndarray, amount_minor: np.ndarray, size: int) -> np.ndarray:
+    """
+    Cộng số tiền (đơn vị nhỏ nhất) theo nhóm bằng int64, không qua float
+
+    Args:
+        index: Mã nhóm của từng dòng (0..size-1)
+        amount_minor: Số tiền của từng dòng theo đơn vị nhỏ nhất
+        size: Số nhóm
+
+    Returns:
+        np.ndarray: Mảng int64 tổng theo nhóm
+    """
+    totals = np.zeros(size, dtype=np.int64)
+    np.add.at(totals, index, amount_minor)
+    return totals
+
+
+class DatasetSnapshot:
+    """
+    Ảnh chụp bất biến của danh sách giao dịch tại một phiên bản dữ liệu
+
+    Dữ liệu được chuyển sang mảng NumPy chỉ đọc một lần cho mỗi phiên bản
+    và dùng chung giữa TransactionAnalytics, ReportGenerator và
+    BudgetManager, kể cả khi đọc ở luồng nền. Số tiền gốc nằm trong
+    amount_minor (int64, đơn vị nhỏ nhất) dùng cho các phép cộng; amount
+    (float64, đồng) chỉ dùng cho thống kê như trung bình, độ lệch chuẩn.
+    """
+
+    def __init__(self, transactions: Sequence[Any], version: Any = None, cube: ReportCube = None):
+        """
+        Args:
+            transactions: Danh sách giao dịch (được sao chép thành tuple)
+            version: Phiên bản dữ liệu của nguồn
+            cube: Khối tổng hợp tương ứng (sẽ được xây dựng khi cần nếu không có)
+        """
+        self.version = version
+        self.transactions: Tuple[Any, ...] = tuple(transactions)
+        self._cube = cube
+        n = len(self.transactions)
+
+        self.ordinal = _readonly(np.fromiter(
+            ((t.get_date_parts() or (-1,))[0] for t in self.transactions), dtype=np.int64, count=n
+        ))
+        self.amount_minor = _readonly(np.fromiter(
+            (t.amount_minor for t in self.transactions), dtype=np.int64, count=n
+        ))
+        self.amount = _readonly(self.amount_minor / MINOR_PER_UNIT)
+        type_code, self.types = _factorize([t.type for t in self.transactions])
+        category_code, self.categories = _factorize([t.category for t in self.transactions])
+        self.type_code = _readonly(type_code)
+        self.category_code = _readonly(category_code)
+
+        # Khóa tháng năm*12 + (tháng-1) tính từ năm 1970, -1 nếu ngày không hợp lệ
+        month_key = (self.ordinal - EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        month_key[self.ordinal < 0] = -1
+        self.month_key = _readonly(month_key)
+
+        self.is_income = _readonly(self.type_mask(*INCOME_TYPES))
+        self.is_expense = _readonly(self.type_mask(*EXPENSE_TYPES))
+
+    def __len__(self) -> int:
+        return len(self.transactions)
+
+    @property
+    def cube(self) -> ReportCube:
+        """Khối tổng hợp của ảnh chụp"""
+        if self._cube is None:
+            self._cube = ReportCube(self.transactions)
+        return self._cube
+
+    def sum_minor(self, mask: np.ndarray = None) -> int:
+        """Tổng chính xác (đơn vị nhỏ nhất) của các dòng được chọn"""
+        selected = self.amount_minor if mask is None else self.amount_minor[mask]
+        return int(selected.sum(dtype=np.int64))
+
+    def type_mask(self, *type_names: str) -> np.ndarray:
+        """Mặt nạ các dòng có loại giao dịch thuộc type_names"""
+        codes = [code for code, name in enumerate(self.types) if name in type_names]
+        return np.isin(self.type_code, codes)
+
+    @staticmethod
+    def month_key_of(month_year: str) -> int:
+        """Khóa tháng của chuỗi MM/YYYY, -1 nếu không hợp lệ"""
+        try:
+            month, year = month_year.split('/')
+            return (int(year) - 1970) * 12 + int(month) - 1
+        except (ValueError, AttributeError):
+            return -1
+
+    @staticmethod
+    def month_label(month_key: int) -> str:
+        """Chuỗi MM/YYYY của khóa tháng"""
+        year, month = divmod(int(month_key), 12)
+        return f"{month + 1:02d}/{year + 1970}"
+
+    def spent_by_category(self, month_year: str) -> Dict[str, float]:
+        """
+        Tổng chi tiêu theo danh mục trong một tháng
+
+        Args:
+            month_year: Tháng/năm (MM/YYYY)
+
+        Returns:
+            Dict[str, float]: {danh mục: tổng chi}, chỉ gồm danh mục có chi tiêu
+        """
+        mask = self.is_expense & (self.month_key == self.month_key_of(month_year))
+        totals = sum_by_group(self.category_code[mask], self.amount_minor[mask], len(self.categories))
+        return {self.categories[code]: int(totals[code]) / MINOR_PER_UNIT
+                for code in np.flatnonzero(totals).tolist()}
@@ -1,28 +1,49 @@
-from typing import Optional, List, Any
-from datetime import datetime
+from typing import Optional, List, Any, Tuple, Union
+from datetime import datetime, date
+from itertools import count
 from core_logic.models import Transaction
-from functools import lru_cache
+from core_logic.transaction_cache import get_cache_manager
+
+# Mã phiên bản duy nhất cho mỗi trạng thái cây, dùng làm khóa cache
+_tree_versions = count()
+
+def _ordinal(value: Union[date, str]) -> int:
+    """Ordinal của ngày (date/datetime hoặc chuỗi DD/MM/YYYY)"""
+    if isinstance(value, str):
+        value = datetime.strptime(value, "%d/%m/%Y")
+    return value.toordinal()
 
 class Node:
     """Node trong BST"""
     def __init__(self, transaction: Any):
         self.transaction = transaction
+        # Khóa (ordinal ngày, timestamp): so sánh theo thời gian thực, không theo chuỗi DD/MM/YYYY
+        self.key: Tuple[int, str] = transaction.sort_key()
         self.left = None
         self.right = None
         self.height = 1  # Cho cân bằng AVL
         self.size = 1    # Số node trong cây con
 
 class TransactionBST:
-    """Binary Search Tree cho giao dịch với cân bằng tự động"""
+    """
+    Binary Search Tree cho giao dịch với cân bằng tự động
+    
+    Cây được sắp theo (ngày, timestamp) nên duyệt inorder cho thứ tự thời
+    gian xác định, kể cả giữa các giao dịch cùng ngày.
+    """
     
     def __init__(self):
         self.root = None
         self._clear_cache()
     
     def _clear_cache(self):
-        """Xóa cache khi cây thay đổi"""
-        self.get_transactions_by_date_range.cache_clear()
-        self.get_height.cache_clear()
+        """Vô hiệu cache khi cây thay đổi (entry cũ sẽ bị cache manager loại dần)"""
+        self._version = next(_tree_versions)
+    
+    def __setstate__(self, state):
+        """Cây khôi phục từ pickle nhận mã phiên bản mới để không trùng khóa cache"""
+        self.__dict__.update(state)
+        self._clear_cache()
     
     def _get_height(self, node: Optional[Node]) -> int:
         """Lấy chiều cao của node"""
@@ -79,20 +100,24 @@ class TransactionBST:
         """Thêm giao dịch vào BST với cân bằng tự động"""
         try:
             self.root = self._insert_recursive(self.root, transaction)
+            self._clear_cache()
         except Exception as e:
             print(f"Lỗi khi thêm giao dịch vào BST: {e}")
     
     def _insert_recursive(self, node: Optional[Node], transaction: Any) -> Node:
         """Đệ quy thêm node và cân bằng cây"""
-        # Thêm node mới
+        return self._insert_node(node, Node(transaction))
+    
+    def _insert_node(self, node: Optional[Node], new_node: Node) -> Node:
+        """Đệ quy chèn node theo khóa; khóa trùng đi sang phải để giữ thứ tự chèn"""
         if not node:
-            return Node(transaction)
+            return new_node
         
         # Chèn vào cây con phù hợp
-        if transaction.date < node.transaction.date:
-            node.left = self._insert_recursive(node.left, transaction)
+        if new_node.key < node.key:
+            node.left = self._insert_node(node.left, new_node)
         else:
-            node.right = self._insert_recursive(node.right, transaction)
+            node.right = self._insert_node(node.right, new_node)
         
         # Cập nhật chiều cao và kích thước
         self._update_height_and_size(node)
@@ -100,52 +125,56 @@ class TransactionBST:
         # Lấy hệ số cân bằng
         balance = self._get_balance(node)
         
-        # Cân bằng cây nếu cần
-        # Trường hợp Left Left
-        if balance > 1 and transaction.date < node.left.transaction.date:
-            return self._right_rotate(node)
-        
-        # Trường hợp Right Right
-        if balance < -1 and transaction.date > node.right.transaction.date:
-            return self._left_rotate(node)
-        
-        # Trường hợp Left Right
-        if balance > 1 and transaction.date > node.left.transaction.date:
-            node.left = self._left_rotate(node.left)
+        # Cân bằng cây nếu cần, dựa trên hệ số cân bằng của cây con
+        # nên vẫn đúng khi có khóa trùng
+        if balance > 1:
+            # Trường hợp Left Right
+            if self._get_balance(node.left) < 0:
+                node.left = self._left_rotate(node.left)
+            # Trường hợp Left Left
             return self._right_rotate(node)
         
-        # Trường hợp Right Left
-        if balance < -1 and transaction.date < node.right.transaction.date:
-            node.right = self._right_rotate(node.right)
+        if balance < -1:
+            # Trường hợp Right Left
+            if self._get_balance(node.right) > 0:
+                node.right = self._right_rotate(node.right)
+            # Trường hợp Right Right
             return self._left_rotate(node)
         
         return node
     
-    @lru_cache(maxsize=128)
-    def get_transactions_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Any]:
+    def get_transactions_by_date_range(self, start_date: Union[date, str], end_date: Union[date, str]) -> List[Any]:
         """Lấy giao dịch trong khoảng thời gian với cache"""
+        start, end = _ordinal(start_date), _ordinal(end_date)
+        return get_cache_manager().get_or_compute(
+            "bst_range", (self._version, start, end),
+            lambda: self._collect_range(start, end)
+        )
+    
+    def _collect_range(self, start: int, end: int) -> List[Any]:
+        """Duyệt cây lấy giao dịch có ordinal ngày trong [start, end], theo thứ tự thời gian"""
         result = []
-        self._get_transactions_in_range(self.root, start_date, end_date, result)
+        self._get_transactions_in_range(self.root, start, end, result)
         return result
     
-    def _get_transactions_in_range(self, node: Optional[Node], start_date: datetime, 
-                                 end_date: datetime, result: List[Any]) -> None:
-        """Đệ quy lấy giao dịch trong khoảng thời gian"""
+    def _get_transactions_in_range(self, node: Optional[Node], start: int, 
+                                 end: int, result: List[Any]) -> None:
+        """Đệ quy lấy giao dịch trong khoảng ordinal - O(log n + k)"""
         if not node:
             return
+        
+        ordinal = node.key[0]
+        if ordinal >= start:
+            self._get_transactions_in_range(node.left, start, end, result)
             
-        if node.transaction.date >= start_date:
-            self._get_transactions_in_range(node.left, start_date, end_date, result)
-            
-        if start_date <= node.transaction.date <= end_date:
+        if start <= ordinal <= end:
             result.append(node.transaction)
             
-        if node.transaction.date <= end_date:
-            self._get_transactions_in_range(node.right, start_date, end_date, result)
+        if ordinal <= end:
+            self._get_transactions_in_range(node.right, start, end, result)
     
-    @lru_cache(maxsize=1)
     def get_height(self) -> int:
-        """Lấy chiều cao của cây với cache"""
+        """Lấy chiều cao của cây - O(1) nhờ chiều cao lưu ở gốc"""
         return self._get_height(self.root)
     
     def get_size(self) -> int:
@@ -153,38 +182,15 @@ class TransactionBST:
         return self.root.size if self.root else 0
 
     def find_range(self, start_date: str, end_date: str) -> List[Transaction]:
-        """Tìm giao dịch trong khoảng thời gian - O(log n)"""
+        """Tìm giao dịch trong khoảng thời gian - O(log n + k), theo thứ tự thời gian"""
         result = []
         try:
-            start_dt = datetime.strptime(start_date, "%d/%m/%Y")
-            end_dt = datetime.strptime(end_date, "%d/%m/%Y")
-            self._find_range_recursive(self.root, start_dt, end_dt, result)
+            # Ngày không hợp lệ có ordinal -1 nên không bao giờ nằm trong khoảng
+            self._get_transactions_in_range(self.root, _ordinal(start_date), _ordinal(end_date), result)
         except Exception as e:
             print(f"Lỗi khi tìm giao dịch trong khoảng: {e}")
         return result
 
-    def _find_range_recursive(self, node: Optional[Node], 
-                            start_dt: datetime, end_dt: datetime, 
-                            result: List[Transaction]) -> None:
-        """Đệ quy tìm giao dịch trong khoảng"""
-        if not node:
-            return
-            
-        try:
-            current_dt = datetime.strptime(node.transaction.date, "%d/%m/%Y")
-            
-            if current_dt >= start_dt:
-                self._find_range_recursive(node.left, start_dt, end_dt, result)
-                
-            if start_dt <= current_dt <= end_dt:
-                result.append(node.transaction)
-                
-            if current_dt <= end_dt:
-                self._find_range_recursive(node.right, start_dt, end_dt, result)
-                
-        except Exception as e:
-            print(f"Lỗi khi xử lý node trong khoảng: {e}")
-
     def to_list(self) -> List[Transaction]:
         """Chuyển BST thành list - inorder traversal"""
         result = []
@@ -1,116 +1,497 @@
-from collections import OrderedDict
-from typing import Any, Optional, Dict
-from datetime import datetime, timedelta
+from collections import OrderedDict, namedtuple
+from typing import Any, Optional, Dict, Tuple, Callable, List
+from datetime import timedelta
+from itertools import islice, count
+import sys
 import time
-from functools import lru_cache
+import threading
+import weakref
+from functools import lru_cache, wraps
+from config import CACHE_CONFIG
+
+# Độ phân giải (giây) và số ô của bánh xe thời gian dùng để quét entry hết hạn
+WHEEL_RESOLUTION = 1.0
+WHEEL_SLOTS = 64
+
+# Ước lượng kích thước: độ sâu duyệt tối đa và số phần tử lấy mẫu mỗi container
+SIZE_DEPTH = 4
+SIZE_SAMPLE = 8
+
+# Vị trí các trường trong một entry
+VALUE, EXPIRY, NBYTES, COST = range(4)
+
+# Giá trị đánh dấu không có trong cache (None vẫn là kết quả hợp lệ)
+_MISSING = object()
+
+# Số instance được giữ đủ maxsize entry cùng lúc trong namespace chung của một method
+METHOD_CACHE_OWNERS = 8
+
+
+def estimate_size(value: Any, depth: int = 0) -> int:
+    """
+    Ước lượng gần đúng số byte bộ nhớ của một giá trị
+    
+    Container chỉ được lấy mẫu vài phần tử đầu rồi nhân theo độ dài, mảng
+    NumPy dùng nbytes. Chỉ đối tượng ở gốc được cộng thêm __dict__; đối
+    tượng lồng bên trong (thường là Transaction do TransactionManager giữ)
+    chỉ tính phần vỏ vì cache chỉ giữ tham chiếu tới chúng.
+    
+    Args:
+        value: Giá trị cần ước lượng
+        depth: Độ sâu hiện tại (dùng khi đệ quy)
+        
+    Returns:
+        int: Số byte ước lượng
+    """
+    size = sys.getsizeof(value, 64)
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return size + nbytes
+    if depth >= SIZE_DEPTH or isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return size
+    
+    if isinstance(value, dict):
+        items = value.items()
+        count = len(value)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        items = value
+        count = len(value)
+    elif hasattr(value, "__dict__"):
+        return size + estimate_size(vars(value), depth + 1) if depth == 0 else size
+    else:
+        return size
+    
+    sample = list(islice(items, SIZE_SAMPLE))
+    if not sample:
+        return size
+    sampled = sum(estimate_size(item, depth + 1) for item in sample)
+    return size + sampled * count // len(sample)
+
+
+class _Namespace:
+    """Một vùng cache LRU có dung lượng và TTL riêng"""
+    
+    def __init__(self, capacity: int, default_ttl: Optional[float]):
+        self.capacity = capacity
+        self.default_ttl = default_ttl
+        # khóa -> [giá trị, hạn theo time.monotonic (inf nếu không hết hạn), số byte, chi phí]
+        self.entries: "OrderedDict[Any, list]" = OrderedDict()
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+
+class CacheCore:
+    """
+    Lõi cache LRU/TTL dùng chung cho LRUCache và TransactionCache
+    
+    Mỗi namespace là một OrderedDict nên get/put/evict đều O(1). Thời gian
+    dùng time.monotonic nên không bị ảnh hưởng khi đồng hồ hệ thống thay
+    đổi. Entry hết hạn bị loại khi được truy cập (lazy) và định kỳ qua một
+    bánh xe thời gian: mỗi ô chứa các entry hết hạn trong cùng một nhịp,
+    nên mỗi lần quét chỉ duyệt các ô đã tới hạn thay vì toàn bộ cache.
+    
+    Khi có max_bytes, kích thước từng entry được ước lượng và tổng bộ nhớ
+    được giữ dưới ngân sách: trong vài entry ít dùng gần đây nhất (trên mọi
+    namespace), entry có chi phí tính lại trên mỗi byte thấp nhất bị loại.
+    """
+    
+    def __init__(self, capacities: Dict[str, int] = None, default_ttl: Optional[float] = None,
+                 default_capacity: int = 100, max_bytes: Optional[int] = None,
+                 eviction_sample: int = 8):
+        """
+        Args:
+            capacities: Dung lượng theo namespace, namespace khác dùng default_capacity
+            default_ttl: TTL mặc định (giây), None để không hết hạn
+            default_capacity: Dung lượng cho namespace không được cấu hình
+            max_bytes: Tổng số byte tối đa trên mọi namespace, None để không giới hạn
+            eviction_sample: Số entry cũ nhất được xét khi loại theo bộ nhớ
+        """
+        self._capacities = dict(capacities or {})
+        self._default_ttl = default_ttl
+        self._default_capacity = default_capacity
+        self.max_bytes = max_bytes
+        self._eviction_sample = max(1, eviction_sample)
+        self._namespaces: Dict[str, _Namespace] = {}
+        # (namespace, khóa) theo thứ tự dùng gần đây trên mọi namespace
+        self._recency: "OrderedDict[Tuple[str, Any], None]" = OrderedDict()
+        self._nbytes = 0
+        self._wheel = [[] for _ in range(WHEEL_SLOTS)]
+        self._tick = int(time.monotonic() / WHEEL_RESOLUTION)
+        # Cache có thể được dùng từ luồng báo cáo nền
+        self._lock = threading.RLock()
+    
+    def namespace(self, name: str, capacity: int = None, ttl: Optional[float] = None) -> _Namespace:
+        """
+        Lấy (hoặc tạo) một namespace
+        
+        Args:
+            name: Tên namespace
+            capacity: Dung lượng mặc định, cấu hình theo namespace được ưu tiên
+            ttl: TTL mặc định của namespace (giây)
+        """
+        space = self._namespaces.get(name)
+        if space is None:
+            with self._lock:
+                space = self._namespaces.get(name)
+                if space is None:
+                    if capacity is None:
+                        capacity = self._default_capacity
+                    capacity = self._capacities.get(name, capacity)
+                    space = self._namespaces[name] = _Namespace(
+                        capacity, ttl if ttl is not None else self._default_ttl
+                    )
+        return space
+    
+    def get(self, name: str, key: Any, default: Any = None) -> Any:
+        """Lấy giá trị còn hạn và đánh dấu vừa dùng - O(1)"""
+        with self._lock:
+            self._advance()
+            space = self.namespace(name)
+            entry = space.entries.get(key)
+            if entry is None:
+                space.misses += 1
+                return default
+            if entry[EXPIRY] <= time.monotonic():
+                self._discard(name, space, key)
+                space.expirations += 1
+                space.misses += 1
+                return default
+            space.entries.move_to_end(key)
+            self._recency.move_to_end((name, key))
+            space.hits += 1
+            return entry[VALUE]
+    
+    def put(self, name: str, key: Any, value: Any, ttl: Optional[float] = None,
+            cost: float = 1.0) -> None:
+        """
+        Thêm/cập nhật giá trị, loại entry ít dùng nhất khi đầy - O(1)
+        
+        Args:
+            name: Tên namespace
+            key: Khóa
+            value: Giá trị
+            ttl: Thời gian sống (giây), mặc định theo namespace
+            cost: Chi phí tính lại giá trị (ví dụ số giây), dùng khi loại theo bộ nhớ
+        """
+        nbytes = estimate_size(value) if self.max_bytes is not None else 0
+        with self._lock:
+            self._advance()
+            space = self.namespace(name)
+            if key in space.entries:
+                self._discard(name, space, key)
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                return  # Lớn hơn cả ngân sách: không lưu
+            
+            if ttl is None:
+                ttl = space.default_ttl
+            expiry = time.monotonic() + ttl if ttl is not None else float("inf")
+            
+            space.entries[key] = [value, expiry, nbytes, cost]
+            space.nbytes += nbytes
+            self._nbytes += nbytes
+            self._recency[(name, key)] = None
+            if expiry != float("inf"):
+                self._wheel[int(expiry / WHEEL_RESOLUTION) % WHEEL_SLOTS].append((name, key, expiry))
+            
+            while len(space.entries) > space.capacity:
+                self._discard(name, space, next(iter(space.entries)))
+                space.evictions += 1
+            if self.max_bytes is not None:
+                while self._nbytes > self.max_bytes and self._recency:
+                    self._evict_by_cost()
+    
+    def _discard(self, name: str, space: _Namespace, key: Any) -> None:
+        """Bỏ một entry và cập nhật bộ đếm byte"""
+        entry = space.entries.pop(key)
+        space.nbytes -= entry[NBYTES]
+        self._nbytes -= entry[NBYTES]
+        self._recency.pop((name, key), None)
+    
+    def _evict_by_cost(self) -> None:
+        """Loại entry rẻ nhất (chi phí/byte) trong các entry ít dùng gần đây nhất"""
+        victim = None
+        best = float("inf")
+        for name, key in islice(self._recency, self._eviction_sample):
+            entry = self._namespaces[name].entries[key]
+            score = entry[COST] / max(entry[NBYTES], 1)
+            if score < best:
+                victim, best = (name, key), score
+        name, key = victim
+        space = self._namespaces[name]
+        self._discard(name, space, key)
+        space.evictions += 1
+    
+    def pop(self, name: str, key: Any) -> None:
+        """Xóa một entry"""
+        with self._lock:
+            space = self._namespaces.get(name)
+            if space is not None and key in space.entries:
+                self._discard(name, space, key)
+    
+    def clear(self, name: str = None) -> None:
+        """Xóa một namespace hoặc toàn bộ cache"""
+        with self._lock:
+            names = [name] if name is not None else list(self._namespaces)
+            for current in names:
+                space = self._namespaces.get(current)
+                if space is None:
+                    continue
+                for key in space.entries:
+                    self._recency.pop((current, key), None)
+                self._nbytes -= space.nbytes
+                space.nbytes = 0
+                space.entries.clear()
+    
+    def items(self, name: str) -> List[Tuple[Any, Any]]:
+        """
+        Các cặp (khóa, giá trị) còn hạn của namespace, cũ nhất trước
+        
+        Args:
+            name: Tên namespace
+        """
+        with self._lock:
+            space = self._namespaces.get(name)
+            if space is None:
+                return []
+            now = time.monotonic()
+            return [(key, entry[VALUE]) for key, entry in space.entries.items() if entry[EXPIRY] > now]
+    
+    def size(self, name: str) -> int:
+        """Số entry hiện có trong namespace"""
+        space = self._namespaces.get(name)
+        return len(space.entries) if space is not None else 0
+    
+    @property
+    def nbytes(self) -> int:
+        """Tổng số byte ước lượng của mọi entry"""
+        return self._nbytes
+    
+    def expire(self) -> int:
+        """
+        Quét các ô đã tới hạn của bánh xe thời gian
+        
+        Returns:
+            int: Số entry hết hạn đã bị loại
+        """
+        with self._lock:
+            return self._advance(force=True)
+    
+    def _advance(self, force: bool = False) -> int:
+        """Quay bánh xe tới nhịp hiện tại, loại các entry đã hết hạn"""
+        now = time.monotonic()
+        tick = int(now / WHEEL_RESOLUTION)
+        if tick == self._tick and not force:
+            return 0
+        
+        removed = 0
+        start = self._tick if tick - self._tick < WHEEL_SLOTS else tick - WHEEL_SLOTS + 1
+        for current in range(start, tick + 1):
+            slot = self._wheel[current % WHEEL_SLOTS]
+            pending = []
+            for name, key, expiry in slot:
+                space = self._namespaces.get(name)
+                entry = space.entries.get(key) if space is not None else None
+                if entry is None or entry[EXPIRY] != expiry:
+                    continue  # Entry đã bị xóa hoặc được ghi lại với hạn mới
+                if expiry <= now:
+                    self._discard(name, space, key)
+                    space.expirations += 1
+                    removed += 1
+                else:
+                    pending.append((name, key, expiry))  # Hạn ở vòng quay sau
+            slot[:] = pending
+        self._tick = tick
+        return removed
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Thống kê theo namespace
+        
+        Returns:
+            Dict: {namespace: {size, capacity, bytes, hits, misses, evictions, expirations}}
+        """
+        with self._lock:
+            return {
+                name: {
+                    "size": len(space.entries),
+                    "capacity": space.capacity,
+                    "bytes": space.nbytes,
+                    "hits": space.hits,
+                    "misses": space.misses,
+                    "evictions": space.evictions,
+                    "expirations": space.expirations
+                }
+                for name, space in self._namespaces.items()
+            }
+
+
+class CacheManager(CacheCore):
+    """
+    Sổ đăng ký cache dùng chung cho toàn ứng dụng
+    
+    Cấu hình từ CACHE_CONFIG: tổng ngân sách byte, dung lượng theo
+    namespace. Mọi cache trong ứng dụng (giao dịch đã lọc, trạng thái
+    ngân sách, truy vấn khoảng của BST, cached_method) dùng chung một
+    ngân sách nên phiên làm việc dài không làm bộ nhớ phình ra.
+    """
+    
+    def __init__(self, config: Dict[str, Any] = None):
+        """
+        Args:
+            config: Cấu hình cache, mặc định là CACHE_CONFIG
+        """
+        config = config if config is not None else CACHE_CONFIG
+        super().__init__(
+            capacities=config.get("namespaces"),
+            default_capacity=config.get("default_capacity", 128),
+            max_bytes=config.get("max_bytes"),
+            eviction_sample=config.get("eviction_sample", 8)
+        )
+    
+    def get_or_compute(self, name: str, key: Any, compute: Callable[[], Any],
+                       ttl: Optional[float] = None) -> Any:
+        """
+        Lấy giá trị từ cache, tính và lưu lại nếu chưa có
+        
+        Thời gian tính được dùng làm chi phí của entry khi loại theo bộ nhớ.
+        
+        Args:
+            name: Tên namespace
+            key: Khóa (phải băm được)
+            compute: Hàm tính giá trị
+            ttl: Thời gian sống (giây), mặc định theo namespace
+        """
+        value = self.get(name, key, _MISSING)
+        if value is not _MISSING:
+            return value
+        started = time.perf_counter()
+        value = compute()
+        self.put(name, key, value, ttl=ttl, cost=time.perf_counter() - started)
+        return value
+    
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Ảnh chụp thống kê toàn bộ cache
+        
+        Returns:
+            Dict: {"bytes", "max_bytes", "entries", "hits", "misses", "evictions", "namespaces"}
+        """
+        namespaces = self.stats()
+        return {
+            "bytes": self.nbytes,
+            "max_bytes": self.max_bytes,
+            "entries": sum(item["size"] for item in namespaces.values()),
+            "hits": sum(item["hits"] for item in namespaces.values()),
+            "misses": sum(item["misses"] for item in namespaces.values()),
+            "evictions": sum(item["evictions"] for item in namespaces.values()),
+            "namespaces": namespaces
+        }
+
+
+_manager: Optional[CacheManager] = None
+
+
+def get_cache_manager() -> CacheManager:
+    """Cache manager dùng chung của ứng dụng (tạo khi cần)"""
+    global _manager
+    if _manager is None:
+        _manager = CacheManager()
+    return _manager
+
 
 class LRUCache:
     """LRU Cache cho kết quả tính toán phổ biến"""
     
-    def __init__(self, capacity: int = 100):
-        self.cache = OrderedDict()
+    def __init__(self, capacity: int = 100, core: CacheCore = None, namespace: str = "lru"):
+        """
+        Args:
+            capacity: Số entry tối đa
+            core: Lõi cache dùng chung (mặc định tạo lõi riêng)
+            namespace: Tên namespace trong lõi
+        """
         self.capacity = capacity
-        self.expiry_times = {}
         self.default_ttl = timedelta(minutes=5)  # Time To Live mặc định
+        self._core = core or CacheCore()
+        self._namespace = namespace
+        self._core.namespace(namespace, capacity=capacity, ttl=self.default_ttl.total_seconds())
 
     def get(self, key: str) -> Optional[Any]:
         """Lấy giá trị từ cache"""
-        if key not in self.cache:
-            return None
-            
-        # Kiểm tra hết hạn
-        if datetime.now() > self.expiry_times[key]:
-            self.cache.pop(key)
-            self.expiry_times.pop(key)
-            return None
-            
-        # Di chuyển item lên đầu cache
-        self.cache.move_to_end(key)
-        return self.cache[key]
+        return self._core.get(self._namespace, key)
 
     def put(self, key: str, value: Any, ttl: Optional[timedelta] = None) -> None:
         """Thêm giá trị vào cache"""
-        if key in self.cache:
-            self.cache.pop(key)
-            
-        # Xóa item cũ nhất nếu cache đầy
-        if len(self.cache) >= self.capacity:
-            oldest_key, _ = self.cache.popitem(last=False)
-            self.expiry_times.pop(oldest_key)
-            
-        self.cache[key] = value
-        self.cache.move_to_end(key)
-        
-        # Cập nhật thời gian hết hạn
-        expiry = datetime.now() + (ttl if ttl else self.default_ttl)
-        self.expiry_times[key] = expiry
+        self._core.put(self._namespace, key, value, ttl.total_seconds() if ttl else None)
 
     def clear_expired(self) -> None:
         """Xóa các item hết hạn"""
-        now = datetime.now()
-        expired_keys = [
-            key for key, expiry in self.expiry_times.items() 
-            if now > expiry
-        ]
-        for key in expired_keys:
-            self.cache.pop(key)
-            self.expiry_times.pop(key)
+        self._core.expire()
+
+    def stats(self) -> Dict[str, int]:
+        """Thống kê hit/miss/eviction của cache"""
+        return self._core.stats()[self._namespace]
 
 class TransactionCache:
     """Cache cho các tính toán liên quan đến giao dịch"""
     
-    def __init__(self, ttl_seconds: int = 300, max_size: int = 1000):
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._timestamps: Dict[str, float] = {}
+    def __init__(self, ttl_seconds: int = 300, max_size: int = 1000,
+                 capacities: Dict[str, int] = None, core: CacheCore = None, prefix: str = ""):
+        """
+        Args:
+            ttl_seconds: TTL của cache chung (giây)
+            max_size: Dung lượng của cache chung
+            capacities: Dung lượng theo namespace (ghi đè mặc định)
+            core: Lõi cache dùng chung (ví dụ get_cache_manager()), mặc định tạo lõi riêng
+            prefix: Tiền tố tên namespace khi dùng chung lõi
+        """
         self._ttl_seconds = ttl_seconds
         self._max_size = max_size
-        self.monthly_summary_cache = LRUCache(capacity=12)  # Cache cho 12 tháng
-        self.category_analysis_cache = LRUCache(capacity=10)  # Cache cho 10 danh mục
+        capacities = {"default": max_size, "monthly_summary": 12, "category_analysis": 10, **(capacities or {})}
+        self.core = core or CacheCore(capacities=capacities)
+        self._names = {name: f"{prefix}{name}" for name in capacities}
+        self.core.namespace(self._names["default"], capacity=max_size, ttl=ttl_seconds)
+        self.monthly_summary_cache = LRUCache(capacities["monthly_summary"], self.core,
+                                              self._names["monthly_summary"])  # Cache cho 12 tháng
+        self.category_analysis_cache = LRUCache(capacities["category_analysis"], self.core,
+                                                self._names["category_analysis"])  # Cache cho 10 danh mục
         
     def get(self, key: str) -> Optional[Dict[str, Any]]:
         """Lấy giá trị từ cache với kiểm tra TTL"""
-        if key in self._cache:
-            if time.time() - self._timestamps[key] > self._ttl_seconds:
-                # TTL hết hạn
-                self._remove(key)
-                return None
-            return self._cache[key]
-        return None
+        return self.core.get(self._names["default"], key)
     
     def set(self, key: str, value: Dict[str, Any]) -> None:
         """Thêm giá trị vào cache với quản lý kích thước"""
-        if len(self._cache) >= self._max_size:
-            # Xóa entry cũ nhất
-            oldest_key = min(self._timestamps.items(), key=lambda x: x[1])[0]
-            self._remove(oldest_key)
-        
-        self._cache[key] = value
-        self._timestamps[key] = time.time()
+        self.core.put(self._names["default"], key, value)
     
     def _remove(self, key: str) -> None:
         """Xóa một entry khỏi cache"""
-        self._cache.pop(key, None)
-        self._timestamps.pop(key, None)
+        self.core.pop(self._names["default"], key)
     
     def clear(self) -> None:
         """Xóa toàn bộ cache"""
-        self._cache.clear()
-        self._timestamps.clear()
+        self.core.clear(self._names["default"])
+    
+    def invalidate(self) -> None:
+        """Xóa mọi namespace của cache khi dữ liệu thay đổi"""
+        for name in self._names.values():
+            self.core.clear(name)
     
     @property
     def size(self) -> int:
         """Lấy kích thước hiện tại của cache"""
-        return len(self._cache)
+        return self.core.size(self._names["default"])
     
     def cleanup_expired(self) -> None:
         """Dọn dẹp các entry hết hạn"""
-        current_time = time.time()
-        expired_keys = [
-            key for key, timestamp in self._timestamps.items()
-            if current_time - timestamp > self._ttl_seconds
-        ]
-        for key in expired_keys:
-            self._remove(key)
+        self.core.expire()
+    
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """Thống kê hit/miss/eviction theo namespace (tên không kèm tiền tố)"""
+        stats = self.core.stats()
+        return {name: stats[full_name] for name, full_name in self._names.items() if full_name in stats}
 
     def get_monthly_summary(self, month_year: str) -> Optional[dict]:
         """Lấy tóm tắt tháng từ cache"""
@@ -136,29 +517,118 @@ class TransactionCache:
             ttl=timedelta(minutes=15)  # Cache trong 15 phút
         )
 
+# Thống kê của cache method, tương tự functools.lru_cache
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+
+def _default_version(instance: Any) -> Any:
+    """Token phiên bản dữ liệu mặc định: thuộc tính data_version của instance"""
+    return getattr(instance, "data_version", None)
+
+
 # Decorator cho phương thức với cache
-def cached_method(ttl_seconds: int = 300):
-    """Decorator để cache kết quả của method với TTL"""
+def cached_method(ttl_seconds: Optional[float] = 300, maxsize: int = 128,
+                  version: Callable[[Any], Any] = _default_version):
+    """
+    Decorator để cache kết quả của method theo instance và phiên bản dữ liệu
+    
+    Kết quả được lưu trong cache manager dùng chung, mỗi method một
+    namespace (dung lượng maxsize * METHOD_CACHE_OWNERS, có thể ghi đè trong
+    CACHE_CONFIG) chịu chung ngân sách bộ nhớ; thời gian tính được dùng làm
+    chi phí khi loại theo bộ nhớ. Mỗi instance giữ tối đa maxsize entry
+    theo LRU riêng nên các instance không loại kết quả của nhau. Khóa gồm
+    mã instance, token phiên bản dữ liệu và tham số nên kết quả không bị
+    lẫn giữa các instance. Khi phiên bản đổi hoặc instance bị thu gom, các
+    entry của instance đó được xóa ngay.
+    
+    Args:
+        ttl_seconds: Thời gian sống của entry (giây), None để không hết hạn
+        maxsize: Số entry tối đa của method cho mỗi instance
+        version: Hàm lấy token phiên bản dữ liệu từ instance
+    """
     def decorator(func):
-        cache = {}
-        timestamps = {}
+        name = f"method:{func.__module__}.{func.__qualname__}"
+        # id(instance) -> [weakref tới instance, mã instance, token phiên bản,
+        #                  các khóa đã lưu theo thứ tự dùng gần nhất]
+        owners: Dict[int, list] = {}
+        instance_ids = count()
+        stats = {"hits": 0, "misses": 0}
         
-        def wrapper(*args, **kwargs):
-            key = str((args, frozenset(kwargs.items())))
-            current_time = time.time()
+        def drop(owner: list) -> None:
+            manager = get_cache_manager()
+            for key in owner[3]:
+                manager.pop(name, key)
+            owner[3].clear()
+        
+        def get_owner(instance) -> list:
+            owner = owners.get(id(instance))
+            if owner is not None and owner[0]() is instance:
+                return owner
+            key = id(instance)
             
-            if key in cache:
-                if current_time - timestamps[key] <= ttl_seconds:
-                    return cache[key]
-                else:
-                    # TTL hết hạn
-                    del cache[key]
-                    del timestamps[key]
+            def release(_ref):
+                released = owners.pop(key, None)
+                if released is not None:
+                    drop(released)
             
-            result = func(*args, **kwargs)
-            cache[key] = result
-            timestamps[key] = current_time
-            return result
+            owner = owners[key] = [weakref.ref(instance, release), next(instance_ids), None, OrderedDict()]
+            return owner
+        
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            try:
+                token = version(self)
+                owner = get_owner(self)
+                key = (owner[1], token, args, tuple(sorted(kwargs.items())))
+                hash(key)
+            except TypeError:
+                # Tham số hoặc instance không băm được: gọi trực tiếp
+                stats["misses"] += 1
+                return func(self, *args, **kwargs)
+            
+            manager = get_cache_manager()
+            manager.namespace(name, capacity=maxsize * METHOD_CACHE_OWNERS, ttl=ttl_seconds)
+            if owner[2] != token:
+                # Dữ liệu đã thay đổi: bỏ mọi kết quả của phiên bản cũ
+                drop(owner)
+                owner[2] = token
             
+            cached = manager.get(name, key, _MISSING)
+            if cached is not _MISSING:
+                stats["hits"] += 1
+                owner[3][key] = None
+                owner[3].move_to_end(key)
+                return cached
+            
+            stats["misses"] += 1
+            started = time.perf_counter()
+            result = func(self, *args, **kwargs)
+            manager.put(name, key, result, cost=time.perf_counter() - started)
+            owner[3][key] = None
+            owner[3].move_to_end(key)
+            while len(owner[3]) > maxsize:
+                # Vượt giới hạn của instance: loại khóa ít dùng nhất của chính instance đó
+                oldest, _ = owner[3].popitem(last=False)
+                manager.pop(name, oldest)
+            return result
+        
+        def cache_info() -> CacheInfo:
+            """Thống kê hit/miss và số entry hiện có trên mọi instance"""
+            return CacheInfo(stats["hits"], stats["misses"], maxsize, get_cache_manager().size(name))
+        
+        def cache_clear(instance: Any = None) -> None:
+            """Xóa cache của một instance, hoặc của tất cả nếu không chỉ định"""
+            if instance is None:
+                get_cache_manager().clear(name)
+                for owner in owners.values():
+                    owner[3].clear()
+                stats["hits"] = stats["misses"] = 0
+            else:
+                owner = owners.get(id(instance))
+                if owner is not None and owner[0]() is instance:
+                    drop(owner)
+        
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
         return wrapper
-    return decorator 
\ No newline at end of file
+    return decorator
@@ -1,49 +1,178 @@
 #Quản lý giao dịch  
 
+import threading
 from datetime import datetime
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Callable, Optional
 from storage.file_handler import FileHandler
 from utils.validators import (
     validate_date, validate_amount, validate_category, 
     validate_description, validate_transaction_type, sanitize_input
 )
 from config import DEFAULT_CATEGORIES
+from utils.money import to_minor
 from core_logic.models import Transaction
 from core_logic.transaction_bst import TransactionBST
-from core_logic.transaction_cache import TransactionCache
+from core_logic.report_engine import ReportCube
+from core_logic.online_stats import OnlineStatistics
+from core_logic.snapshot import DatasetSnapshot, SnapshotSource
+from storage.warm_cache import WarmCache
 
 class TransactionManager:
     """Class quản lý các giao dịch"""
     
-    def __init__(self):
+    def __init__(self, warm_cache: WarmCache = None):
+        """
+        Args:
+            warm_cache: Nơi lưu trạng thái đã tính để khởi động nhanh (tùy chọn)
+        """
         self.file_handler = FileHandler()
+        self.warm_cache = warm_cache
+        # Phiên bản dữ liệu, tăng mỗi khi danh sách giao dịch thay đổi
+        self.data_version = 0
+        self._snapshot = None
+        self._snapshot_lock = threading.Lock()
         self.transactions: List[Transaction] = []
         self.transaction_tree = TransactionBST()
-        self.cache = TransactionCache()
-        self.load_transactions()
+        self._listeners: List[Callable[[str, Transaction], None]] = []
+        if not self.restore_warm_state():
+            self.load_transactions()
+    
+    @property
+    def transactions(self) -> List[Transaction]:
+        """Danh sách giao dịch trong bộ nhớ"""
+        return self._transactions
+    
+    @transactions.setter
+    def transactions(self, transactions: List[Transaction]) -> None:
+        """Gán lại toàn bộ danh sách giao dịch và xây dựng lại kho tổng hợp"""
+        self._transactions = transactions
+        self.rebuild_aggregates()
+        self.data_version += 1
+    
+    def subscribe(self, listener: Callable[[str, Transaction], None]) -> None:
+        """
+        Đăng ký nhận sự kiện thay đổi dữ liệu
+        
+        Args:
+            listener: Hàm nhận (event, transaction) với event là "added" hoặc "removed"
+        """
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+    
+    def unsubscribe(self, listener: Callable[[str, Transaction], None]) -> None:
+        """Hủy đăng ký nhận sự kiện thay đổi dữ liệu"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+    
+    def _notify(self, event: str, transaction: Transaction) -> None:
+        """Phát sự kiện thay đổi tới các listener đã đăng ký"""
+        for listener in list(self._listeners):
+            try:
+                listener(event, transaction)
+            except Exception as e:
+                print(f"Lỗi khi xử lý sự kiện {event}: {e}")
+    
+    def restore_warm_state(self) -> bool:
+        """
+        Khôi phục giao dịch, chỉ mục BST, kho tổng hợp và thống kê đã lưu
+        
+        Chỉ dùng khi file giao dịch chưa thay đổi kể từ lần lưu, nhờ vậy
+        khởi động không phải đọc và phân tích lại toàn bộ lịch sử.
+        
+        Returns:
+            bool: True nếu đã khôi phục, False nếu cần tải lại từ file
+        """
+        if self.warm_cache is None:
+            return False
+        state = self.warm_cache.load("transactions", [self.file_handler.transactions_file])
+        if not state:
+            return False
+        try:
+            transactions = state["transactions"]
+            transaction_tree = state["transaction_tree"]
+            aggregates = state["aggregates"]
+            statistics = state["statistics"]
+        except (KeyError, TypeError):
+            return False
+        
+        self._transactions = transactions
+        self.transaction_tree = transaction_tree
+        self.aggregates = aggregates
+        self.statistics = statistics
+        self.data_version += 1
+        # File khớp với trạng thái đã lưu: lần nạp lại sau chỉ cần đọc phần ghi thêm
+        self.file_handler.mark_loaded()
+        return True
+    
+    def save_warm_state(self) -> bool:
+        """
+        Lưu trạng thái đã tính kèm dấu vân tay của file giao dịch
+        
+        Returns:
+            bool: True nếu thành công, False nếu thất bại hoặc không có nơi lưu
+        """
+        if self.warm_cache is None:
+            return False
+        return self.warm_cache.save("transactions", [self.file_handler.transactions_file], {
+            "transactions": self.transactions,
+            "transaction_tree": self.transaction_tree,
+            "aggregates": self.aggregates,
+            "statistics": self.statistics
+        })
     
     def load_transactions(self) -> bool:
         """Tải tất cả giao dịch từ file"""
         try:
             transaction_dicts = self.file_handler.load_transactions()
             
-            self.transactions = []
+            transactions = []
             self.transaction_tree = TransactionBST()
             
             for data in transaction_dicts:
                 transaction = Transaction.from_dict(data)
-                self.transactions.append(transaction)
+                transactions.append(transaction)
                 try:
                     self.transaction_tree.insert(transaction)
                 except Exception as e:
                     print(f"Lỗi khi thêm giao dịch vào BST: {e}")
                     continue
             
+            self.transactions = transactions
             return True
         except Exception as e:
             print(f"Lỗi khi tải giao dịch: {e}")
             return False
     
+    def reload_transactions(self) -> Optional[List[Transaction]]:
+        """
+        Nạp các giao dịch do tiến trình khác ghi thêm vào cuối file
+        
+        Chỉ phân tích phần đuôi mới của file và cộng dồn vào BST, kho tổng
+        hợp và thống kê; nếu phần đã nạp bị thay đổi (file bị ghi đè, cắt
+        ngắn...) thì tải lại toàn bộ.
+        
+        Returns:
+            Optional[List[Transaction]]: Các giao dịch mới (có thể rỗng),
+            None nếu đã phải tải lại toàn bộ
+        """
+        appended = self.file_handler.load_appended_transactions()
+        if appended is None:
+            self.load_transactions()
+            return None
+        
+        added = []
+        for data in appended:
+            transaction = Transaction.from_dict(data)
+            self._transactions.append(transaction)
+            self.transaction_tree.insert(transaction)
+            self.aggregates.add(transaction)
+            self.statistics.add(transaction)
+            added.append(transaction)
+        
+        if added:
+            self.data_version += 1
+        return added
+    
     def add_transaction(self, date: str, transaction_type: str, category: str, 
                        amount: float, description: str = "", timestamp: str = None) -> Tuple[bool, str]:
         """Thêm giao dịch mới"""
@@ -82,10 +211,11 @@ class TransactionManager:
                 # Thêm vào memory và BST
                 self.transactions.append(transaction)
                 self.transaction_tree.insert(transaction)
+                self.aggregates.add(transaction)
+                self.statistics.add(transaction)
+                self.data_version += 1
                 
-                # Clear cache vì dữ liệu đã thay đổi
-                self.cache = TransactionCache()
-                
+                self._notify("added", transaction)
                 return True, "Đã thêm giao dịch thành công!"
             else:
                 return False, "Không thể lưu giao dịch vào file!"
@@ -128,35 +258,92 @@ class TransactionManager:
             print(f"Lỗi khi lọc giao dịch: {e}")
             return []
     
+    def rebuild_aggregates(self) -> None:
+        """
+        Xây dựng lại kho tổng hợp từ toàn bộ giao dịch hiện có
+        
+        Kho tổng hợp theo tháng/tuần ISO/ngày được cộng dồn khi thêm giao dịch
+        và chỉ xây dựng lại khi nạp file hoặc xóa giao dịch. Thống kê trực
+        tuyến được cập nhật O(1) cho cả thêm và xóa.
+        """
+        self.aggregates = ReportCube(self.transactions)
+        self.statistics = OnlineStatistics(self.transactions)
+    
+    def snapshot(self) -> DatasetSnapshot:
+        """
+        Ảnh chụp dạng cột của dữ liệu hiện tại
+        
+        Được xây dựng một lần cho mỗi phiên bản dữ liệu và dùng chung (chỉ
+        đọc) cho phân tích, báo cáo và ngân sách.
+        
+        Returns:
+            DatasetSnapshot: Ảnh chụp ứng với data_version hiện tại
+        """
+        snapshot = self._snapshot
+        if snapshot is None or snapshot.version != self.data_version:
+            snapshot = DatasetSnapshot(
+                self.transactions, version=self.data_version, cube=self.aggregates.copy()
+            )
+            with self._snapshot_lock:
+                self._snapshot = snapshot
+        return snapshot
+    
+    def snapshot_source(self) -> Any:
+        """
+        Phần cần lấy trên luồng Tk để dựng ảnh chụp ở luồng nền
+        
+        Chỉ sao chép nông danh sách giao dịch (không phân tích, không sao
+        chép kho tổng hợp) nên không chặn giao diện sau mỗi thay đổi.
+        
+        Returns:
+            Ảnh chụp hiện tại nếu đã có, ngược lại SnapshotSource(data_version, bản sao danh sách)
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self.data_version:
+            return snapshot
+        return SnapshotSource(self.data_version, list(self.transactions))
+    
+    def build_snapshot(self, source: Any) -> DatasetSnapshot:
+        """
+        Dựng ảnh chụp từ kết quả của snapshot_source(), an toàn ở luồng nền
+        
+        Khối tổng hợp của ảnh chụp được dựng (khi cần) từ danh sách đã sao
+        chép. Ảnh chụp mới được giữ lại để các tác vụ sau cùng phiên bản dùng chung.
+        
+        Args:
+            source: Ảnh chụp hoặc SnapshotSource
+        
+        Returns:
+            DatasetSnapshot: Ảnh chụp ứng với phiên bản của source
+        """
+        if isinstance(source, DatasetSnapshot):
+            return source
+        current = self._snapshot
+        if current is not None and current.version == source.version:
+            return current
+        
+        snapshot = DatasetSnapshot(source.transactions, version=source.version)
+        with self._snapshot_lock:
+            current = self._snapshot
+            if current is not None and current.version == source.version:
+                return current
+            if current is None or current.version < source.version:
+                self._snapshot = snapshot
+        return snapshot
+    
     def get_monthly_summary(self, month_year: str = None) -> Dict[str, Any]:
-        """Tạo tóm tắt theo tháng với cache"""
+        """Tạo tóm tắt theo tháng từ kho tổng hợp"""
         if month_year is None:
             month_year = datetime.now().strftime("%m/%Y")
-            
-        # Kiểm tra cache
-        cached_summary = self.cache.get_monthly_summary(month_year)
-        if cached_summary:
-            return cached_summary
-            
-        # Tính toán mới nếu không có trong cache
-        monthly_transactions = [t for t in self.transactions if t.get_month_year() == month_year]
-        
-        income = sum(t.amount for t in monthly_transactions if t.type in ["Thu nhập", "income"])
-        expense = sum(t.amount for t in monthly_transactions if t.type in ["Chi tiêu", "expense"])
-        balance = income - expense
         
-        summary = {
+        totals = self.aggregates.month_totals(month_year)
+        return {
             "month_year": month_year,
-            "income": income,
-            "expense": expense,
-            "balance": balance,
-            "transaction_count": len(monthly_transactions)
+            "income": totals["income"],
+            "expense": totals["expense"],
+            "balance": totals["income"] - totals["expense"],
+            "transaction_count": totals["transaction_count"]
         }
-        
-        # Lưu vào cache
-        self.cache.cache_monthly_summary(month_year, summary)
-        
-        return summary
 
     def delete_transaction(self, transaction_data: Dict[str, Any]) -> Tuple[bool, str]:
         """Xóa một giao dịch"""
@@ -165,10 +352,18 @@ class TransactionManager:
             if not isinstance(transaction_data, dict):
                 return False, "Dữ liệu giao dịch không hợp lệ"
             
-            required_fields = ["date", "type", "category", "amount", "timestamp"]
+            required_fields = ["date", "type", "category", "timestamp"]
             for field in required_fields:
                 if field not in transaction_data:
                     return False, f"Thiếu thông tin {field}"
+            # Số tiền có thể ở dạng amount_minor (ví dụ vars(transaction)) hoặc amount
+            if transaction_data.get("amount_minor") is None and "amount" not in transaction_data:
+                return False, "Thiếu thông tin amount"
+            
+            # Số tiền được so khớp chính xác theo đơn vị nhỏ nhất
+            amount_minor = transaction_data.get("amount_minor")
+            if amount_minor is None:
+                amount_minor = to_minor(transaction_data["amount"])
             
             # Tìm giao dịch cần xóa
             for i, transaction in enumerate(self.transactions):
@@ -176,23 +371,25 @@ class TransactionManager:
                 date_match = transaction.date == transaction_data["date"]
                 type_match = transaction.type == transaction_data["type"]
                 category_match = transaction.category == transaction_data["category"]
-                amount_match = round(float(transaction.amount), 2) == round(float(transaction_data["amount"]), 2)
+                amount_match = transaction.amount_minor == amount_minor
                 desc_match = transaction.description == transaction_data.get("description", "")
                 timestamp_match = transaction.timestamp == transaction_data["timestamp"]
                 
                 if date_match and type_match and category_match and amount_match and desc_match and timestamp_match:
-                    # Xóa khỏi memory
-                    del self.transactions[i]
-                    
-                    # Cập nhật file
-                    success = self.file_handler.update_transactions([t.to_dict() for t in self.transactions])
+                    # Ghi file trước; bộ nhớ chỉ thay đổi khi ghi thành công để không lệch với file
+                    remaining = self.transactions[:i] + self.transactions[i + 1:]
+                    success = self.file_handler.update_transactions([t.to_dict() for t in remaining])
                     if success:
-                        # Clear cache và rebuild BST
-                        self.cache = TransactionCache()
+                        # Xóa khỏi memory và rebuild BST
+                        removed = self.transactions.pop(i)
+                        self.data_version += 1
                         self.transaction_tree = TransactionBST()
                         for t in self.transactions:
                             self.transaction_tree.insert(t)
-                            
+                        self.aggregates = ReportCube(self.transactions)
+                        self.statistics.remove(removed)
+                        
+                        self._notify("removed", removed)
                         return True, "Đã xóa giao dịch thành công!"
                     else:
                         return False, "Không thể cập nhật file dữ liệu!"
@@ -24,6 +24,10 @@ class BudgetDialog:
         self.current_month = datetime.now().strftime("%m/%Y")
         self.create_widgets()
         self.load_budget_data()
+        
+        # Vẽ lại bảng khi giao dịch hoặc ngân sách thay đổi (được gom theo khung hình)
+        self.controller.register_view("budget_table", self.load_budget_data,
+                                      depends_on=("transactions", "budget"))
     
     def setup_dialog(self):
         """Thiết lập dialog"""
@@ -309,10 +313,9 @@ class BudgetDialog:
         # Đặt ngân sách thông qua controller
         success = self.controller.set_budget(category, amount, self.current_month)
         if success:
-            # Xóa form và tải lại dữ liệu
+            # Xóa form; bảng được vẽ lại qua pipeline làm mới của controller
             self.budget_category_var.set("")
             self.budget_amount_entry.delete(0, tk.END)
-            self.load_budget_data()
     
     def load_budget_data(self):
         """Tải dữ liệu ngân sách"""
@@ -400,7 +403,7 @@ class BudgetDialog:
             success, message = self.controller.budget_manager.delete_budget(category, self.current_month)
             if success:
                 messagebox.showinfo("Thành công", message)
-                self.load_budget_data()
+                self.controller.invalidate_caches("budget")
             else:
                 messagebox.showerror("Lỗi", message)
     
@@ -432,27 +435,23 @@ Trạng thái: {values[5]}"""
             success, message = self.controller.budget_manager.copy_budget_to_next_month(selected_month)
             if success:
                 messagebox.showinfo("Thành công", message)
-                self.load_budget_data()
+                self.controller.invalidate_caches("budget")
             else:
                 messagebox.showerror("Lỗi", message)
     
     def clear_all_budgets(self):
         """Xóa tất cả ngân sách của tháng hiện tại"""
         if messagebox.askyesno("Xác nhận", f"Bạn có chắc muốn xóa tất cả ngân sách tháng {self.current_month}?"):
-            # Xóa tất cả ngân sách cho tháng hiện tại
-            categories = DEFAULT_CATEGORIES["expense"]
-            success_count = 0
-            
-            for category in categories:
-                success, _ = self.controller.budget_manager.delete_budget(category, self.current_month)
-                if success:
-                    success_count += 1
+            # Xóa tất cả ngân sách cho tháng hiện tại trong một lần ghi file
+            success, message = self.controller.budget_manager.delete_budgets(
+                DEFAULT_CATEGORIES["expense"], self.current_month
+            )
             
-            if success_count > 0:
-                messagebox.showinfo("Thành công", f"Đã xóa {success_count} ngân sách!")
-                self.load_budget_data()
+            if success:
+                messagebox.showinfo("Thành công", message)
+                self.controller.invalidate_caches("budget")
             else:
-                messagebox.showinfo("Thông báo", "Không có ngân sách nào để xóa!")
+                messagebox.showinfo("Thông báo", message)
     
     def export_budget_report(self):
         """Xuất báo cáo ngân sách"""
@@ -534,6 +533,7 @@ Trạng thái: {values[5]}"""
     
     def on_close(self):
         """Xử lý khi đóng dialog"""
+        self.controller.unregister_view("budget_table")
         if self.on_close_callback:
             self.on_close_callback()
         self.dialog.destroy() 
\ No newline at end of file
@@ -0,0 +1,183 @@
+#Tính trước kết quả ở luồng nền khi người dùng rảnh
+
+import heapq
+import itertools
+import queue
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Any, Optional, Dict, List, Tuple
+
+
+class IdleScheduler:
+    """
+    Lập lịch tính trước các kết quả có thể được mở tiếp theo
+
+    Tác vụ được xếp theo độ ưu tiên (số nhỏ chạy trước) và chỉ được gửi
+    cho luồng nền khi người dùng đã rảnh idle_delay_ms kể từ lần thao tác
+    cuối, qua after() rồi after_idle() để không chen vào các sự kiện đang
+    chờ. Mỗi lần chỉ chạy một tác vụ; khi có phím/chuột, việc gửi tác vụ
+    mới dừng lại cho tới lần rảnh tiếp theo. Tác vụ chưa chạy có thể bị
+    hủy theo tên hoặc toàn bộ; tác vụ đang chạy vẫn hoàn thành nhưng kết
+    quả của thế hệ cũ bị bỏ qua.
+    """
+
+    # Các sự kiện được coi là thao tác của người dùng
+    INPUT_EVENTS = ("<KeyPress>", "<ButtonPress>", "<MouseWheel>")
+
+    def __init__(self, widget, idle_delay_ms: int = 1000, poll_interval_ms: int = 50):
+        """
+        Args:
+            widget: Widget Tk gốc dùng để lập lịch after() và bắt sự kiện nhập
+            idle_delay_ms: Thời gian không thao tác trước khi bắt đầu tính trước (ms)
+            poll_interval_ms: Chu kỳ kiểm tra tác vụ nền đã xong (ms)
+        """
+        self.widget = widget
+        self.idle_delay_ms = idle_delay_ms
+        self.poll_interval_ms = poll_interval_ms
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="precompute")
+        self._results: "queue.Queue" = queue.Queue()
+        # Hàng đợi ưu tiên (độ ưu tiên, thứ tự, tên); nội dung tác vụ nằm trong _tasks
+        self._heap: List[Tuple[int, int, str]] = []
+        self._tasks: Dict[str, Tuple[int, int, Callable[..., Any], Optional[Callable[[], Any]]]] = {}
+        self._order = itertools.count()
+        self._generation = 0
+        self._current: Optional[Future] = None
+        self._idle_job = None
+        self._dispatch_job = None
+        self._poll_job = None
+        self._closed = False
+
+        for sequence in self.INPUT_EVENTS:
+            widget.bind_all(sequence, self.on_user_input, add="+")
+
+    def schedule(self, name: str, func: Callable[..., Any], priority: int = 0,
+                 prepare: Callable[[], Any] = None) -> None:
+        """
+        Thêm (hoặc thay thế) một tác vụ tính trước
+
+        Args:
+            name: Tên tác vụ, tác vụ cùng tên đang chờ bị thay thế
+            func: Hàm chạy ở luồng nền, không được chạm vào widget
+            priority: Độ ưu tiên, số nhỏ chạy trước
+            prepare: Hàm nhẹ chạy trên luồng Tk ngay trước khi gửi (ví dụ sao
+                chép nông dữ liệu), kết quả được truyền làm tham số cho func
+        """
+        if self._closed:
+            return
+        order = next(self._order)
+        self._tasks[name] = (priority, order, func, prepare)
+        heapq.heappush(self._heap, (priority, order, name))
+        self._arm()
+
+    def cancel(self, name: str = None) -> None:
+        """
+        Hủy tác vụ đang chờ theo tên, hoặc hủy tất cả (kể cả kết quả của tác vụ đang chạy)
+
+        Args:
+            name: Tên tác vụ, None để hủy toàn bộ
+        """
+        if name is not None:
+            self._tasks.pop(name, None)
+            return
+        self._tasks.clear()
+        self._heap.clear()
+        self._generation += 1
+        if self._current is not None:
+            self._current.cancel()
+
+    @property
+    def pending(self) -> int:
+        """Số tác vụ đang chờ"""
+        return len(self._tasks)
+
+    @property
+    def busy(self) -> bool:
+        """Có tác vụ đang chạy ở luồng nền hay không"""
+        return self._current is not None and not self._current.done()
+
+    def on_user_input(self, event=None) -> None:
+        """Người dùng thao tác: ngừng gửi tác vụ mới và đếm lại thời gian rảnh"""
+        if self._dispatch_job is not None:
+            self._cancel_job(self._dispatch_job)
+            self._dispatch_job = None
+        if self._idle_job is not None:
+            self._cancel_job(self._idle_job)
+            self._idle_job = None
+        self._arm()
+
+    def _arm(self) -> None:
+        """Hẹn giờ bắt đầu tính trước sau khoảng rảnh"""
+        if self._closed or not self._tasks or self._idle_job is not None:
+            return
+        self._idle_job = self.widget.after(self.idle_delay_ms, self._on_idle)
+
+    def _on_idle(self) -> None:
+        """Đã rảnh đủ lâu: chờ hàng đợi sự kiện Tk trống rồi gửi tác vụ"""
+        self._idle_job = None
+        if self._dispatch_job is None and not self._closed:
+            self._dispatch_job = self.widget.after_idle(self._dispatch)
+
+    def _dispatch(self) -> None:
+        """Gửi tác vụ ưu tiên cao nhất cho luồng nền"""
+        self._dispatch_job = None
+        if self._closed or self.busy:
+            return
+
+        while self._heap:
+            priority, order, name = heapq.heappop(self._heap)
+            task = self._tasks.get(name)
+            if task is None or task[1] != order:
+                continue  # Đã hủy hoặc đã được thay bằng bản mới hơn
+            del self._tasks[name]
+
+            _priority, _order, func, prepare = task
+            generation = self._generation
+            try:
+                future = self._executor.submit(func, prepare()) if prepare else self._executor.submit(func)
+            except Exception as e:
+                print(f"Lỗi khi chuẩn bị tính trước '{name}': {e}")
+                continue
+            self._current = future
+            future.add_done_callback(lambda f: self._results.put((generation, name, f)))
+            self._schedule_poll()
+            return
+
+    def _schedule_poll(self) -> None:
+        """Lập lịch kiểm tra kết quả trên luồng Tk"""
+        if self._poll_job is None and not self._closed:
+            self._poll_job = self.widget.after(self.poll_interval_ms, self._poll)
+
+    def _poll(self) -> None:
+        """Ghi nhận tác vụ đã xong và tiếp tục nếu người dùng vẫn rảnh"""
+        self._poll_job = None
+        while True:
+            try:
+                generation, name, future = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if future is self._current:
+                self._current = None
+            if generation == self._generation and not future.cancelled() and future.exception():
+                print(f"Lỗi khi tính trước '{name}': {future.exception()}")
+
+        if self.busy:
+            self._schedule_poll()
+        elif self._tasks and self._idle_job is None and self._dispatch_job is None and not self._closed:
+            # Vẫn rảnh: chạy tác vụ kế tiếp khi hàng đợi sự kiện trống
+            self._dispatch_job = self.widget.after_idle(self._dispatch)
+
+    def _cancel_job(self, job) -> None:
+        """Hủy một lịch after() của Tk"""
+        try:
+            self.widget.after_cancel(job)
+        except Exception:
+            pass
+
+    def shutdown(self) -> None:
+        """Dừng bộ lập lịch, bỏ mọi tác vụ còn lại"""
+        self._closed = True
+        self.cancel()
+        for job in (self._idle_job, self._dispatch_job, self._poll_job):
+            if job is not None:
+                self._cancel_job(job)
+        self._idle_job = self._dispatch_job = self._poll_job = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -7,6 +7,7 @@ from typing import Dict, Any
 
 from gui.transaction_form import TransactionForm
 from gui.budget_dialog import BudgetDialog
+from gui.transaction_list_model import TransactionListModel, ALL_MONTHS
 from config import COLORS
 from utils.date_utils import generate_month_range
 
@@ -17,12 +18,24 @@ class MainWindow:
         self.parent = parent
         self.controller = controller
         
+        # Model cho danh sách giao dịch ảo hóa
+        self.transaction_model = TransactionListModel()
+        self._view_offset = 0          # Vị trí dòng đầu tiên đang hiển thị
+        self._visible_rows = 15        # Số dòng Treeview hiển thị được
+        self._selected_transaction = None
+        
         # Cấu hình cửa sổ
         self.setup_window()
         
         # Tạo giao diện
         self.setup_gui()
         
+        # Đăng ký các view với pipeline làm mới của controller; danh sách đầy
+        # đủ chỉ nạp lại khi được yêu cầu, sự kiện thêm/xóa chỉ vẽ lại phần hiển thị
+        self.controller.register_view("transaction_list", self.update_transaction_list, depends_on=())
+        self.controller.register_view("visible_rows", self.render_visible_rows)
+        self.controller.register_view("summary", self.update_summary)
+        
         # Load dữ liệu ban đầu
         self.refresh_all_data()
     
@@ -168,7 +181,7 @@ class MainWindow:
         month_label.pack(side=tk.LEFT, padx=(0, 5))
         
         # Tạo các tháng
-        months = ["Tất cả"] + generate_month_range()
+        months = [ALL_MONTHS] + generate_month_range()
         
         self.month_var = tk.StringVar(value=datetime.now().strftime("%m/%Y"))
         self.month_combo = ttk.Combobox(
@@ -180,7 +193,8 @@ class MainWindow:
             font=("Arial", 10, "bold")
         )
         self.month_combo.pack(side=tk.LEFT)
-        self.month_combo.bind('<<ComboboxSelected>>', lambda e: self.update_transaction_list())
+        self.transaction_model.set_month_filter(self.month_var.get())
+        self.month_combo.bind('<<ComboboxSelected>>', lambda e: self.on_month_filter_change())
         
         # Cấu hình kiểu cho Treeview
         style = ttk.Style()
@@ -207,12 +221,13 @@ class MainWindow:
         tree_container.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
         
         # Treeview với kiểu tùy chỉnh
+        # Treeview chỉ chứa các dòng đang hiển thị, dữ liệu nằm trong transaction_model
         columns = ("Ngày", "Loại", "Danh mục", "Số tiền", "Mô tả")
         self.transaction_tree = ttk.Treeview(
             tree_container,
             columns=columns,
             show="headings",
-            height=15,
+            height=self._visible_rows,
             style="Transactions.Treeview"
         )
         
@@ -224,22 +239,31 @@ class MainWindow:
         
         # Biến để theo dõi trạng thái sắp xếp
         self.sort_state = {
-            "column": "Ngày",  # Cột đang sắp xếp
-            "reverse": True    # True = giảm dần (mới nhất lên đầu)
+            "column": self.transaction_model.sort_column,  # Cột đang sắp xếp
+            "reverse": self.transaction_model.sort_reverse  # True = giảm dần (mới nhất lên đầu)
         }
         
         # Biến để theo dõi trạng thái sắp xếp
         self.transaction_tree.tag_configure('oddrow', background=COLORS["light"])
         self.transaction_tree.tag_configure('evenrow', background='#F5F5F5')
         
-        # Thanh cuộn
-        v_scrollbar = ttk.Scrollbar(tree_container, orient=tk.VERTICAL, command=self.transaction_tree.yview)
+        # Thanh cuộn dọc điều khiển vị trí cửa sổ dòng trong model
+        self.v_scrollbar = ttk.Scrollbar(tree_container, orient=tk.VERTICAL, command=self.on_list_scroll)
         h_scrollbar = ttk.Scrollbar(list_frame, orient=tk.HORIZONTAL, command=self.transaction_tree.xview)
-        self.transaction_tree.configure(yscrollcommand=v_scrollbar.set, xscrollcommand=h_scrollbar.set)
+        self.transaction_tree.configure(xscrollcommand=h_scrollbar.set)
+        
+        # Cuộn chuột, phím và thay đổi kích thước
+        self.transaction_tree.bind("<MouseWheel>", self.on_list_mousewheel)
+        self.transaction_tree.bind("<Button-4>", lambda e: self.scroll_list(-3))
+        self.transaction_tree.bind("<Button-5>", lambda e: self.scroll_list(3))
+        self.transaction_tree.bind("<Prior>", lambda e: self.scroll_list(-self._visible_rows))
+        self.transaction_tree.bind("<Next>", lambda e: self.scroll_list(self._visible_rows))
+        self.transaction_tree.bind("<Configure>", self.on_list_resize)
+        self.transaction_tree.bind("<<TreeviewSelect>>", self.on_list_select)
         
         # Pack treeview và thanh cuộn
         self.transaction_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         # Pack thanh cuộn ngang
         h_scrollbar.pack(fill=tk.X, padx=10, pady=(0, 10))
@@ -293,10 +317,10 @@ class MainWindow:
     
     def open_budget_dialog(self):
         """Mở dialog quản lý ngân sách"""
+        # Ngân sách không hiển thị ở cửa sổ chính nên không cần làm mới khi đóng dialog
         BudgetDialog(
             parent=self.parent,
-            controller=self.controller,
-            on_close_callback=self.refresh_all_data
+            controller=self.controller
         )
     
     def show_reports(self):
@@ -309,37 +333,24 @@ class MainWindow:
     
     def delete_selected_transaction(self):
         """Xóa giao dịch được chọn"""
-        selection = self.transaction_tree.selection()
-        if not selection:
+        transaction = self.get_selected_transaction()
+        if transaction is None:
             messagebox.showwarning("Cảnh báo", "Vui lòng chọn giao dịch để xóa!")
             return
         
-        # Lấy dữ liệu giao dịch được chọn
-        item = self.transaction_tree.item(selection[0])
-        values = item['values']
-        
-        # Chuyển đổi về format để xóa
+        # Gọi controller để xóa với đầy đủ thông tin của giao dịch trong model
+        # Giao diện được cập nhật qua sự kiện "removed" của controller
+        self.controller.delete_transaction(transaction.to_dict())
+    
+    def get_selected_transaction(self):
+        """Lấy giao dịch đang được chọn trong danh sách"""
+        selection = self.transaction_tree.selection()
+        if not selection:
+            return None
         try:
-            amount_str = values[3].replace(',', '').replace(' VNĐ', '').strip()
-            amount = round(float(amount_str), 2)  # Làm tròn đến 2 chữ số thập phân
-            
-            transaction_data = {
-                'date': values[0],
-                'type': values[1],
-                'category': values[2],
-                'amount': amount,
-                'description': values[4] if len(values) > 4 else ""
-            }
-            
-            # Gọi controller để xóa
-            if self.controller.delete_transaction(transaction_data):
-                # Cập nhật lại giao diện
-                self.refresh_all_data()
-            else:
-                messagebox.showerror("Lỗi", "Không thể xóa giao dịch. Vui lòng thử lại!")
-                
-        except (ValueError, IndexError) as e:
-            messagebox.showerror("Lỗi", f"Dữ liệu giao dịch không hợp lệ: {e}")
+            return self.transaction_model.get(int(selection[0]))
+        except ValueError:
+            return None
     
     def refresh_all_data(self):
         """Làm mới tất cả dữ liệu"""
@@ -347,45 +358,103 @@ class MainWindow:
         self.update_summary()
     
     def update_transaction_list(self):
-        """Cập nhật danh sách giao dịch"""
-        # Xóa dữ liệu cũ
-        for item in self.transaction_tree.get_children():
-            self.transaction_tree.delete(item)
-        
-        # Lấy dữ liệu mới
-        transactions = self.controller.get_all_transactions()
-        
-        # Lọc theo tháng nếu không chọn "Tất cả"
-        selected_month = self.month_var.get()
-        if selected_month != "Tất cả":
-            transactions = [t for t in transactions if t.get_month_year() == selected_month]
-        
-        # Sắp xếp theo trạng thái hiện tại
-        if self.sort_state["column"] == "Ngày":
-            sorted_transactions = sorted(
-                transactions,
-                key=lambda x: datetime.strptime(x.date, "%d/%m/%Y"),
-                reverse=self.sort_state["reverse"]
-            )
-        else:
-            sorted_transactions = transactions
-        
-        # Thêm vào tree với alternating row colors
-        for i, transaction in enumerate(sorted_transactions):
-            amount_str = f"{transaction.amount:,.0f} VNĐ"
-            tag = 'evenrow' if i % 2 == 0 else 'oddrow'
+        """Nạp lại model giao dịch và render phần đang hiển thị"""
+        self.transaction_model.load(self.controller.get_all_transactions())
+        self.render_visible_rows()
+    
+    def apply_transaction_event(self, event: str, transaction):
+        """
+        Cập nhật tăng dần khi một giao dịch được thêm/xóa
+        
+        Args:
+            event: "added" hoặc "removed"
+            transaction: Giao dịch thay đổi
+        """
+        if event == "added":
+            self.transaction_model.insert(transaction)
+        elif event == "removed":
+            self.transaction_model.remove(transaction)
+            if transaction is self._selected_transaction:
+                self._selected_transaction = None
+        # Phần hiển thị và panel tóm tắt được controller vẽ lại theo khung hình
+    
+    def on_month_filter_change(self):
+        """Đổi tháng lọc dùng chỉ mục của model, không quét lại dữ liệu"""
+        self.transaction_model.set_month_filter(self.month_var.get())
+        self._view_offset = 0
+        self.render_visible_rows()
+    
+    def render_visible_rows(self):
+        """Chỉ render các dòng nằm trong cửa sổ hiển thị của Treeview"""
+        total = len(self.transaction_model)
+        max_offset = max(0, total - self._visible_rows)
+        self._view_offset = min(max(0, self._view_offset), max_offset)
+        
+        # Xóa các dòng đang hiển thị (tối đa vài chục dòng)
+        self.transaction_tree.delete(*self.transaction_tree.get_children())
+        
+        rows = self.transaction_model.get_window(self._view_offset, self._visible_rows)
+        for i, transaction in enumerate(rows):
+            index = self._view_offset + i
+            tag = 'evenrow' if index % 2 == 0 else 'oddrow'
             self.transaction_tree.insert(
                 "",
                 tk.END,
+                iid=str(index),
                 values=(
                     transaction.date,
                     transaction.type,
                     transaction.category,
-                    amount_str,
+                    f"{transaction.amount:,.0f} VNĐ",
                     transaction.description
                 ),
                 tags=(tag,)
             )
+            if transaction is self._selected_transaction:
+                self.transaction_tree.selection_set(str(index))
+        
+        # Cập nhật thanh cuộn theo vị trí trong toàn bộ model
+        if total > 0:
+            self.v_scrollbar.set(self._view_offset / total, (self._view_offset + len(rows)) / total)
+        else:
+            self.v_scrollbar.set(0.0, 1.0)
+    
+    def scroll_list(self, delta: int):
+        """Cuộn danh sách delta dòng"""
+        self._view_offset += delta
+        self.render_visible_rows()
+        return "break"
+    
+    def on_list_scroll(self, *args):
+        """Xử lý lệnh từ thanh cuộn dọc"""
+        if not args:
+            return
+        if args[0] == "moveto":
+            self._view_offset = int(float(args[1]) * len(self.transaction_model))
+            self.render_visible_rows()
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if len(args) > 2 and args[2] == "pages":
+                amount *= self._visible_rows
+            self.scroll_list(amount)
+    
+    def on_list_mousewheel(self, event):
+        """Cuộn bằng con lăn chuột"""
+        return self.scroll_list(-3 if event.delta > 0 else 3)
+    
+    def on_list_resize(self, event):
+        """Tính lại số dòng hiển thị khi Treeview thay đổi kích thước"""
+        rowheight = 30  # Khớp với rowheight của style Transactions.Treeview
+        visible_rows = max(1, (event.height - rowheight) // rowheight)
+        if visible_rows != self._visible_rows:
+            self._visible_rows = visible_rows
+            self.render_visible_rows()
+    
+    def on_list_select(self, event=None):
+        """Ghi nhớ giao dịch được chọn để giữ lựa chọn khi cuộn"""
+        transaction = self.get_selected_transaction()
+        if transaction is not None:
+            self._selected_transaction = transaction
     
     def update_summary(self):
         """Cập nhật tóm tắt tài chính"""
@@ -405,7 +474,9 @@ Tháng {summary_data.get('current_month', '')}:
 • Số dư: {summary_data.get('monthly_balance', 0):,.0f} VNĐ
 
 Thống kê:
-• Tổng giao dịch: {summary_data.get('transaction_count', 0)}"""
+• Tổng giao dịch: {summary_data.get('transaction_count', 0)}
+• Chi tiêu trung bình: {summary_data.get('average_expense', 0):,.0f} VNĐ
+• Trung vị chi tiêu: ~{summary_data.get('median_expense', 0):,.0f} VNĐ"""
             
             # Cập nhật nội dung
             self.summary_text.configure(state='normal')
@@ -419,10 +490,7 @@ Thống kê:
             self.summary_text.configure(state='disabled')
     
     def sort_treeview(self, column):
-        """Sắp xếp dữ liệu trong treeview theo cột được chọn"""
-        # Lấy tất cả items từ treeview
-        items = [(self.transaction_tree.set(item, column), item) for item in self.transaction_tree.get_children('')]
-        
+        """Sắp xếp danh sách theo cột được chọn trên dữ liệu của model"""
         # Đảo ngược trạng thái sắp xếp nếu click vào cùng một cột
         if self.sort_state["column"] == column:
             self.sort_state["reverse"] = not self.sort_state["reverse"]
@@ -430,25 +498,6 @@ Thống kê:
             self.sort_state["column"] = column
             self.sort_state["reverse"] = False
         
-        # Hàm chuyển đổi giá trị để so sánh
-        def convert_value(value):
-            if column == "Ngày":
-                try:
-                    return datetime.strptime(value, "%d/%m/%Y")
-                except:
-                    return datetime.min
-            elif column == "Số tiền":
-                try:
-                    return float(value.replace(',', '').replace(' VNĐ', ''))
-                except:
-                    return 0.0
-            return value
-        
-        # Sắp xếp items
-        items.sort(key=lambda x: convert_value(x[0]), reverse=self.sort_state["reverse"])
-        
-        # Di chuyển items đến vị trí mới
-        for index, (_, item) in enumerate(items):
-            self.transaction_tree.move(item, '', index)
-            # Cập nhật màu nền xen kẽ
-            self.transaction_tree.item(item, tags=('evenrow' if index % 2 == 0 else 'oddrow',)) 
\ No newline at end of file
+        self.transaction_model.sort_by(column, self.sort_state["reverse"])
+        self._view_offset = 0
+        self.render_visible_rows()
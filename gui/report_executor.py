@@ -0,0 +1,119 @@
+#Thực thi tạo báo cáo ở luồng nền
+
+import queue
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Callable, Any, Optional
+
+
+class ReportExecutor:
+    """
+    Chạy các tác vụ tạo báo cáo ở luồng nền
+
+    Kết quả được đưa vào hàng đợi và luồng Tk lấy ra bằng after(),
+    nên callback luôn chạy trên luồng giao diện. Mỗi lần submit làm
+    các yêu cầu trước đó trở nên cũ: tác vụ chưa chạy bị hủy, tác vụ
+    đang chạy vẫn hoàn thành nhưng kết quả bị bỏ qua.
+    """
+
+    def __init__(self, widget, max_workers: int = 1, poll_interval_ms: int = 50):
+        """
+        Args:
+            widget: Widget Tk dùng để lập lịch after()
+            max_workers: Số luồng nền
+            poll_interval_ms: Chu kỳ kiểm tra kết quả (ms)
+        """
+        self.widget = widget
+        self.poll_interval_ms = poll_interval_ms
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report")
+        self._results: "queue.Queue" = queue.Queue()
+        self._generation = 0
+        self._current: Optional[Future] = None
+        self._pending = 0
+        self._poll_job = None
+        self._closed = False
+
+    def submit(self, func: Callable[[], Any], on_success: Callable[[Any], None],
+               on_error: Callable[[Exception], None] = None) -> int:
+        """
+        Gửi một tác vụ mới, hủy các yêu cầu cũ
+
+        Args:
+            func: Hàm tạo báo cáo, chạy ở luồng nền
+            on_success: Callback nhận kết quả trên luồng Tk
+            on_error: Callback nhận exception trên luồng Tk
+
+        Returns:
+            int: Mã thế hệ của yêu cầu
+        """
+        if self._closed:
+            return self._generation
+
+        self.cancel()
+        generation = self._generation
+
+        future = self._executor.submit(func)
+        self._current = future
+        self._pending += 1
+        future.add_done_callback(
+            lambda f: self._results.put((generation, f, on_success, on_error))
+        )
+        self._schedule_poll()
+        return generation
+
+    def cancel(self) -> None:
+        """Đánh dấu mọi yêu cầu hiện tại là cũ"""
+        self._generation += 1
+        if self._current is not None:
+            self._current.cancel()
+            self._current = None
+
+    @property
+    def busy(self) -> bool:
+        """Có tác vụ còn đang chạy hay không"""
+        return self._current is not None and not self._current.done()
+
+    def _schedule_poll(self) -> None:
+        """Lập lịch kiểm tra hàng đợi kết quả trên luồng Tk"""
+        if self._poll_job is None and not self._closed:
+            self._poll_job = self.widget.after(self.poll_interval_ms, self._poll)
+
+    def _poll(self) -> None:
+        """Lấy kết quả đã xong và gọi callback nếu yêu cầu chưa cũ"""
+        self._poll_job = None
+        while True:
+            try:
+                generation, future, on_success, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+
+            self._pending -= 1
+            if self._closed or generation != self._generation or future.cancelled():
+                continue
+
+            self._current = None
+            error = future.exception()
+            try:
+                if error is not None:
+                    if on_error:
+                        on_error(error)
+                    else:
+                        print(f"Lỗi khi tạo báo cáo: {error}")
+                else:
+                    on_success(future.result())
+            except Exception as e:
+                print(f"Lỗi khi hiển thị kết quả báo cáo: {e}")
+
+        if self._pending > 0:
+            self._schedule_poll()
+
+    def shutdown(self) -> None:
+        """Dừng executor, bỏ qua mọi kết quả còn lại"""
+        self._closed = True
+        self.cancel()
+        if self._poll_job is not None:
+            try:
+                self.widget.after_cancel(self._poll_job)
+            except Exception:
+                pass
+            self._poll_job = None
+        self._executor.shutdown(wait=False, cancel_futures=True)
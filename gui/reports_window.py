@@ -5,6 +5,7 @@ from tkinter import ttk, messagebox
 from datetime import datetime
 from typing import Dict, Any
 from config import COLORS, create_static_button_style
+from gui.report_executor import ReportExecutor
 from utils.date_utils import generate_month_range
 
 
@@ -17,6 +18,7 @@ class ReportsWindow:
         
         # Tạo cửa sổ báo cáo
         self.window = tk.Toplevel(parent)
+        self.executor = ReportExecutor(self.window)
         self.setup_window()
         self.create_widgets()
         self.load_reports()
@@ -183,34 +185,37 @@ class ReportsWindow:
         self.load_reports()
     
     def load_reports(self, event=None):
-        """Tải và hiển thị báo cáo"""
+        """Tạo báo cáo ở luồng nền và hiển thị khi có kết quả"""
         try:
             report_type = self.report_type_var.get()
             period = self.period_var.get() if hasattr(self, 'period_var') else None
             
             if report_type == "Tổng hợp":
-                report = self.controller.generate_report("comprehensive")
-                self.display_report(report.get("report", ""))
-                
+                name, kwargs, display = "comprehensive", {}, lambda r: self.display_report(r.get("report", ""))
             elif report_type == "Tháng":
-                report = self.controller.generate_report("monthly", month_year=period)
-                self.display_monthly_report(report)
-                
+                name, kwargs, display = "monthly", {"month_year": period}, self.display_monthly_report
             elif report_type == "Năm":
-                report = self.controller.generate_report("yearly", year=period)
-                self.display_yearly_report(report)
-                
+                name, kwargs, display = "yearly", {"year": period}, self.display_yearly_report
             elif report_type == "Danh mục":
-                report = self.controller.generate_report("category")
-                self.display_category_report(report)
-                
+                name, kwargs, display = "category", {}, self.display_category_report
             elif report_type == "Xu hướng":
-                report = self.controller.generate_report("trend")
-                self.display_trend_report(report)
-                
+                name, kwargs, display = "trend", {}, self.display_trend_report
             elif report_type == "Sức khỏe tài chính":
-                report = self.controller.generate_report("health")
-                self.display_health_report(report)
+                name, kwargs, display = "health", {}, self.display_health_report
+            else:
+                return
+            
+            # Sao chép nguồn dữ liệu trên luồng Tk để luồng nền không đọc danh sách đang thay đổi;
+            # ảnh chụp được dựng ở luồng nền
+            source = self.controller.get_snapshot_source()
+            
+            self.display_report("⏳ Đang tạo báo cáo...")
+            self.executor.submit(
+                lambda: self.controller.generate_report(
+                    name, snapshot=self.controller.build_snapshot(source), **kwargs),
+                on_success=display,
+                on_error=lambda e: messagebox.showerror("Lỗi", f"Không thể tải báo cáo: {e}", parent=self.window)
+            )
             
         except Exception as e:
             messagebox.showerror("Lỗi", f"Không thể tải báo cáo: {e}")
@@ -438,4 +443,5 @@ Tháng đánh giá: {health_data['month_analyzed']}
     
     def on_close(self):
         """Xử lý khi đóng cửa sổ"""
+        self.executor.shutdown()
         self.window.destroy() 
\ No newline at end of file
@@ -390,7 +390,7 @@ class TransactionForm(tk.LabelFrame):
             if description == "Nhập mô tả cho giao dịch...":
                 description = ""
             
-            # Thêm timestamp (chỉ thời gian)
+            # Thêm timestamp (ISO-8601 đến micro giây)
             timestamp = datetime.now().strftime(CSV_CONFIG["timestamp_format"])
             
             return {
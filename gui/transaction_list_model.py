@@ -0,0 +1,249 @@
+#Model dữ liệu cho danh sách giao dịch (hiển thị ảo hóa)
+
+from collections import OrderedDict
+from typing import List, Dict, Optional, Tuple, Any
+from core_logic.models import Transaction
+
+# Giá trị bộ lọc tháng để hiển thị tất cả giao dịch
+ALL_MONTHS = "Tất cả"
+
+# Thứ tự cột trong khóa sắp xếp đã phân tích sẵn
+COLUMNS = ("Ngày", "Loại", "Danh mục", "Số tiền", "Mô tả")
+
+# Số cột tối đa dùng làm khóa phụ khi sắp xếp nhiều cột
+MAX_SORT_LEVELS = 3
+
+# Số hoán vị sắp xếp được giữ trong cache
+PERMUTATION_CACHE_SIZE = 8
+
+
+def _date_key(date_str: str) -> Tuple[int, int, int]:
+    """Chuyển ngày DD/MM/YYYY thành khóa (năm, tháng, ngày) để sắp xếp"""
+    try:
+        day, month, year = date_str.split('/')
+        return int(year), int(month), int(day)
+    except (ValueError, AttributeError):
+        return 0, 0, 0
+
+
+def _parse_keys(transaction: Transaction) -> Tuple[Any, ...]:
+    """Phân tích một lần các giá trị có kiểu của giao dịch theo thứ tự COLUMNS"""
+    return (
+        _date_key(transaction.date),
+        transaction.type,
+        transaction.category,
+        float(transaction.amount),
+        transaction.description
+    )
+
+
+class TransactionListModel:
+    """
+    Model chỉ mục cho danh sách giao dịch
+
+    Giữ danh sách giao dịch đã lọc và sắp xếp tách khỏi Treeview để
+    giao diện chỉ cần render các dòng đang hiển thị trên màn hình.
+    Khóa sắp xếp được phân tích một lần cho mỗi giao dịch, các hoán vị
+    đã sắp xếp được cache theo (tháng lọc, thứ tự sắp xếp).
+    """
+
+    def __init__(self):
+        # Chỉ mục theo id đối tượng, giữ thứ tự thêm vào và xóa được trong O(1)
+        self._all: Dict[int, Transaction] = {}
+        self._by_month: Dict[str, Dict[int, Transaction]] = {}
+        self._keys: Dict[int, Tuple[Any, ...]] = {}
+        self._rows: List[Transaction] = []
+        self._permutations: "OrderedDict[Tuple, List[Transaction]]" = OrderedDict()
+        self.month_filter: Optional[str] = None
+        # Danh sách (cột, giảm dần?) theo độ ưu tiên, phần tử đầu là cột chính
+        self.sort_spec: List[Tuple[str, bool]] = [("Ngày", True)]
+
+    @property
+    def sort_column(self) -> str:
+        """Cột sắp xếp chính"""
+        return self.sort_spec[0][0]
+
+    @property
+    def sort_reverse(self) -> bool:
+        """Chiều sắp xếp của cột chính"""
+        return self.sort_spec[0][1]
+
+    def load(self, transactions: List[Transaction]) -> None:
+        """
+        Nạp lại toàn bộ giao dịch, phân tích khóa và xây dựng chỉ mục theo tháng
+
+        Args:
+            transactions: Danh sách giao dịch nguồn
+        """
+        self._all = {}
+        self._by_month = {}
+        self._keys = {}
+        for transaction in transactions:
+            self._all[id(transaction)] = transaction
+            self._keys[id(transaction)] = _parse_keys(transaction)
+            self._by_month.setdefault(transaction.get_month_year(), {})[id(transaction)] = transaction
+        self._permutations.clear()
+        self._refresh_rows()
+
+    def set_month_filter(self, month_year: Optional[str]) -> None:
+        """
+        Đặt bộ lọc tháng, dùng chỉ mục có sẵn thay vì lọc lại toàn bộ
+
+        Args:
+            month_year: Tháng/năm (MM/YYYY), None hoặc "Tất cả" để bỏ lọc
+        """
+        self.month_filter = None if month_year in (None, ALL_MONTHS) else month_year
+        self._refresh_rows()
+
+    def sort_by(self, column: str, reverse: bool) -> None:
+        """
+        Sắp xếp ổn định theo cột; cột chính trước đó trở thành khóa phụ
+
+        Args:
+            column: Tên cột trong Treeview
+            reverse: True nếu sắp xếp giảm dần
+        """
+        if column not in COLUMNS:
+            return
+        spec = [(column, reverse)] + [(c, r) for c, r in self.sort_spec if c != column]
+        self.sort_spec = spec[:MAX_SORT_LEVELS]
+        self._refresh_rows()
+
+    def _refresh_rows(self) -> None:
+        """Lấy danh sách dòng từ cache hoán vị hoặc sắp xếp theo khóa đã phân tích"""
+        cache_key = (self.month_filter, tuple(self.sort_spec))
+        rows = self._permutations.get(cache_key)
+        if rows is None:
+            if self.month_filter is None:
+                source = self._all
+            else:
+                source = self._by_month.get(self.month_filter, {})
+            rows = list(source.values())
+            keys = self._keys
+            # Sắp xếp ổn định từ khóa phụ thấp nhất tới cột chính
+            for column, reverse in reversed(self.sort_spec):
+                position = COLUMNS.index(column)
+                rows.sort(key=lambda t: keys[id(t)][position], reverse=reverse)
+            self._permutations[cache_key] = rows
+            while len(self._permutations) > PERMUTATION_CACHE_SIZE:
+                self._permutations.popitem(last=False)
+        else:
+            self._permutations.move_to_end(cache_key)
+        self._rows = rows
+
+    def _drop_stale_permutations(self) -> None:
+        """Bỏ các hoán vị khác trong cache khi dữ liệu thay đổi"""
+        cache_key = (self.month_filter, tuple(self.sort_spec))
+        self._permutations.clear()
+        self._permutations[cache_key] = self._rows
+
+    def insert(self, transaction: Transaction) -> Optional[int]:
+        """
+        Thêm một giao dịch vào đúng vị trí đã sắp xếp (tìm kiếm nhị phân)
+
+        Args:
+            transaction: Giao dịch mới
+
+        Returns:
+            Optional[int]: Vị trí dòng mới, None nếu bị bộ lọc tháng loại bỏ
+        """
+        month_year = transaction.get_month_year()
+        self._keys[id(transaction)] = _parse_keys(transaction)
+        self._all[id(transaction)] = transaction
+        self._by_month.setdefault(month_year, {})[id(transaction)] = transaction
+        self._drop_stale_permutations()
+
+        if self.month_filter is not None and month_year != self.month_filter:
+            return None
+
+        position = self._insert_position(transaction)
+        self._rows.insert(position, transaction)
+        return position
+
+    def remove(self, transaction: Transaction) -> Optional[int]:
+        """
+        Xóa một giao dịch khỏi model
+
+        Args:
+            transaction: Giao dịch đã bị xóa
+
+        Returns:
+            Optional[int]: Vị trí dòng đã xóa, None nếu không đang hiển thị
+        """
+        if id(transaction) not in self._keys:
+            return None
+
+        month_year = transaction.get_month_year()
+        self._all.pop(id(transaction), None)
+        self._by_month.get(month_year, {}).pop(id(transaction), None)
+        self._drop_stale_permutations()
+
+        index = None
+        if self.month_filter is None or month_year == self.month_filter:
+            # Tìm vùng các dòng có cùng khóa rồi so khớp theo đối tượng
+            key = self._keys[id(transaction)]
+            position = self._insert_position(transaction)
+            candidate = position - 1
+            while candidate >= 0 and self._keys[id(self._rows[candidate])] == key:
+                if self._rows[candidate] is transaction:
+                    del self._rows[candidate]
+                    index = candidate
+                    break
+                candidate -= 1
+            else:
+                index = self._remove_identity(self._rows, transaction)
+
+        del self._keys[id(transaction)]
+        return index
+
+    def _comes_before(self, keys: Tuple[Any, ...], other: Tuple[Any, ...]) -> bool:
+        """So sánh hai bộ khóa theo thứ tự sắp xếp nhiều cột hiện tại"""
+        for column, reverse in self.sort_spec:
+            position = COLUMNS.index(column)
+            if keys[position] != other[position]:
+                return keys[position] > other[position] if reverse else keys[position] < other[position]
+        return False
+
+    def _insert_position(self, transaction: Transaction) -> int:
+        """Tìm vị trí chèn sau các dòng có cùng khóa để giữ thứ tự ổn định"""
+        keys = self._keys[id(transaction)]
+        low, high = 0, len(self._rows)
+        while low < high:
+            mid = (low + high) // 2
+            if self._comes_before(keys, self._keys[id(self._rows[mid])]):
+                high = mid
+            else:
+                low = mid + 1
+        return low
+
+    @staticmethod
+    def _remove_identity(items: List[Transaction], transaction: Transaction) -> Optional[int]:
+        """Xóa phần tử theo đối tượng (không so sánh giá trị)"""
+        for i, item in enumerate(items):
+            if item is transaction:
+                del items[i]
+                return i
+        return None
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def get(self, index: int) -> Optional[Transaction]:
+        """Lấy giao dịch tại vị trí index trong danh sách hiển thị"""
+        if 0 <= index < len(self._rows):
+            return self._rows[index]
+        return None
+
+    def get_window(self, start: int, count: int) -> List[Transaction]:
+        """
+        Lấy một cửa sổ các dòng liên tiếp để render
+
+        Args:
+            start: Vị trí dòng đầu tiên
+            count: Số dòng cần lấy
+
+        Returns:
+            List[Transaction]: Các giao dịch trong cửa sổ
+        """
+        start = max(0, start)
+        return self._rows[start:start + count]
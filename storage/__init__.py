@@ -3,5 +3,6 @@ Storage Package - Quản lý việc lưu trữ và xử lý file dữ liệu
 """
 
 from .file_handler import FileHandler
+from .result_cache import ResultCache
 
-__all__ = ['FileHandler'] 
\ No newline at end of file
+__all__ = ['FileHandler', 'ResultCache'] 
\ No newline at end of file
@@ -1,11 +1,28 @@
 #Xử lý việc lưu trữ và đọc file dữ liệu
 
 import csv
+import hashlib
+import io
+import os
 import shutil
+import tempfile
+from collections import namedtuple
 from datetime import datetime
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Optional, Tuple, Callable
 from config import TRANSACTIONS_FILE, BUDGET_FILE, CSV_CONFIG
+from utils.money import to_minor, from_minor, format_minor
+from utils.date_utils import new_timestamp, normalize_timestamp
+
+# Các cột của file giao dịch
+TRANSACTION_HEADERS = ["timestamp", "date", "type", "category", "amount", "description"]
+
+# Số byte cuối của phần đã đọc được băm để phát hiện file bị ghi đè/sửa
+INGEST_CHECK_BYTES = 64 * 1024
+
+# Phần đầu file giao dịch đã nạp vào bộ nhớ: file (inode), độ dài, mtime lúc
+# đọc, sha1 của INGEST_CHECK_BYTES byte cuối phần đó và tên cột
+IngestState = namedtuple("IngestState", ["inode", "offset", "mtime_ns", "checksum", "fieldnames"])
 
 class FileHandler:
     """Class xử lý việc lưu trữ và đọc file dữ liệu"""
@@ -16,6 +33,10 @@ class FileHandler:
         self.budget_file = Path(BUDGET_FILE)
         self.encoding = CSV_CONFIG["encoding"]
         self.delimiter = CSV_CONFIG["delimiter"]
+        # Số lần file ngân sách được ghi bởi instance này (một phần của phiên bản dữ liệu)
+        self.budget_writes = 0
+        # Phần file giao dịch đã nạp, None nếu lần nạp sau phải đọc lại toàn bộ
+        self._ingested: Optional[IngestState] = None
         
         # Tạo file headers nếu chưa tồn tại
         self._initialize_files()
@@ -25,6 +46,8 @@ class FileHandler:
         # Initialize transactions file
         if not self.transactions_file.exists():
             self._create_transactions_file()
+        elif self._needs_timestamp_migration():
+            self.migrate_transactions_file()
         
         # Initialize budget file
         if not self.budget_file.exists():
@@ -32,15 +55,10 @@ class FileHandler:
     
     def _create_transactions_file(self):
         """Tạo file giao dịch với headers"""
-        headers = [
-            "timestamp", "date", "type", "category", 
-            "amount", "description"
-        ]
-        
         try:
             with open(self.transactions_file, 'w', newline='', encoding=self.encoding) as file:
                 writer = csv.writer(file, delimiter=self.delimiter)
-                writer.writerow(headers)
+                writer.writerow(TRANSACTION_HEADERS)
         except Exception as e:
             print(f"Lỗi khi tạo file giao dịch: {e}")
     
@@ -66,8 +84,12 @@ class FileHandler:
             bool: True nếu thành công, False nếu thất bại
         """
         try:
-            # Thêm timestamp (chỉ thời gian)
-            timestamp = datetime.now().strftime(CSV_CONFIG["timestamp_format"])
+            # Dòng mới chỉ được coi là đã nạp nếu trước đó không còn dòng nào chưa đọc
+            fully_ingested = self._is_fully_ingested()
+            
+            # Giữ timestamp của giao dịch (ISO-8601 đến micro giây), chỉ tạo mới khi thiếu
+            timestamp = transaction_data.get("timestamp")
+            timestamp = normalize_timestamp(timestamp, transaction_data.get("date", "")) if timestamp else new_timestamp()
             
             # Chuẩn bị dữ liệu
             row_data = [
@@ -75,7 +97,7 @@ class FileHandler:
                 transaction_data.get("date", ""),
                 transaction_data.get("type", ""),
                 transaction_data.get("category", ""),
-                transaction_data.get("amount", 0),
+                self._format_amount(transaction_data),
                 transaction_data.get("description", "")
             ]
             
@@ -84,9 +106,14 @@ class FileHandler:
                 writer = csv.writer(file, delimiter=self.delimiter)
                 writer.writerow(row_data)
             
+            if fully_ingested:
+                self.mark_loaded()
+            else:
+                self._ingested = None
             return True
             
         except Exception as e:
+            self._ingested = None
             print(f"Lỗi khi lưu giao dịch: {e}")
             return False
     
@@ -98,38 +125,151 @@ class FileHandler:
             List[Dict]: Danh sách các giao dịch
         """
         transactions = []
+        self._ingested = None
         
         try:
             if not self.transactions_file.exists():
                 print("File giao dịch không tồn tại")
                 return transactions
             
-            with open(self.transactions_file, 'r', encoding=self.encoding) as file:
-                reader = csv.DictReader(file, delimiter=self.delimiter)
-                
-                for row in reader:
-                    # Chuyển đổi amount sang float
-                    try:
-                        amount = float(row.get("amount", 0))
-                    except (ValueError, TypeError):
-                        print(f"Lỗi chuyển đổi số tiền: {row.get('amount')}")
-                        amount = 0.0
-                    
-                    transaction = {
-                        "timestamp": row.get("timestamp", ""),
-                        "date": row.get("date", ""),
-                        "type": row.get("type", ""),
-                        "category": row.get("category", ""),
-                        "amount": amount,
-                        "description": row.get("description", "")
-                    }
-                    transactions.append(transaction)
+            with open(self.transactions_file, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                data = file.read()
+            
+            reader = csv.DictReader(io.StringIO(data.decode(self.encoding), newline=''),
+                                    delimiter=self.delimiter)
+            for row in reader:
+                transactions.append(self._parse_transaction_row(row))
+            
+            # Ghi nhận phần đã nạp để lần sau chỉ đọc các dòng ghi thêm
+            self._ingested = IngestState(
+                stat.st_ino, len(data), stat.st_mtime_ns,
+                self._checksum(data[-INGEST_CHECK_BYTES:]), reader.fieldnames
+            )
             
         except Exception as e:
             print(f"Lỗi khi tải giao dịch: {e}")
         
         return transactions
     
+    def load_appended_transactions(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Chỉ đọc các dòng được ghi thêm vào cuối file kể từ lần nạp trước
+        
+        Phần đã nạp được kiểm tra bằng inode, độ dài và sha1 của các byte
+        cuối phần đó; chỉ phần đuôi mới được phân tích. Dòng cuối chưa có
+        ký tự xuống dòng được để lại cho lần sau.
+        
+        Returns:
+            Optional[List[Dict]]: Các giao dịch mới (có thể rỗng), None nếu
+            chưa từng nạp hoặc phần đã nạp đã thay đổi (cần tải lại toàn bộ)
+        """
+        state = self._ingested
+        if state is None:
+            return None
+        
+        try:
+            with open(self.transactions_file, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                if stat.st_ino != state.inode or stat.st_size < state.offset:
+                    return None
+                if stat.st_size == state.offset and stat.st_mtime_ns == state.mtime_ns:
+                    return []
+                
+                start = max(0, state.offset - INGEST_CHECK_BYTES)
+                file.seek(start)
+                window = file.read(state.offset - start)
+                if self._checksum(window) != state.checksum:
+                    return None
+                tail = file.read()
+            
+            end = tail.rfind(b"\n") + 1
+            reader = csv.DictReader(io.StringIO(tail[:end].decode(self.encoding), newline=''),
+                                    fieldnames=state.fieldnames, delimiter=self.delimiter)
+            transactions = [self._parse_transaction_row(row) for row in reader]
+            
+            self._ingested = IngestState(
+                state.inode, state.offset + end, stat.st_mtime_ns,
+                self._checksum((window + tail[:end])[-INGEST_CHECK_BYTES:]), state.fieldnames
+            )
+            return transactions
+            
+        except Exception as e:
+            print(f"Lỗi khi đọc phần ghi thêm của file giao dịch: {e}")
+            return None
+    
+    def _parse_transaction_row(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Chuyển một dòng CSV thành dict giao dịch"""
+        # Đọc amount chính xác sang số nguyên đơn vị nhỏ nhất
+        try:
+            amount_minor = to_minor(row.get("amount") or 0)
+        except ValueError:
+            print(f"Lỗi chuyển đổi số tiền: {row.get('amount')}")
+            amount_minor = 0
+        
+        return {
+            "timestamp": normalize_timestamp(row.get("timestamp") or "", row.get("date") or ""),
+            "date": row.get("date") or "",
+            "type": row.get("type") or "",
+            "category": row.get("category") or "",
+            "amount": from_minor(amount_minor),
+            "amount_minor": amount_minor,
+            "description": row.get("description") or ""
+        }
+    
+    @staticmethod
+    def _checksum(data: bytes) -> str:
+        """sha1 của một đoạn byte"""
+        return hashlib.sha1(data).hexdigest()
+    
+    def _is_fully_ingested(self) -> bool:
+        """File giao dịch không có dòng nào ngoài phần đã nạp (chỉ stat file)"""
+        state = self._ingested
+        if state is None:
+            return False
+        try:
+            stat = os.stat(self.transactions_file)
+        except OSError:
+            return False
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns) == (state.inode, state.offset, state.mtime_ns)
+    
+    def mark_loaded(self) -> None:
+        """
+        Ghi nhận toàn bộ nội dung file hiện tại là đã có trong bộ nhớ
+        
+        Dùng sau khi chính ứng dụng ghi file, hoặc khi dữ liệu được khôi
+        phục từ nơi khác (ví dụ trạng thái khởi động nhanh đã kiểm tra khớp
+        với file) mà không đọc lại file.
+        """
+        self._ingested = None
+        try:
+            with open(self.transactions_file, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                header = file.readline()
+                start = max(0, stat.st_size - INGEST_CHECK_BYTES)
+                file.seek(start)
+                window = file.read(stat.st_size - start)
+        except OSError as e:
+            print(f"Lỗi khi đọc file giao dịch: {e}")
+            return
+        # File rỗng chưa có header: dòng đầu tiên ghi thêm sẽ được đọc làm header
+        fieldnames = next(csv.reader([header.decode(self.encoding).rstrip("\r\n")],
+                                     delimiter=self.delimiter), None) if header else None
+        self._ingested = IngestState(stat.st_ino, len(window) + start, stat.st_mtime_ns,
+                                     self._checksum(window), fieldnames)
+    
+    @staticmethod
+    def _amount_minor(transaction: Dict[str, Any]) -> int:
+        """Số tiền theo đơn vị nhỏ nhất của một dict giao dịch (ưu tiên amount_minor)"""
+        amount_minor = transaction.get("amount_minor")
+        if amount_minor is None:
+            return to_minor(transaction.get("amount") or 0)
+        return int(amount_minor)
+    
+    def _format_amount(self, transaction: Dict[str, Any]) -> str:
+        """Chuỗi số tiền chính xác để ghi vào file CSV"""
+        return format_minor(self._amount_minor(transaction))
+    
     def update_transactions(self, transactions: List[Dict[str, Any]]) -> bool:
         """
         Cập nhật toàn bộ file giao dịch
@@ -146,27 +286,87 @@ class FileHandler:
                 writer = csv.writer(file, delimiter=self.delimiter)
                 
                 # Ghi headers
-                headers = ["timestamp", "date", "type", "category", "amount", "description"]
-                writer.writerow(headers)
+                writer.writerow(TRANSACTION_HEADERS)
                 
                 # Ghi dữ liệu
                 for transaction in transactions:
                     row_data = [
-                        transaction.get("timestamp", ""),
+                        normalize_timestamp(transaction.get("timestamp", ""), transaction.get("date", "")),
                         transaction.get("date", ""),
                         transaction.get("type", ""),
                         transaction.get("category", ""),
-                        transaction.get("amount", 0),
+                        self._format_amount(transaction),
                         transaction.get("description", "")
                     ]
                     writer.writerow(row_data)
             
+            self.mark_loaded()
             return True
             
         except Exception as e:
+            self._ingested = None
             print(f"Lỗi khi cập nhật giao dịch: {e}")
             return False
     
+    def _needs_timestamp_migration(self) -> bool:
+        """Dòng dữ liệu đầu tiên còn dùng timestamp cũ (file chưa được nâng cấp)"""
+        try:
+            with open(self.transactions_file, 'r', encoding=self.encoding, newline='') as file:
+                reader = csv.DictReader(file, delimiter=self.delimiter)
+                row = next(reader, None)
+        except Exception as e:
+            print(f"Lỗi khi kiểm tra file giao dịch: {e}")
+            return False
+        if row is None or not row.get("timestamp"):
+            return False
+        return normalize_timestamp(row["timestamp"], row.get("date", "")) != row["timestamp"]
+    
+    def migrate_transactions_file(self) -> Optional[int]:
+        """
+        Nâng cấp timestamp cũ (HH:MM:SS) trong file giao dịch lên ISO-8601
+        
+        Đọc và ghi từng dòng sang file tạm cùng thư mục rồi thay thế nguyên
+        tử, nên bộ nhớ dùng không phụ thuộc kích thước file và file cũ còn
+        nguyên nếu quá trình bị gián đoạn. Không ghi gì nếu không có dòng
+        nào cần nâng cấp.
+        
+        Returns:
+            Optional[int]: Số dòng đã nâng cấp, None nếu thất bại
+        """
+        try:
+            upgraded = 0
+            fd, temp_path = tempfile.mkstemp(dir=self.transactions_file.parent, suffix=".tmp")
+            try:
+                with open(self.transactions_file, 'r', encoding=self.encoding, newline='') as source, \
+                        os.fdopen(fd, 'w', newline='', encoding=self.encoding) as target:
+                    reader = csv.DictReader(source, delimiter=self.delimiter)
+                    writer = csv.DictWriter(target, fieldnames=reader.fieldnames or TRANSACTION_HEADERS,
+                                            delimiter=self.delimiter, extrasaction='ignore')
+                    writer.writeheader()
+                    for row in reader:
+                        timestamp = row.get("timestamp") or ""
+                        normalized = normalize_timestamp(timestamp, row.get("date", ""))
+                        if normalized != timestamp:
+                            row["timestamp"] = normalized
+                            upgraded += 1
+                        writer.writerow(row)
+                
+                if upgraded:
+                    os.replace(temp_path, self.transactions_file)
+                    self._ingested = None
+                else:
+                    os.unlink(temp_path)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+                raise
+            
+            return upgraded
+            
+        except Exception as e:
+            print(f"Lỗi khi nâng cấp file giao dịch: {e}")
+            return None
+    
     def save_budget(self, category: str, amount: float, month_year: str) -> bool:
         """
         Lưu ngân sách cho một danh mục
@@ -179,31 +379,7 @@ class FileHandler:
         Returns:
             bool: True nếu thành công, False nếu thất bại
         """
-        try:
-            # Đọc dữ liệu hiện tại
-            budgets = self.load_budgets()
-            
-            # Cập nhật hoặc thêm mới
-            found = False
-            for budget in budgets:
-                if budget["category"] == category and budget["month_year"] == month_year:
-                    budget["amount"] = amount
-                    found = True
-                    break
-            
-            if not found:
-                budgets.append({
-                    "category": category,
-                    "amount": amount,
-                    "month_year": month_year
-                })
-            
-            # Lưu lại tất cả
-            return self._save_all_budgets(budgets)
-            
-        except Exception as e:
-            print(f"Lỗi khi lưu ngân sách: {e}")
-            return False
+        return self.update_budgets(upserts=[(category, amount, month_year)]) is not None
     
     def load_budgets(self) -> List[Dict[str, Any]]:
         """
@@ -212,34 +388,87 @@ class FileHandler:
         Returns:
             List[Dict]: Danh sách ngân sách
         """
+        try:
+            return self._read_budgets()
+        except Exception as e:
+            print(f"Lỗi khi tải ngân sách: {e}")
+            return []
+    
+    def _read_budgets(self) -> List[Dict[str, Any]]:
+        """Đọc file ngân sách, để lỗi đọc nổi lên (dùng trước khi ghi đè file)"""
         budgets = []
+        if not self.budget_file.exists():
+            return budgets
         
-        try:
-            if not self.budget_file.exists():
-                return budgets
+        with open(self.budget_file, 'r', encoding=self.encoding) as file:
+            reader = csv.DictReader(file, delimiter=self.delimiter)
             
-            with open(self.budget_file, 'r', encoding=self.encoding) as file:
-                reader = csv.DictReader(file, delimiter=self.delimiter)
+            for row in reader:
+                # Chuyển đổi amount sang float
+                try:
+                    amount = float(row.get("amount", 0))
+                except (ValueError, TypeError):
+                    amount = 0.0
                 
-                for row in reader:
-                    # Chuyển đổi amount sang float
-                    try:
-                        amount = float(row.get("amount", 0))
-                    except (ValueError, TypeError):
-                        amount = 0.0
-                    
-                    budget = {
-                        "category": row.get("category", ""),
-                        "amount": amount,
-                        "month_year": row.get("month_year", "")
-                    }
-                    budgets.append(budget)
-            
-        except Exception as e:
-            print(f"Lỗi khi tải ngân sách: {e}")
+                budget = {
+                    "category": row.get("category", ""),
+                    "amount": amount,
+                    "month_year": row.get("month_year", "")
+                }
+                budgets.append(budget)
         
         return budgets
     
+    def update_budgets(self, upserts: Iterable[Tuple[str, float, str]] = (),
+                       deletes: Iterable[Tuple[str, str]] = (),
+                       derive_upserts: Callable[[List[Dict[str, Any]]], Iterable[Tuple[str, float, str]]] = None
+                       ) -> Optional[Dict[str, int]]:
+        """
+        Áp dụng nhiều thay đổi ngân sách trong một lần đọc-sửa-ghi
+        
+        Các lệnh xóa được áp dụng trước, sau đó tới các lệnh thêm/cập nhật;
+        file chỉ được thay thế nguyên tử một lần (hoặc không ghi nếu không
+        có gì thay đổi).
+        
+        Args:
+            upserts: Các bộ (danh mục, số tiền, tháng/năm) cần thêm hoặc cập nhật
+            deletes: Các bộ (danh mục, tháng/năm) cần xóa
+            derive_upserts: Hàm nhận các ngân sách vừa đọc và trả về thêm các bộ
+                cần thêm/cập nhật (ví dụ copy từ tháng khác) trong cùng lần đọc
+            
+        Returns:
+            Optional[Dict[str, int]]: {"upserted", "deleted"}, None nếu thất bại
+        """
+        try:
+            budgets = self._read_budgets()
+            if derive_upserts is not None:
+                upserts = list(upserts) + list(derive_upserts(budgets))
+            
+            delete_keys = set(deletes)
+            kept = [budget for budget in budgets
+                    if (budget["category"], budget["month_year"]) not in delete_keys]
+            deleted = len(budgets) - len(kept)
+            
+            index = {(budget["category"], budget["month_year"]): budget for budget in kept}
+            upserted = 0
+            for category, amount, month_year in upserts:
+                budget = index.get((category, month_year))
+                if budget is None:
+                    budget = {"category": category, "amount": amount, "month_year": month_year}
+                    index[(category, month_year)] = budget
+                    kept.append(budget)
+                else:
+                    budget["amount"] = amount
+                upserted += 1
+            
+            if (upserted or deleted) and not self._save_all_budgets(kept):
+                return None
+            return {"upserted": upserted, "deleted": deleted}
+            
+        except Exception as e:
+            print(f"Lỗi khi cập nhật hàng loạt ngân sách: {e}")
+            return None
+    
     def _save_all_budgets(self, budgets: List[Dict[str, Any]]) -> bool:
         """
         Lưu tất cả ngân sách vào file
@@ -251,22 +480,30 @@ class FileHandler:
             bool: True nếu thành công, False nếu thất bại
         """
         try:
-            # Ghi file mới
-            with open(self.budget_file, 'w', newline='', encoding=self.encoding) as file:
-                writer = csv.writer(file, delimiter=self.delimiter)
-                
-                # Ghi headers
-                headers = ["category", "amount", "month_year"]
-                writer.writerow(headers)
-                
-                # Ghi dữ liệu
-                for budget in budgets:
-                    row_data = [
-                        budget.get("category", ""),
-                        budget.get("amount", 0),
-                        budget.get("month_year", "")
-                    ]
-                    writer.writerow(row_data)
+            # Ghi ra file tạm cùng thư mục rồi thay thế nguyên tử,
+            # file cũ còn nguyên nếu quá trình ghi bị gián đoạn
+            fd, temp_path = tempfile.mkstemp(dir=self.budget_file.parent, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', newline='', encoding=self.encoding) as file:
+                    writer = csv.writer(file, delimiter=self.delimiter)
+                    
+                    # Ghi headers
+                    headers = ["category", "amount", "month_year"]
+                    writer.writerow(headers)
+                    
+                    # Ghi dữ liệu
+                    for budget in budgets:
+                        row_data = [
+                            budget.get("category", ""),
+                            budget.get("amount", 0),
+                            budget.get("month_year", "")
+                        ]
+                        writer.writerow(row_data)
+                os.replace(temp_path, self.budget_file)
+                self.budget_writes += 1
+            except Exception:
+                os.unlink(temp_path)
+                raise
             
             return True
             
@@ -286,13 +523,19 @@ class FileHandler:
         """
         try:
             transactions = self.load_transactions()
+            amount_minor = self._amount_minor(transaction_to_delete)
+            # Timestamp (nếu có) phân biệt các giao dịch giống hệt nhau trong cùng ngày
+            timestamp = transaction_to_delete.get("timestamp")
+            if timestamp:
+                timestamp = normalize_timestamp(timestamp, transaction_to_delete.get("date", ""))
             
             # Tìm và xóa giao dịch
             for i, transaction in enumerate(transactions):
                 if (transaction["date"] == transaction_to_delete.get("date") and
+                    (not timestamp or transaction["timestamp"] == timestamp) and
                     transaction["type"] == transaction_to_delete.get("type") and
                     transaction["category"] == transaction_to_delete.get("category") and
-                    abs(float(transaction["amount"]) - float(transaction_to_delete.get("amount", 0))) < 0.01 and
+                    transaction["amount_minor"] == amount_minor and
                     transaction["description"] == transaction_to_delete.get("description", "")):
                     
                     del transactions[i]
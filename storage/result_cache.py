@@ -0,0 +1,92 @@
+#Cache kết quả phân tích trên đĩa
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+from config import CACHE_DIR
+
+
+class ResultCache:
+    """
+    Lưu kết quả tính toán tốn kém xuống đĩa để dùng lại sau khi khởi động lại
+
+    Mỗi khóa được băm thành một file riêng; dấu vân tay của dữ liệu nguồn
+    (version) được lưu bên trong file chứ không nằm trong khóa, nên khi dữ
+    liệu đổi file cũ bị ghi đè thay vì để lại file mồ côi, và kết quả cũ
+    không bao giờ được trả về. File được ghi qua file tạm rồi thay thế
+    nguyên tử.
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR):
+        """
+        Args:
+            directory: Thư mục chứa các file cache
+        """
+        self.directory = Path(directory)
+
+    def _path(self, key: Any) -> Path:
+        """Đường dẫn file cho một khóa"""
+        digest = hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+        return self.directory / f"{digest}.pkl"
+
+    def get(self, key: Any, version: Any = None) -> Optional[Any]:
+        """
+        Lấy kết quả đã lưu
+
+        Args:
+            key: Khóa (tuple các giá trị có repr ổn định)
+            version: Dấu vân tay dữ liệu mà kết quả phải khớp
+
+        Returns:
+            Optional[Any]: Kết quả, None nếu chưa có, đã cũ hoặc file hỏng
+        """
+        path = self._path(key)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "rb") as file:
+                stored_key, stored_version, value = pickle.load(file)
+            return value if (stored_key, stored_version) == (repr(key), version) else None
+        except Exception as e:
+            print(f"Lỗi khi đọc cache kết quả: {e}")
+            return None
+
+    def set(self, key: Any, value: Any, version: Any = None) -> bool:
+        """
+        Lưu kết quả (ghi đè kết quả của phiên bản dữ liệu trước cùng khóa)
+
+        Args:
+            key: Khóa (tuple các giá trị có repr ổn định)
+            value: Kết quả cần lưu (phải pickle được)
+            version: Dấu vân tay dữ liệu tạo ra kết quả
+
+        Returns:
+            bool: True nếu thành công, False nếu thất bại
+        """
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    pickle.dump((repr(key), version, value), file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, self._path(key))
+            except Exception:
+                os.unlink(temp_path)
+                raise
+            return True
+        except Exception as e:
+            print(f"Lỗi khi ghi cache kết quả: {e}")
+            return False
+
+    def clear(self) -> None:
+        """Xóa toàn bộ file cache"""
+        if not self.directory.exists():
+            return
+        for path in self.directory.glob("*.pkl"):
+            try:
+                path.unlink()
+            except OSError as e:
+                print(f"Lỗi khi xóa cache kết quả: {e}")
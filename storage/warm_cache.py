@@ -0,0 +1,143 @@
+#Lưu trạng thái tổng hợp đã tính để khởi động nhanh
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+from config import CACHE_DIR
+
+# Tăng khi cấu trúc dữ liệu được lưu thay đổi để bỏ các file cũ
+WARM_CACHE_FORMAT = 3
+
+# Kích thước khối đọc khi băm nội dung file
+_HASH_CHUNK = 1024 * 1024
+
+
+def file_fingerprint(path: Path) -> Optional[Tuple[int, int, str]]:
+    """
+    Dấu vân tay của một file nguồn
+
+    Args:
+        path: Đường dẫn file
+
+    Returns:
+        Optional[Tuple]: (kích thước, mtime_ns, sha1 nội dung), None nếu không đọc được
+    """
+    try:
+        stat = os.stat(path)
+        digest = hashlib.sha1()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(_HASH_CHUNK), b""):
+                digest.update(chunk)
+        return stat.st_size, stat.st_mtime_ns, digest.hexdigest()
+    except OSError:
+        return None
+
+
+class WarmCache:
+    """
+    Lưu trạng thái đã tính (kho tổng hợp, chỉ mục, cache kết quả) khi thoát
+
+    Mỗi phần được lưu vào một file riêng kèm dấu vân tay (kích thước,
+    mtime, sha1) của các file nguồn. Khi khởi động, phần đó chỉ được dùng
+    lại nếu mọi file nguồn vẫn khớp; kích thước và mtime được so trước nên
+    file đã đổi bị loại mà không cần băm lại nội dung.
+    """
+
+    def __init__(self, directory: Path = CACHE_DIR):
+        """
+        Args:
+            directory: Thư mục chứa các file trạng thái
+        """
+        self.directory = Path(directory)
+
+    def _path(self, name: str) -> Path:
+        """Đường dẫn file của một phần trạng thái"""
+        return self.directory / f"{name}.warm"
+
+    def save(self, name: str, sources: Iterable[Path], payload: Any) -> bool:
+        """
+        Lưu một phần trạng thái
+
+        Args:
+            name: Tên phần trạng thái
+            sources: Các file nguồn mà trạng thái được tính từ đó
+            payload: Dữ liệu cần lưu (phải pickle được)
+
+        Returns:
+            bool: True nếu thành công, False nếu thất bại
+        """
+        try:
+            fingerprints = {str(path): file_fingerprint(path) for path in sources}
+            if any(fingerprint is None for fingerprint in fingerprints.values()):
+                return False
+
+            self.directory.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    pickle.dump((WARM_CACHE_FORMAT, fingerprints), file, protocol=pickle.HIGHEST_PROTOCOL)
+                    pickle.dump(payload, file, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, self._path(name))
+            except Exception:
+                os.unlink(temp_path)
+                raise
+            return True
+        except Exception as e:
+            print(f"Lỗi khi lưu trạng thái khởi động nhanh: {e}")
+            return False
+
+    def load(self, name: str, sources: Iterable[Path]) -> Optional[Any]:
+        """
+        Đọc một phần trạng thái nếu các file nguồn chưa thay đổi
+
+        Args:
+            name: Tên phần trạng thái
+            sources: Các file nguồn hiện tại
+
+        Returns:
+            Optional[Any]: Dữ liệu đã lưu, None nếu không có hoặc đã cũ
+        """
+        path = self._path(name)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "rb") as file:
+                header = pickle.load(file)
+                if not self._is_valid(header, [str(source) for source in sources]):
+                    return None
+                return pickle.load(file)
+        except Exception as e:
+            print(f"Lỗi khi đọc trạng thái khởi động nhanh: {e}")
+            return None
+
+    @staticmethod
+    def _is_valid(header: Any, sources: list) -> bool:
+        """Kiểm tra phiên bản định dạng và dấu vân tay của các file nguồn"""
+        if not isinstance(header, tuple) or len(header) != 2 or header[0] != WARM_CACHE_FORMAT:
+            return False
+        fingerprints: Dict[str, Any] = header[1]
+        if sorted(fingerprints) != sorted(sources):
+            return False
+        for source in sources:
+            size, mtime_ns, digest = fingerprints[source]
+            try:
+                stat = os.stat(source)
+            except OSError:
+                return False
+            if stat.st_size != size or stat.st_mtime_ns != mtime_ns:
+                return False
+            if file_fingerprint(Path(source)) != (size, mtime_ns, digest):
+                return False
+        return True
+
+    def discard(self, name: str) -> None:
+        """Xóa một phần trạng thái"""
+        try:
+            self._path(name).unlink()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Lỗi khi xóa trạng thái khởi động nhanh: {e}")
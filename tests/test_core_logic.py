@@ -0,0 +1,1075 @@
+import unittest
+import sys
+import os
+import tempfile
+import itertools
+import threading
+import time
+from pathlib import Path
+from datetime import date, datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core_logic.models import Transaction
+from core_logic.reports import ReportGenerator
+from core_logic.transaction_cache import cached_method, CacheCore, CacheManager, TransactionCache
+from core_logic.analytics import TransactionAnalytics
+from core_logic.online_stats import OnlineStatistics
+from core_logic.snapshot import DatasetSnapshot
+from core_logic.budget import BudgetManager
+from core_logic.budget_alerts import BudgetAlertEngine
+from core_logic.report_engine import ReportCube
+from core_logic.transaction_bst import TransactionBST
+from storage.result_cache import ResultCache
+from storage.warm_cache import WarmCache
+from storage.file_handler import FileHandler
+from core_logic.transactions import TransactionManager
+import app_controller
+from app_controller import AppController
+from gui.transaction_list_model import TransactionListModel
+from gui.report_executor import ReportExecutor
+from gui.idle_scheduler import IdleScheduler
+import numpy as np
+
+
+def make_transactions():
+    """Tạo bộ giao dịch mẫu dùng chung cho các test"""
+    return [
+        Transaction("01/01/2025", "Thu nhập", "Lương", 15000000.0, "Lương tháng 1"),
+        Transaction("02/01/2025", "Chi tiêu", "Ăn uống", 150000.0, "Ăn trưa"),
+        Transaction("09/01/2025", "Chi tiêu", "Ăn uống", 250000.0, "Ăn tối"),
+        Transaction("10/01/2025", "Chi tiêu", "Đi lại", 50000.0, "Xe bus"),
+        Transaction("01/02/2025", "Thu nhập", "Lương", 16000000.0, "Lương tháng 2"),
+        Transaction("03/02/2025", "Chi tiêu", "Ăn uống", 300000.0, "Ăn trưa"),
+        Transaction("15/12/2024", "Chi tiêu", "Giải trí", 500000.0, "Xem phim"),
+    ]
+
+
+class FakeWidget:
+    """Widget giả thay cho Tk: after() xếp hàng callback, run_pending() chạy chúng trên luồng test"""
+
+    def __init__(self):
+        self.jobs = []
+        self.bindings = []
+        self._ids = itertools.count(1)
+
+    def after(self, ms, callback):
+        job = f"after#{next(self._ids)}"
+        self.jobs.append((job, callback))
+        return job
+
+    def after_idle(self, callback):
+        return self.after(0, callback)
+
+    def after_cancel(self, job):
+        self.jobs = [(j, callback) for j, callback in self.jobs if j != job]
+
+    def bind_all(self, sequence, callback, add=None):
+        self.bindings.append(sequence)
+
+    def run_pending(self, until=None, timeout=2.0):
+        """Chạy các callback đã hẹn cho tới khi hết (hoặc until() đúng)"""
+        deadline = time.monotonic() + timeout
+        while self.jobs and time.monotonic() < deadline:
+            if until is not None and until():
+                return
+            _job, callback = self.jobs.pop(0)
+            callback()
+            time.sleep(0.001)
+
+
+class TestReportGenerator(unittest.TestCase):
+    def setUp(self):
+        """
+        Thiết lập dữ liệu giao dịch mẫu
+        """
+        self.transactions = make_transactions()
+        self.generator = ReportGenerator(self.transactions)
+
+    def test_monthly_report(self):
+        """
+        Test báo cáo tháng lấy từ khối tổng hợp
+        """
+        report = self.generator.get_monthly_report("01/2025")
+        summary = report["summary"]
+        self.assertEqual(summary["income"], 15000000)
+        self.assertEqual(summary["expense"], 450000)
+        self.assertEqual(summary["transaction_count"], 4)
+        self.assertEqual(summary["max_single_expense"], 250000)
+        self.assertEqual(report["expense_by_category"], {"Ăn uống": 400000, "Đi lại": 50000})
+        self.assertEqual(report["largest_expense"].description, "Ăn tối")
+        # Tuần ISO: 01-02/01 thuộc tuần 1, 09-10/01 thuộc tuần 2
+        self.assertEqual(report["weekly_data"][1]["expense"], 150000)
+        self.assertEqual(report["weekly_data"][2]["expense"], 300000)
+
+    def test_yearly_report(self):
+        """
+        Test báo cáo năm cộng dồn từ các tháng
+        """
+        report = self.generator.get_yearly_report("2025")
+        self.assertEqual(report["summary"]["total_income"], 31000000)
+        self.assertEqual(report["summary"]["total_expense"], 750000)
+        self.assertEqual(list(report["monthly_breakdown"]), ["01/2025", "02/2025"])
+
+    def test_category_analysis_chronological_trend(self):
+        """
+        Test phân tích danh mục với xu hướng theo thứ tự thời gian
+        """
+        self.transactions.append(Transaction("05/12/2024", "Chi tiêu", "Ăn uống", 100000.0))
+        analysis = ReportGenerator(self.transactions).get_category_analysis("Chi tiêu")
+        food = next(c for c in analysis if c["category"] == "Ăn uống")
+        self.assertEqual(food["total_amount"], 800000)
+        self.assertEqual(food["min_amount"], 100000)
+        self.assertEqual(food["max_amount"], 300000)
+        self.assertEqual([t["month"] for t in food["monthly_trend"]], ["01/2025", "02/2025"])
+
+    def test_comprehensive_report_uses_single_cube(self):
+        """
+        Test báo cáo tổng hợp chỉ xây dựng khối tổng hợp một lần
+        """
+        self.generator.export_comprehensive_report()
+        cube = self.generator.cube
+        self.generator.export_comprehensive_report()
+        self.assertIs(self.generator.cube, cube)
+
+    def test_monthly_series_is_calendar_correct(self):
+        """
+        Test chuỗi theo tháng không bỏ sót/lặp tháng và có đủ kỳ trống
+        """
+        series = self.generator.cube.last_months(4, date(2025, 3, 31))
+        self.assertEqual([p["period"] for p in series], ["12/2024", "01/2025", "02/2025", "03/2025"])
+        self.assertEqual(series[0]["expense"], 500000)
+        self.assertEqual(series[3]["transaction_count"], 0)
+
+    def test_weekly_and_daily_series(self):
+        """
+        Test chuỗi theo tuần ISO và theo ngày
+        """
+        weekly = self.generator.get_time_series("week", "30/12/2024", "12/01/2025")
+        self.assertEqual([p["period"] for p in weekly], ["2025-W01", "2025-W02"])
+        self.assertEqual(weekly[0]["income"], 15000000)
+        self.assertEqual(weekly[1]["expense"], 300000)
+
+        daily = self.generator.get_time_series("day", "01/01/2025", "03/01/2025")
+        self.assertEqual([p["expense"] for p in daily], [0, 150000, 0])
+
+    def test_incremental_store_matches_rebuild(self):
+        """
+        Test kho tổng hợp cộng dồn từng giao dịch và tuần ISO tính sẵn khi nạp
+        """
+        transaction = Transaction("31/12/2024", "Chi tiêu", "Ăn uống", 70000.0)
+        self.assertEqual(transaction.get_date_parts()[1:], (2025, 1))
+
+        snapshot = self.generator.cube.copy()
+        self.generator.cube.add(transaction)
+        rebuilt = ReportGenerator(self.transactions + [transaction]).cube
+        self.assertEqual(self.generator.cube.totals(), rebuilt.totals())
+        self.assertEqual(self.generator.cube.week_totals(2025, 1), rebuilt.week_totals(2025, 1))
+        self.assertEqual(self.generator.cube.week_totals(2025, 1)["expense"], 220000)
+        self.assertEqual(snapshot.week_totals(2025, 1)["expense"], 150000)
+
+
+class TestDatasetSnapshot(unittest.TestCase):
+    def test_snapshot_is_shared_and_read_only(self):
+        """
+        Test ảnh chụp chỉ đọc và cho cùng kết quả ở báo cáo và ngân sách
+        """
+        transactions = make_transactions()
+        snapshot = DatasetSnapshot(transactions, version=1)
+        self.assertEqual(snapshot.categories, ("Giải trí", "Lương", "Ăn uống", "Đi lại"))
+        with self.assertRaises(ValueError):
+            snapshot.amount[0] = 0
+
+        self.assertEqual(snapshot.spent_by_category("01/2025"), {"Ăn uống": 400000, "Đi lại": 50000})
+        self.assertEqual(
+            BudgetManager.spent_by_category(snapshot, "01/2025"),
+            BudgetManager.spent_by_category(transactions, "01/2025")
+        )
+
+        generator = ReportGenerator(snapshot=snapshot)
+        self.assertEqual(
+            generator.get_category_analysis(),
+            ReportGenerator(transactions).get_category_analysis()
+        )
+
+
+    def test_snapshot_built_off_the_tk_thread(self):
+        """
+        Test nguồn ảnh chụp chỉ sao chép nông, ảnh chụp dựng từ nguồn được dùng lại và không đổi khi dữ liệu đổi
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            manager = TransactionManager()
+            manager.file_handler.transactions_file = Path(directory) / "transactions.csv"
+            manager.file_handler._create_transactions_file()
+            manager.transactions = make_transactions()
+
+            source = manager.snapshot_source()
+            self.assertEqual(source.version, manager.data_version)
+            self.assertIsNot(source.transactions, manager.transactions)
+
+            snapshot = manager.build_snapshot(source)
+            self.assertIs(manager.snapshot_source(), snapshot)
+            self.assertIs(manager.snapshot(), snapshot)
+            self.assertEqual(snapshot.cube.totals(), manager.aggregates.totals())
+
+            manager.add_transaction("05/01/2025", "Chi tiêu", "Đi lại", 30000, "Taxi")
+            self.assertEqual(len(snapshot), 7)
+            self.assertEqual(snapshot.cube.totals()["transaction_count"], 7)
+            self.assertIs(manager.build_snapshot(source), snapshot)
+            self.assertEqual(len(manager.build_snapshot(manager.snapshot_source())), 8)
+
+
+class Counter:
+    """Đối tượng đếm số lần tính toán thực sự cho test cache"""
+
+    def __init__(self):
+        self.calls = 0
+        self.data_version = 0
+
+    @cached_method(ttl_seconds=None, maxsize=2)
+    def compute(self, value):
+        self.calls += 1
+        return value * 2
+
+
+class TestCachedMethod(unittest.TestCase):
+    def test_cache_is_per_instance_and_versioned(self):
+        """
+        Test cache tách theo instance và bị vô hiệu khi phiên bản dữ liệu đổi
+        """
+        first, second = Counter(), Counter()
+        self.assertEqual(first.compute(1), 2)
+        self.assertEqual(first.compute(1), 2)
+        self.assertEqual(first.calls, 1)
+
+        second.compute(1)
+        self.assertEqual(second.calls, 1)
+
+        first.data_version += 1
+        first.compute(1)
+        self.assertEqual(first.calls, 2)
+
+    def test_cache_is_bounded(self):
+        """
+        Test mỗi instance giữ tối đa maxsize entry theo LRU
+        """
+        Counter.compute.cache_clear()
+        counter = Counter()
+        for value in range(5):
+            counter.compute(value)
+        counter.compute(0)
+        self.assertEqual(counter.calls, 6)
+        self.assertEqual(Counter.compute.cache_info().currsize, 2)
+
+    def test_bound_is_per_instance(self):
+        """
+        Test giới hạn maxsize áp dụng riêng cho từng instance
+        """
+        Counter.compute.cache_clear()
+        first, second = Counter(), Counter()
+        first.compute(1)
+        first.compute(2)
+        second.compute(1)
+        second.compute(2)
+        first.compute(1)
+        first.compute(2)
+        self.assertEqual((first.calls, second.calls), (2, 2))
+        self.assertEqual(Counter.compute.cache_info().currsize, 4)
+
+
+class TestCacheCore(unittest.TestCase):
+    def test_lru_eviction_and_namespace_stats(self):
+        cache = TransactionCache(max_size=2, capacities={"monthly_summary": 1})
+        cache.set("a", {"v": 1})
+        cache.set("b", {"v": 2})
+        cache.get("a")
+        cache.set("c", {"v": 3})
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a"), {"v": 1})
+        self.assertEqual(cache.size, 2)
+
+        cache.cache_monthly_summary("01/2025", {"income": 1})
+        cache.cache_monthly_summary("02/2025", {"income": 2})
+        self.assertIsNone(cache.get_monthly_summary("01/2025"))
+
+        stats = cache.stats()
+        self.assertEqual(stats["default"]["evictions"], 1)
+        self.assertEqual(stats["default"]["hits"], 2)
+        self.assertEqual(stats["default"]["misses"], 1)
+        self.assertEqual(stats["monthly_summary"]["capacity"], 1)
+
+    def test_memory_budget_prefers_costly_entries(self):
+        manager = CacheManager({"max_bytes": 20000, "eviction_sample": 8, "namespaces": {"cheap": 2}})
+        for key in range(40):
+            manager.put("costly" if key % 2 else "cheap_many", key, [0.0] * 100,
+                        cost=100.0 if key % 2 else 0.001)
+        snapshot = manager.snapshot()
+        self.assertLessEqual(snapshot["bytes"], 20000)
+        self.assertGreater(snapshot["namespaces"]["costly"]["size"],
+                           snapshot["namespaces"]["cheap_many"]["size"])
+
+        manager.put("cheap", "a", 1)
+        manager.put("cheap", "b", 2)
+        manager.put("cheap", "c", 3)
+        self.assertEqual(manager.size("cheap"), 2)
+        self.assertEqual(manager.get_or_compute("cheap", "c", lambda: 0), 3)
+        self.assertEqual(manager.get_or_compute("cheap", "d", lambda: 4), 4)
+
+    def test_entries_expire(self):
+        core = CacheCore()
+        core.put("x", "short", 1, ttl=0)
+        core.put("x", "long", 2)
+        self.assertIsNone(core.get("x", "short"))
+        self.assertEqual(core.get("x", "long"), 2)
+        self.assertEqual(core.stats()["x"]["expirations"], 1)
+
+
+class TestTransactionAnalytics(unittest.TestCase):
+    def test_results_follow_data_version(self):
+        """
+        Test kết quả phân tích giữ nguyên khi dữ liệu không đổi và tính lại khi đổi
+        """
+        analytics = TransactionAnalytics(make_transactions())
+        first = analytics.analyze_spending_patterns()
+        self.assertIs(analytics.analyze_spending_patterns(), first)
+
+        analytics.transactions.append(Transaction("04/02/2025", "Chi tiêu", "Đi lại", 20000.0))
+        analytics.invalidate()
+        self.assertEqual(analytics.analyze_spending_patterns()["total"], first["total"] + 20000)
+
+    def test_category_correlations(self):
+        """
+        Test ma trận tương quan theo kỳ và không có NaN với cột phương sai 0
+        """
+        analytics = TransactionAnalytics(make_transactions())
+        monthly = analytics.analyze_category_correlations("month")
+        self.assertEqual(monthly["period_count"], 3)
+        self.assertEqual(monthly["categories"], ["Giải trí", "Lương", "Ăn uống", "Đi lại"])
+
+        single_day = TransactionAnalytics([
+            Transaction("01/01/2025", "Chi tiêu", "Ăn uống", 100000.0),
+            Transaction("01/01/2025", "Chi tiêu", "Đi lại", 20000.0),
+        ]).analyze_category_correlations()
+        self.assertEqual(single_day["correlation_matrix"], [[1.0, 0.0], [0.0, 1.0]])
+
+    def test_detect_anomalies_methods(self):
+        """
+        Test phát hiện bất thường theo z-score, MAD và cửa sổ trượt
+        """
+        transactions = [
+            Transaction(f"{day:02d}/03/2025", "Chi tiêu", "Ăn uống", 50000.0 + (day % 2) * 1000)
+            for day in range(1, 11)
+        ]
+        transactions.append(Transaction("11/03/2025", "Chi tiêu", "Ăn uống", 2000000.0, "Tiệc"))
+        transactions.append(Transaction("11/03/2025", "Chi tiêu", "Đi lại", 2000000.0))
+        analytics = TransactionAnalytics(transactions)
+
+        for options in ({}, {"method": "mad"}, {"window": 5}, {"window": 4, "method": "mad"}):
+            anomalies = analytics.detect_anomalies(**options)
+            self.assertEqual([a["transaction"]["description"] for a in anomalies], ["Tiệc"], options)
+
+        self.assertAlmostEqual(analytics.detect_anomalies(method="mad")[0]["category_mean"], 51000)
+
+        # Cửa sổ trượt với MAD: trung vị và MAD của 4 giao dịch trước đó (51000, 50000 xen kẽ)
+        rolling = analytics.detect_anomalies(method="mad", window=4)[0]
+        self.assertEqual(rolling["category_mean"], 50500)
+        self.assertAlmostEqual(rolling["category_std"], 1.4826 * 500)
+
+    def test_rolling_zscore_constant_window(self):
+        """
+        Test cửa sổ trượt gồm các số tiền bằng nhau (xa trung bình danh mục) có độ lệch chuẩn đúng bằng 0
+        """
+        transactions = [
+            Transaction(f"{day:02d}/03/2025", "Chi tiêu", "Ăn uống", 1000.0 * (day % 7 + 1))
+            for day in range(1, 21)
+        ]
+        transactions += [
+            Transaction(f"{day:02d}/04/2025", "Chi tiêu", "Ăn uống", 10000000.0)
+            for day in range(1, 8)
+        ]
+        analytics = TransactionAnalytics(transactions)
+
+        # So với tính trực tiếp trên từng cửa sổ
+        expected = []
+        for position in range(2, len(transactions)):
+            previous = [t.amount for t in transactions[max(0, position - 5):position]]
+            std = np.std(previous)
+            if std > 0 and abs(transactions[position].amount - np.mean(previous)) / std > 2.0:
+                expected.append(transactions[position].date)
+        anomalies = analytics.detect_anomalies(window=5)
+        self.assertEqual(sorted(a["transaction"]["date"] for a in anomalies), sorted(expected))
+        self.assertNotIn("07/04/2025", expected)
+
+        _order, _center, spread = analytics._rolling_scores(analytics.snapshot(), 5)
+        self.assertEqual(spread[-1], 0)
+
+    def test_predict_future_spending_on_daily_series(self):
+        """
+        Test dự đoán khớp xu hướng trên chuỗi ngày liên tục, bỏ qua thu nhập
+        """
+        transactions = [
+            Transaction(f"{day:02d}/03/2025", "Chi tiêu", "Ăn uống", 100000.0 + 1000 * day)
+            for day in range(1, 11)
+        ]
+        transactions.append(Transaction("05/03/2025", "Thu nhập", "Lương", 15000000.0))
+        prediction = TransactionAnalytics(transactions).predict_future_spending(2)
+
+        self.assertAlmostEqual(prediction["trend"], 1000)
+        self.assertEqual(prediction["periods"], ["11/03/2025", "12/03/2025"])
+        self.assertAlmostEqual(prediction["predictions"][0], 111000)
+        self.assertAlmostEqual(prediction["categories"]["Ăn uống"]["predictions"][1], 112000)
+
+        monthly = TransactionAnalytics(transactions).predict_future_spending(1, freq="month")
+        self.assertEqual(monthly["periods"], ["04/2025"])
+
+    def test_results_persist_on_disk(self):
+        """
+        Test kết quả được đọc lại từ cache trên đĩa bởi instance mới
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(directory)
+
+            def build(description):
+                transactions = [
+                    Transaction(f"{day:02d}/03/2025", "Chi tiêu", "Ăn uống", 50000.0 + (day % 2) * 1000)
+                    for day in range(1, 11)
+                ]
+                transactions.append(Transaction("11/03/2025", "Chi tiêu", "Ăn uống", 2000000.0, description))
+                return transactions
+
+            expected = TransactionAnalytics(build("Tiệc"), result_cache=cache).detect_anomalies()
+            self.assertEqual(len(expected), 1)
+
+            # Dữ liệu tạo lại có timestamp và mô tả khác nhưng cùng các cột số:
+            # điểm được đọc từ đĩa, còn giao dịch lấy từ dữ liệu hiện tại
+            transactions = build("Tiệc sinh nhật")
+            fresh = TransactionAnalytics(list(transactions), result_cache=cache)
+            key = ("_score_anomalies", (), (("method", "zscore"), ("threshold", 2.0), ("window", None)))
+            self.assertEqual(len(cache.get(key, fresh.data_fingerprint())), 1)
+            anomalies = fresh.detect_anomalies()
+            self.assertEqual(anomalies[0]["z_score"], expected[0]["z_score"])
+            self.assertEqual(anomalies[0]["transaction"], transactions[-1].to_dict())
+
+            # Dữ liệu đổi: kết quả mới ghi đè file cũ thay vì thêm file
+            fresh.transactions = transactions + [Transaction("05/03/2025", "Chi tiêu", "Đi lại", 1000.0)]
+            fresh.detect_anomalies()
+            self.assertEqual(len(list(Path(directory).glob("*.pkl"))), 1)
+            self.assertIsNone(cache.get(key, "fingerprint cũ"))
+
+
+class TestBudgetBatch(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.manager = BudgetManager()
+        self.manager.file_handler.budget_file = Path(self.directory.name) / "budget.csv"
+        self.writes = 0
+        save = self.manager.file_handler._save_all_budgets
+
+        def counting_save(budgets):
+            self.writes += 1
+            return save(budgets)
+        self.manager.file_handler._save_all_budgets = counting_save
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_copy_and_clear_use_one_write(self):
+        success, _ = self.manager.apply_budget_changes(
+            upserts=[("Ăn uống", 3000000, "01/2025"), ("Đi lại", 500000, "01/2025")]
+        )
+        self.assertTrue(success)
+        self.assertEqual(self.writes, 1)
+
+        success, _ = self.manager.copy_budget_to_next_month("02/2025")
+        self.assertTrue(success)
+        self.assertEqual(self.writes, 2)
+        self.assertEqual(self.manager.get_all_budgets("02/2025"), {"Ăn uống": 3000000.0, "Đi lại": 500000.0})
+
+        success, message = self.manager.delete_budgets(["Ăn uống", "Đi lại", "Y tế"], "02/2025")
+        self.assertTrue(success)
+        self.assertIn("2", message)
+        self.assertEqual(self.writes, 3)
+        self.assertEqual(self.manager.get_all_budgets("02/2025"), {})
+        self.assertEqual(len(self.manager.get_all_budgets("01/2025")), 2)
+
+    def test_same_size_edit_changes_data_version(self):
+        self.manager.set_budget("Ăn uống", 100000, "01/2025")
+        version = self.manager.data_version
+        self.manager.set_budget("Ăn uống", 200000, "01/2025")
+        self.assertNotEqual(self.manager.data_version, version)
+
+    def test_invalid_batch_writes_nothing(self):
+        success, _ = self.manager.apply_budget_changes(
+            upserts=[("Ăn uống", 3000000, "01/2025"), ("Ăn uống", -1, "01/2025")]
+        )
+        self.assertFalse(success)
+        self.assertEqual(self.writes, 0)
+        self.assertFalse(self.manager.delete_budgets(["Ăn uống"], "01/2025")[0])
+
+
+class TestMinorUnitAmounts(unittest.TestCase):
+    def test_sums_are_exact_across_aggregates(self):
+        transactions = [Transaction("01/01/2025", "Chi tiêu", "Ăn uống", 0.1) for _ in range(10)]
+        cube = ReportCube(transactions)
+        snapshot = DatasetSnapshot(transactions)
+        self.assertEqual(cube.totals()["expense"], 1.0)
+        self.assertEqual(cube.expense_by_month_category()[("01/2025", "Ăn uống")], 100)
+        self.assertEqual(snapshot.sum_minor(), 100)
+        self.assertEqual(snapshot.spent_by_category("01/2025"), {"Ăn uống": 1.0})
+
+    def test_csv_round_trip_and_delete_match_exactly(self):
+        with tempfile.TemporaryDirectory() as directory:
+            handler = FileHandler()
+            handler.transactions_file = Path(directory) / "transactions.csv"
+            handler._create_transactions_file()
+            for amount in (0.1, 0.2, 1234.56):
+                handler.save_transaction(Transaction("01/01/2025", "Chi tiêu", "Ăn uống", amount).to_dict())
+
+            loaded = handler.load_transactions()
+            self.assertEqual([row["amount_minor"] for row in loaded], [10, 20, 123456])
+            self.assertIn(",1234.56,", handler.transactions_file.read_text(encoding="utf-8"))
+
+            self.assertFalse(handler.delete_transaction(dict(loaded[0], amount_minor=11)))
+            self.assertTrue(handler.delete_transaction(dict(loaded[0], amount_minor=None)))
+            self.assertEqual(len(handler.load_transactions()), 2)
+
+    def test_manager_deletes_by_amount_minor(self):
+        with tempfile.TemporaryDirectory() as directory:
+            manager = TransactionManager()
+            manager.file_handler.transactions_file = Path(directory) / "transactions.csv"
+            manager.file_handler._create_transactions_file()
+            manager.load_transactions()
+            for amount in (100000, 0.1):
+                manager.add_transaction("01/01/2025", "Chi tiêu", "Ăn uống", amount, "Test")
+
+            first, second = manager.transactions
+            self.assertNotIn("amount", vars(first))
+            self.assertTrue(manager.delete_transaction(vars(first))[0])
+            only_minor = {key: value for key, value in second.to_dict().items() if key != "amount"}
+            self.assertTrue(manager.delete_transaction(only_minor)[0])
+            self.assertEqual(manager.transactions, [])
+
+    def test_failed_delete_keeps_memory_in_sync_with_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            manager = TransactionManager()
+            manager.file_handler.transactions_file = Path(directory) / "transactions.csv"
+            manager.file_handler._create_transactions_file()
+            manager.load_transactions()
+            manager.add_transaction("01/01/2025", "Chi tiêu", "Ăn uống", 100000, "Test")
+            transaction = manager.transactions[0]
+            version = manager.data_version
+
+            manager.file_handler.update_transactions = lambda transactions: False
+            self.assertFalse(manager.delete_transaction(transaction.to_dict())[0])
+            self.assertEqual(manager.transactions, [transaction])
+            self.assertEqual(manager.data_version, version)
+            self.assertEqual(manager.aggregates.totals()["transaction_count"], 1)
+            self.assertFalse(manager.delete_transaction({"date": "01/01/2025", "type": "Chi tiêu",
+                                                         "category": "Ăn uống", "timestamp": ""})[0])
+
+
+class TestTimestamps(unittest.TestCase):
+    def test_bst_orders_by_date_then_timestamp(self):
+        transactions = [
+            Transaction("02/01/2025", "Chi tiêu", "Ăn uống", 3.0, timestamp="2025-01-02T08:00:00.000002"),
+            Transaction("15/12/2024", "Chi tiêu", "Ăn uống", 1.0, timestamp="2024-12-15T08:00:00.000000"),
+            Transaction("02/01/2025", "Chi tiêu", "Ăn uống", 2.0, timestamp="2025-01-02T08:00:00.000001"),
+            Transaction("10/01/2025", "Chi tiêu", "Ăn uống", 4.0, timestamp="2025-01-10T08:00:00.000000"),
+        ]
+        tree = TransactionBST()
+        for transaction in transactions:
+            tree.insert(transaction)
+
+        self.assertEqual([t.amount for t in tree.to_list()], [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual([t.amount for t in tree.find_range("01/12/2024", "02/01/2025")], [1.0, 2.0, 3.0])
+        self.assertEqual(len(tree.get_transactions_by_date_range(date(2025, 1, 2), date(2025, 1, 31))), 3)
+
+    def test_timestamps_survive_codec_and_legacy_files_are_migrated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            handler = FileHandler()
+            handler.transactions_file = Path(directory) / "transactions.csv"
+            handler.transactions_file.write_text(
+                "timestamp,date,type,category,amount,description\n"
+                "09:00:00,01/01/2025,Thu nhập,Lương,100.0,Lương\n",
+                encoding="utf-8"
+            )
+            self.assertTrue(handler._needs_timestamp_migration())
+            self.assertEqual(handler.migrate_transactions_file(), 1)
+            self.assertFalse(handler._needs_timestamp_migration())
+            self.assertEqual(handler.migrate_transactions_file(), 0)
+
+            transaction = Transaction("01/01/2025", "Chi tiêu", "Ăn uống", 5.0)
+            handler.save_transaction(transaction.to_dict())
+            loaded = handler.load_transactions()
+            self.assertEqual(loaded[0]["timestamp"], "2025-01-01T09:00:00.000000")
+            self.assertEqual(loaded[1]["timestamp"], transaction.timestamp)
+            self.assertEqual(len(transaction.timestamp), 26)
+
+
+class TestTailReload(unittest.TestCase):
+    HEADER = "timestamp,date,type,category,amount,description\r\n"
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = Path(self.directory.name) / "transactions.csv"
+        self.path.write_text(
+            self.HEADER + "2025-01-01T09:00:00.000000,01/01/2025,Chi tiêu,Ăn uống,100.0,A\r\n",
+            encoding="utf-8", newline=""
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def append(self, text):
+        with open(self.path, "a", encoding="utf-8", newline="") as file:
+            file.write(text)
+
+    def test_only_appended_tail_is_parsed(self):
+        handler = FileHandler()
+        handler.transactions_file = self.path
+        self.assertEqual(len(handler.load_transactions()), 1)
+        self.assertEqual(handler.load_appended_transactions(), [])
+
+        # Dòng cuối chưa kết thúc được để lại cho lần sau
+        self.append("2025-01-02T09:00:00.000000,02/01/2025,Chi tiêu,Đi lại,20.0,B\r\n2025-01-03T09")
+        self.assertEqual([row["description"] for row in handler.load_appended_transactions()], ["B"])
+        self.append(":00:00.000000,03/01/2025,Chi tiêu,Đi lại,30.5,C\r\n")
+        self.assertEqual([row["amount_minor"] for row in handler.load_appended_transactions()], [3050])
+
+        # Giao dịch do chính ứng dụng ghi không bị đọc lại
+        handler.save_transaction(Transaction("04/01/2025", "Chi tiêu", "Ăn uống", 1.0).to_dict())
+        self.assertEqual(handler.load_appended_transactions(), [])
+
+        # Phần đã nạp bị sửa: phải tải lại toàn bộ
+        self.path.write_bytes(self.path.read_bytes().replace(b"100.0", b"1000.0"))
+        self.assertIsNone(handler.load_appended_transactions())
+
+    def test_manager_reload_matches_full_load(self):
+        manager = TransactionManager()
+        manager.file_handler.transactions_file = self.path
+        manager.load_transactions()
+        self.append("2025-01-02T09:00:00.000000,02/01/2025,Thu nhập,Lương,500.0,B\r\n")
+
+        version = manager.data_version
+        added = manager.reload_transactions()
+        self.assertEqual([t.description for t in added], ["B"])
+        self.assertGreater(manager.data_version, version)
+        self.assertEqual(manager.aggregates.totals(), ReportCube(manager.transactions).totals())
+        self.assertEqual(manager.transaction_tree.get_size(), 2)
+
+        self.path.write_text(self.HEADER, encoding="utf-8", newline="")
+        self.assertIsNone(manager.reload_transactions())
+        self.assertEqual(manager.transactions, [])
+
+
+class TestReportCacheKeys(unittest.TestCase):
+    def test_default_arguments_share_cache_entry(self):
+        controller = AppController.__new__(AppController)
+        controller.cache = CacheManager()
+        calls = []
+
+        def build_report(report_type, snapshot, **kwargs):
+            calls.append(kwargs)
+            return {"kwargs": kwargs}
+        controller._build_report = build_report
+
+        snapshot = DatasetSnapshot(make_transactions(), version=1)
+        precomputed = controller.generate_report("trend", snapshot=snapshot, months=12)
+        self.assertIs(controller.generate_report("trend", snapshot=snapshot), precomputed)
+        self.assertEqual(calls, [{"months": 12}])
+        controller.generate_report("trend", snapshot=snapshot, months=6)
+        self.assertEqual(len(calls), 2)
+
+    def test_current_period_is_part_of_cache_key(self):
+        controller = AppController.__new__(AppController)
+        controller.cache = CacheManager()
+        calls = []
+        controller._build_report = lambda report_type, snapshot, **kwargs: calls.append(kwargs) or {}
+        snapshot = DatasetSnapshot(make_transactions(), version=1)
+
+        class FakeDatetime(datetime):
+            current = datetime(2025, 1, 31, 23, 59)
+
+            @classmethod
+            def now(cls, tz=None):
+                return cls.current
+
+        original = app_controller.datetime
+        app_controller.datetime = FakeDatetime
+        try:
+            controller.generate_report("monthly", snapshot=snapshot)
+            controller.generate_report("monthly", snapshot=snapshot, month_year="01/2025")
+            controller.generate_report("comprehensive", snapshot=snapshot)
+            self.assertEqual(calls, [{"month_year": "01/2025"}, {"format_type": "text"}])
+
+            # Sang tháng mới, dữ liệu không đổi: không dùng lại báo cáo của tháng trước
+            FakeDatetime.current = datetime(2025, 2, 1, 0, 1)
+            controller.generate_report("monthly", snapshot=snapshot)
+            controller.generate_report("comprehensive", snapshot=snapshot)
+            self.assertEqual(calls[2:], [{"month_year": "02/2025"}, {"format_type": "text"}])
+        finally:
+            app_controller.datetime = original
+
+
+class TestBudgetAlertEngine(unittest.TestCase):
+    def test_events_only_on_threshold_crossings(self):
+        history = [Transaction("02/03/2025", "Chi tiêu", "Ăn uống", 500000.0),
+                   Transaction("03/03/2025", "Thu nhập", "Lương", 9000000.0)]
+        engine = BudgetAlertEngine(warning_threshold=0.8)
+        engine.rebuild(ReportCube(history))
+        engine.set_budgets([{"category": "Ăn uống", "amount": 1000000.0, "month_year": "03/2025"}], version=1)
+
+        self.assertIsNone(engine.add(Transaction("04/03/2025", "Chi tiêu", "Ăn uống", 200000.0)))
+        warning = engine.add(Transaction("05/03/2025", "Chi tiêu", "Ăn uống", 200000.0))
+        self.assertEqual(warning["status"], "Cảnh báo")
+        self.assertEqual(warning["previous_status"], "An toàn")
+        self.assertAlmostEqual(warning["spent"], 900000.0)
+        self.assertIsNone(engine.add(Transaction("06/03/2025", "Chi tiêu", "Ăn uống", 50000.0)))
+
+        exceeded = engine.add(Transaction("07/03/2025", "Chi tiêu", "Ăn uống", 100000.0))
+        self.assertEqual(exceeded["status"], "Vượt quá")
+        self.assertIsNone(engine.add(Transaction("08/03/2025", "Chi tiêu", "Ăn uống", 100000.0)))
+
+        # Danh mục không có ngân sách và tháng khác không phát cảnh báo
+        self.assertIsNone(engine.add(Transaction("08/03/2025", "Chi tiêu", "Đi lại", 5000000.0)))
+        self.assertIsNone(engine.add(Transaction("08/04/2025", "Chi tiêu", "Ăn uống", 5000000.0)))
+
+        engine.remove(Transaction("08/03/2025", "Chi tiêu", "Ăn uống", 600000.0))
+        self.assertEqual(engine.status("03/2025", "Ăn uống")["status"], "An toàn")
+
+    def test_status_matches_budget_manager(self):
+        """
+        Test BudgetManager và engine cho cùng trạng thái tại các điểm ngưỡng
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            manager = BudgetManager()
+            manager.file_handler.budget_file = Path(directory) / "budget.csv"
+            manager.set_budget("Ăn uống", 1000000.0, "03/2025")
+            engine = BudgetAlertEngine(warning_threshold=manager.warning_threshold)
+            engine.set_budgets([{"category": "Ăn uống", "amount": 1000000.0, "month_year": "03/2025"}])
+
+            warning_point = 1000000.0 * manager.warning_threshold
+            for spent in (0.0, warning_point, warning_point + 0.01, 1000000.0, 1000000.01):
+                transactions = [Transaction("05/03/2025", "Chi tiêu", "Ăn uống", spent)] if spent else []
+                engine.rebuild(ReportCube(transactions))
+                expected = engine.status("03/2025", "Ăn uống")["status"]
+                self.assertEqual(manager.get_budget_status(transactions, "Ăn uống", "03/2025")["status"],
+                                 expected, spent)
+                statuses = {s["category"]: s["status"] for s in manager.get_all_budget_status(transactions, "03/2025")}
+                self.assertEqual(statuses["Ăn uống"], expected, spent)
+            self.assertEqual(manager.get_budget_status([], "Đi lại", "03/2025")["status"], "Chưa đặt")
+
+
+class TestWarmCache(unittest.TestCase):
+    def test_state_is_reused_only_while_sources_are_unchanged(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, "transactions.csv")
+            with open(source, "w", encoding="utf-8") as file:
+                file.write("date,type,category,amount\n")
+            cache = WarmCache(os.path.join(directory, "cache"))
+            cube = ReportGenerator(self._transactions()).cube
+
+            self.assertTrue(cache.save("transactions", [source], {"aggregates": cube}))
+            restored = cache.load("transactions", [source])
+            self.assertEqual(restored["aggregates"].totals(), cube.totals())
+
+            with open(source, "a", encoding="utf-8") as file:
+                file.write("01/01/2025,Chi tiêu,Ăn uống,1000\n")
+            self.assertIsNone(cache.load("transactions", [source]))
+            self.assertIsNone(cache.load("missing", [source]))
+
+    @staticmethod
+    def _transactions():
+        return [
+            Transaction("05/01/2025", "Thu nhập", "Lương", 1000000.0),
+            Transaction("06/01/2025", "Chi tiêu", "Ăn uống", 200000.0)
+        ]
+
+
+class TestTransactionListModel(unittest.TestCase):
+    def setUp(self):
+        """
+        Thiết lập model với dữ liệu mẫu, mặc định sắp xếp ngày giảm dần
+        """
+        self.transactions = make_transactions()
+        self.model = TransactionListModel()
+        self.model.load(self.transactions)
+
+    def rows(self):
+        return self.model.get_window(0, len(self.model))
+
+    def test_month_filter_uses_month_index(self):
+        """
+        Test lọc theo tháng, bỏ lọc bằng "Tất cả" và thêm giao dịch ngoài tháng đang lọc
+        """
+        self.model.set_month_filter("01/2025")
+        self.assertEqual(len(self.model), 4)
+        self.assertTrue(all(t.get_month_year() == "01/2025" for t in self.rows()))
+        self.assertEqual(self.model.get_window(1, 2), self.rows()[1:3])
+        self.assertIsNone(self.model.get(4))
+
+        other = Transaction("04/02/2025", "Chi tiêu", "Đi lại", 20000.0)
+        self.assertIsNone(self.model.insert(other))
+        self.assertEqual(len(self.model), 4)
+
+        self.model.set_month_filter("Tất cả")
+        self.assertIsNone(self.model.month_filter)
+        self.assertEqual(len(self.model), len(self.transactions) + 1)
+        self.assertIs(self.model.get(0), other)
+
+    def test_multi_level_sort(self):
+        """
+        Test cột chính trước đó trở thành khóa phụ và số tiền được so sánh theo số
+        """
+        self.model.sort_by("Danh mục", False)
+        self.assertEqual(self.model.sort_spec, [("Danh mục", False), ("Ngày", True)])
+        food = [t for t in self.rows() if t.category == "Ăn uống"]
+        self.assertEqual([t.date for t in food], ["03/02/2025", "09/01/2025", "02/01/2025"])
+
+        self.model.sort_by("Số tiền", True)
+        self.model.sort_by("Loại", False)
+        self.assertEqual([c for c, _ in self.model.sort_spec], ["Loại", "Số tiền", "Danh mục"])
+        expenses = [t.amount for t in self.rows() if t.type == "Chi tiêu"]
+        self.assertEqual(expenses, sorted(expenses, reverse=True))
+
+        self.model.sort_by("Không có", False)
+        self.assertEqual(len(self.model.sort_spec), 3)
+
+    def test_permutation_cache_reused_and_dropped_on_change(self):
+        """
+        Test hoán vị đã sắp xếp được dùng lại và bị bỏ khi dữ liệu thay đổi
+        """
+        all_rows = self.model._rows
+        self.model.set_month_filter("01/2025")
+        self.model.set_month_filter(None)
+        self.assertIs(self.model._rows, all_rows)
+
+        extra = Transaction("20/01/2025", "Chi tiêu", "Đi lại", 40000.0)
+        self.model.insert(extra)
+        self.model.set_month_filter("01/2025")
+        self.assertEqual(len(self.model), 5)
+        self.assertIs(self.model.get(0), extra)
+
+    def test_insert_at_sorted_position(self):
+        """
+        Test thêm giao dịch vào đúng vị trí, sau các dòng cùng khóa
+        """
+        late = Transaction("05/01/2025", "Chi tiêu", "Đi lại", 30000.0)
+        self.assertEqual(self.model.insert(late), 4)
+        self.assertIs(self.model.get(4), late)
+
+        same_day = Transaction("05/01/2025", "Chi tiêu", "Ăn uống", 10000.0)
+        self.assertEqual(self.model.insert(same_day), 5)
+        self.assertEqual([t.date for t in self.rows()],
+                         sorted([t.date for t in self.rows()],
+                                key=lambda d: tuple(reversed(d.split('/'))), reverse=True))
+
+    def test_remove_locates_row_by_identity(self):
+        """
+        Test xóa đúng đối tượng khi có dòng trùng giá trị, không ảnh hưởng dòng còn lại
+        """
+        twin = Transaction("02/01/2025", "Chi tiêu", "Ăn uống", 150000.0, "Ăn trưa")
+        self.model.insert(twin)
+        original = self.transactions[1]
+        index = self.model.remove(original)
+
+        rows = self.rows()
+        self.assertEqual(index, 4)
+        self.assertTrue(any(t is twin for t in rows))
+        self.assertFalse(any(t is original for t in rows))
+        self.assertEqual(len(self.model), len(self.transactions))
+        self.assertIsNone(self.model.remove(original))
+
+        # Chỉ mục tháng cũng không còn giao dịch đã xóa
+        self.model.set_month_filter("01/2025")
+        self.assertEqual(len(self.model), 4)
+        self.assertFalse(any(t is original for t in self.rows()))
+
+
+class TestReportExecutor(unittest.TestCase):
+    def setUp(self):
+        self.widget = FakeWidget()
+        self.executor = ReportExecutor(self.widget, poll_interval_ms=0)
+
+    def tearDown(self):
+        self.executor.shutdown()
+
+    def test_result_delivered_on_tk_thread(self):
+        """
+        Test kết quả và lỗi được trả về qua after() trên luồng gọi
+        """
+        delivered, errors = [], []
+        self.executor.submit(lambda: 42, lambda result: delivered.append((result, threading.current_thread())))
+        self.widget.run_pending()
+        self.assertEqual(delivered, [(42, threading.main_thread())])
+        self.assertFalse(self.executor.busy)
+
+        self.executor.submit(lambda: 1 / 0, delivered.append, errors.append)
+        self.widget.run_pending()
+        self.assertEqual(len(delivered), 1)
+        self.assertIsInstance(errors[0], ZeroDivisionError)
+
+    def test_stale_generation_is_dropped(self):
+        """
+        Test yêu cầu mới làm kết quả của yêu cầu đang chạy bị bỏ qua
+        """
+        gate = threading.Event()
+        delivered = []
+        first = self.executor.submit(lambda: gate.wait(1) and "cũ", delivered.append)
+        second = self.executor.submit(lambda: "mới", delivered.append)
+        self.assertGreater(second, first)
+        gate.set()
+        self.widget.run_pending()
+        self.assertEqual(delivered, ["mới"])
+
+        self.executor.submit(lambda: "hủy", delivered.append)
+        self.executor.cancel()
+        self.widget.run_pending()
+        self.assertEqual(delivered, ["mới"])
+
+    def test_shutdown_ignores_pending_results(self):
+        """
+        Test sau khi dừng không còn callback nào được gọi
+        """
+        delivered = []
+        self.executor.submit(lambda: "kết quả", delivered.append)
+        self.executor.shutdown()
+        self.assertEqual(self.widget.jobs, [])
+        self.executor.submit(lambda: "sau khi dừng", delivered.append)
+        self.widget.run_pending()
+        self.assertEqual(delivered, [])
+
+
+class TestIdleScheduler(unittest.TestCase):
+    def setUp(self):
+        self.widget = FakeWidget()
+        self.scheduler = IdleScheduler(self.widget, idle_delay_ms=0, poll_interval_ms=0)
+
+    def tearDown(self):
+        self.scheduler.shutdown()
+
+    def test_runs_by_priority_with_prepare(self):
+        """
+        Test tác vụ chạy theo độ ưu tiên, tác vụ cùng tên được thay thế và prepare chạy trên luồng Tk
+        """
+        ran = []
+        self.assertEqual(self.widget.bindings, list(IdleScheduler.INPUT_EVENTS))
+        self.scheduler.schedule("low", lambda: ran.append("low"), priority=2)
+        self.scheduler.schedule("high", lambda snapshot: ran.append(("high", snapshot)), priority=1,
+                                prepare=lambda: threading.current_thread())
+        self.scheduler.schedule("low", lambda: ran.append("low-mới"), priority=2)
+        self.assertEqual(self.scheduler.pending, 2)
+
+        self.widget.run_pending()
+        self.assertEqual(ran, [("high", threading.main_thread()), "low-mới"])
+        self.assertEqual(self.scheduler.pending, 0)
+
+    def test_user_input_defers_dispatch(self):
+        """
+        Test thao tác của người dùng hủy lần gửi đang hẹn và đếm lại thời gian rảnh
+        """
+        ran = []
+        self.scheduler.schedule("task", lambda: ran.append("task"))
+        self.widget.run_pending(until=lambda: self.scheduler._dispatch_job is not None)
+        self.scheduler.on_user_input()
+        self.assertEqual([callback for _job, callback in self.widget.jobs], [self.scheduler._on_idle])
+        self.assertEqual(ran, [])
+        self.widget.run_pending()
+        self.assertEqual(ran, ["task"])
+
+    def test_cancel_by_name_and_generation(self):
+        """
+        Test hủy theo tên, hủy toàn bộ bỏ tác vụ đang chờ và kết quả của tác vụ đang chạy
+        """
+        ran = []
+        gate = threading.Event()
+        self.scheduler.schedule("a", lambda: ran.append("a"))
+        self.scheduler.schedule("b", lambda: ran.append("b"), priority=1)
+        self.scheduler.cancel("a")
+        self.widget.run_pending()
+        self.assertEqual(ran, ["b"])
+
+        self.scheduler.schedule("slow", lambda: gate.wait(1) and ran.append("slow"))
+        self.scheduler.schedule("next", lambda: ran.append("next"), priority=1)
+        self.widget.run_pending(until=lambda: self.scheduler.busy)
+        generation = self.scheduler._generation
+        self.scheduler.cancel()
+        self.assertEqual(self.scheduler.pending, 0)
+        self.assertEqual(self.scheduler._generation, generation + 1)
+        gate.set()
+        self.widget.run_pending()
+        self.assertNotIn("next", ran)
+        self.assertFalse(self.scheduler.busy)
+
+
+class TestRefreshCoalescing(unittest.TestCase):
+    def setUp(self):
+        """
+        Thiết lập controller không có Tk với ba view phụ thuộc khác nhau
+        """
+        self.controller = AppController.__new__(AppController)
+        self.controller.root = FakeWidget()
+        self.controller._views = {}
+        self.controller._dirty_views = set()
+        self.controller._refresh_job = None
+        self.calls = []
+        for name, depends_on in (("list", ("transactions",)), ("budget", ("budget",)),
+                                 ("summary", ("transactions", "budget"))):
+            self.controller.register_view(name, lambda n=name: self.calls.append(n), depends_on)
+
+    def test_invalidations_coalesce_into_one_redraw(self):
+        """
+        Test nhiều lần đánh dấu trong một khung hình chỉ hẹn một lần vẽ, mỗi view vẽ một lần
+        """
+        self.controller.mark_dirty("summary", "không có")
+        self.controller.invalidate_views("transactions")
+        self.controller.invalidate_views("transactions")
+        self.assertEqual(len(self.controller.root.jobs), 1)
+
+        self.controller.root.run_pending()
+        self.assertEqual(self.calls, ["list", "summary"])
+        self.assertIsNone(self.controller._refresh_job)
+
+    def test_flush_now_cancels_scheduled_redraw(self):
+        """
+        Test vẽ ngay hủy lịch đã hẹn, view lỗi không chặn view khác, view đã hủy không được vẽ
+        """
+        def broken():
+            raise RuntimeError("vẽ lỗi")
+        self.controller.register_view("list", broken)
+        self.controller.invalidate_views("budget", "transactions")
+        self.controller.unregister_view("summary")
+        self.controller.flush_refresh()
+        self.assertEqual(self.calls, ["budget"])
+        self.assertEqual(self.controller.root.jobs, [])
+
+        self.controller.flush_refresh()
+        self.assertEqual(self.calls, ["budget"])
+
+
+class TestOnlineStatistics(unittest.TestCase):
+    def test_matches_batch_statistics_after_add_and_remove(self):
+        """
+        Test Welford và sketch phân vị khớp với tính toán toàn bộ sau khi thêm/xóa
+        """
+        transactions = make_transactions()
+        stats = OnlineStatistics(transactions)
+        extra = Transaction("05/02/2025", "Chi tiêu", "Ăn uống", 120000.0)
+        stats.add(extra)
+        stats.remove(transactions[0])
+
+        remaining = [t.amount for t in transactions[1:]] + [extra.amount]
+        overall = stats.summary()
+        self.assertEqual(overall["count"], len(remaining))
+        self.assertAlmostEqual(overall["mean"], np.mean(remaining), places=4)
+        self.assertAlmostEqual(overall["std"], np.std(remaining), places=4)
+        self.assertAlmostEqual(overall["median"], np.median(remaining), delta=np.median(remaining) * 0.01)
+
+        food = stats.summary(category="Ăn uống")
+        self.assertEqual(food["count"], 4)
+        self.assertAlmostEqual(food["mean"], 205000)
+        self.assertEqual(stats.summary(kind="income")["count"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,5 +3,7 @@ Utils Package - Các tiện ích chung và validators
 """
 
 from .validators import validate_date, validate_amount, validate_category
+from .money import to_minor, from_minor, format_minor
 
-__all__ = ['validate_date', 'validate_amount', 'validate_category'] 
\ No newline at end of file
+__all__ = ['validate_date', 'validate_amount', 'validate_category',
+           'to_minor', 'from_minor', 'format_minor'] 
\ No newline at end of file
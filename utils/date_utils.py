@@ -1,6 +1,11 @@
 #Các hàm tiện ích xử lý ngày tháng
 
+from datetime import datetime, date
 from typing import List
+from config import CSV_CONFIG
+
+# Độ dài của timestamp chuẩn YYYY-MM-DDTHH:MM:SS.ffffff
+_TIMESTAMP_LENGTH = 26
 
 
 def generate_month_range(start_year: int = 2025, end_year: int = 2027) -> List[str]:
@@ -18,4 +23,48 @@ def generate_month_range(start_year: int = 2025, end_year: int = 2027) -> List[s
     for year in range(start_year, end_year + 1):
         for month in range(1, 13):
             months.append(f"{month:02d}/{year}")
-    return months 
\ No newline at end of file
+    return months
+
+
+def new_timestamp() -> str:
+    """Timestamp ISO-8601 (đến micro giây) của thời điểm hiện tại"""
+    return datetime.now().strftime(CSV_CONFIG["timestamp_format"])
+
+
+def normalize_timestamp(timestamp: str, date_str: str = "") -> str:
+    """
+    Chuẩn hóa timestamp về dạng ISO-8601 đến micro giây
+    
+    Timestamp cũ chỉ có giờ (HH:MM:SS) được ghép với ngày giao dịch
+    (DD/MM/YYYY, hoặc 01/01/1970 nếu ngày không hợp lệ) để giữ được thứ
+    tự trong ngày. Giá trị không nhận dạng được giữ nguyên.
+    
+    Args:
+        timestamp: Timestamp cần chuẩn hóa
+        date_str: Ngày giao dịch (DD/MM/YYYY), dùng cho timestamp cũ
+        
+    Returns:
+        str: Timestamp dạng YYYY-MM-DDTHH:MM:SS.ffffff
+    """
+    if not timestamp:
+        return timestamp
+    if len(timestamp) == _TIMESTAMP_LENGTH and timestamp[10] == "T":
+        return timestamp  # Đã ở dạng chuẩn
+    
+    for legacy_format in (CSV_CONFIG["legacy_timestamp_format"], CSV_CONFIG["date_format"]):
+        try:
+            parsed = datetime.strptime(timestamp, legacy_format)
+        except ValueError:
+            continue
+        if legacy_format == CSV_CONFIG["legacy_timestamp_format"]:
+            try:
+                day = datetime.strptime(date_str, "%d/%m/%Y").date()
+            except (ValueError, TypeError):
+                day = date(1970, 1, 1)
+            parsed = datetime.combine(day, parsed.time())
+        return parsed.strftime(CSV_CONFIG["timestamp_format"])
+    
+    try:
+        return datetime.fromisoformat(timestamp).strftime(CSV_CONFIG["timestamp_format"])
+    except ValueError:
+        return timestamp 
\ No newline at end of file
@@ -0,0 +1,69 @@
+#Biểu diễn số tiền bằng số nguyên theo đơn vị nhỏ nhất
+
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Any
+from config import MONEY_CONFIG
+
+# Số đơn vị nhỏ nhất trong một đồng (10^decimals)
+MINOR_PER_UNIT = 10 ** MONEY_CONFIG["decimals"]
+
+_QUANTUM = Decimal(1).scaleb(-MONEY_CONFIG["decimals"])
+
+
+def to_minor(value: Any) -> int:
+    """
+    Chuyển số tiền (int, float, chuỗi, Decimal) sang số nguyên đơn vị nhỏ nhất
+    
+    Số float được đổi qua chuỗi ngắn nhất biểu diễn nó (0.1 -> "0.1") nên
+    không mang theo sai số nhị phân; phần lẻ hơn đơn vị nhỏ nhất được làm
+    tròn nửa lên.
+    
+    Args:
+        value: Số tiền theo đơn vị đồng
+        
+    Returns:
+        int: Số tiền theo đơn vị nhỏ nhất
+        
+    Raises:
+        ValueError: Nếu giá trị không phải số tiền hợp lệ
+    """
+    if isinstance(value, bool):
+        raise ValueError(f"Số tiền không hợp lệ: {value!r}")
+    if isinstance(value, int):
+        return value * MINOR_PER_UNIT
+    try:
+        amount = Decimal(value.strip() if isinstance(value, str) else str(value))
+    except (InvalidOperation, TypeError, AttributeError):
+        raise ValueError(f"Số tiền không hợp lệ: {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"Số tiền không hợp lệ: {value!r}")
+    return int(amount.quantize(_QUANTUM, rounding=ROUND_HALF_UP).scaleb(MONEY_CONFIG["decimals"]))
+
+
+def from_minor(minor: int) -> float:
+    """
+    Chuyển số nguyên đơn vị nhỏ nhất sang số tiền để hiển thị/tính toán thống kê
+    
+    Args:
+        minor: Số tiền theo đơn vị nhỏ nhất
+        
+    Returns:
+        float: Số tiền theo đơn vị đồng
+    """
+    return minor / MINOR_PER_UNIT
+
+
+def format_minor(minor: int) -> str:
+    """
+    Chuỗi thập phân chính xác để ghi file (giữ dạng cũ: 150000.0, 1500.5, 1500.25)
+    
+    Args:
+        minor: Số tiền theo đơn vị nhỏ nhất
+        
+    Returns:
+        str: Số tiền dạng thập phân
+    """
+    sign = "-" if minor < 0 else ""
+    units, fraction = divmod(abs(minor), MINOR_PER_UNIT)
+    digits = str(fraction).zfill(MONEY_CONFIG["decimals"]).rstrip("0") or "0"
+    return f"{sign}{units}.{digits}"